@@ -0,0 +1,251 @@
+import collections
+import contextlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+from daypart import day_type_column, daypart_column
+from sales_cube import daypart_breakdown
+
+# --- חישובי הדשבורד כפונקציות טהורות ---
+# החלק הראשון: מימושים ישירים על טבלת העסקאות הגולמית (date_time, Transaction, Item) - ללא Streamlit
+# וללא מצב גלובלי, כך שניתן לתזמן ולמדוד כל אחד בנפרד (ראו benchmark.py).
+# החלק השני: dashboard_view - כל מה שהעמוד מציג עבור פילטר אחד, מתוך המבנים המחושבים מראש
+# (קובייה, מטריצת סלים, סקיצות). הדשבורד ו-batch_reports.py רק מחברים אליו את הפילטרים.
+
+DEFAULT_ANCHOR_ITEM = "Coffee"  # מוצר העוגן של טבלת "נקנה יחד עם" כאשר לא נבחר מוצר
+TREND_FREQUENCIES = {'day': 'D', 'week': 'W', 'month': 'M'}
+MAX_TREND_POINTS = 400  # מספר הנקודות המרבי בגרף המגמה (מעבר לכך - דילול LTTB)
+
+
+def filter_sales_frame(df, start_date, end_date, item=None):
+    """סינון לפי טווח תאריכים (כולל) ומוצר, במסכה בוליאנית - עובד גם על טבלה לא ממוינת."""
+    day = df['date_time'].dt.normalize()
+    mask = (day >= pd.Timestamp(start_date)) & (day <= pd.Timestamp(end_date))
+    if item is not None:
+        mask &= df['Item'] == item
+    return df[mask]
+
+
+def compute_kpis(df):
+    """מדדי המפתח: עסקאות ייחודיות, פריטים שנמכרו, פריטים ייחודיים וממוצע פריטים לעסקה."""
+    total_items_sold = len(df)
+    unique_transactions = int(df['Transaction'].nunique())
+    return {
+        'total_items_sold': total_items_sold,
+        'unique_transactions': unique_transactions,
+        'unique_items': int(df['Item'].nunique()),
+        'avg_items_per_transaction': total_items_sold / unique_transactions if unique_transactions > 0 else 0,
+    }
+
+
+def top_items(df, n=10):
+    """n הפריטים הנמכרים ביותר (עמודות Item, Count)."""
+    counts = df['Item'].value_counts()
+    top = counts[counts > 0].rename_axis('Item').reset_index(name='Count')
+    top['Item'] = top['Item'].astype(str)
+    return top.sort_values(['Count', 'Item'], ascending=[False, True], kind='stable').head(n).reset_index(drop=True)
+
+
+def hourly_counts(df):
+    """מספר הפריטים שנמכרו בכל שעה ביום, כולל שעות ללא מכירות (עמודות Hour, Count)."""
+    counts = np.bincount(df['date_time'].dt.hour.to_numpy(), minlength=24)
+    return pd.DataFrame({'Hour': np.arange(24), 'Count': counts})
+
+
+def monthly_transactions(df):
+    """עסקאות ייחודיות לכל חודש, ממוין כרונולוגית (עמודות YearMonth, UniqueTransactions)."""
+    monthly = df.groupby(df['date_time'].dt.to_period('M'))['Transaction'].nunique()
+    return pd.DataFrame({
+        'YearMonth': monthly.index.strftime('%Y-%m'),
+        'UniqueTransactions': monthly.to_numpy(),
+    })
+
+
+def daypart_counts(df, by_day_type=False):
+    """
+    מספר הפריטים שנמכרו בכל חלק של היום (עמודות Daypart, Count), מהגדול לקטן.
+    by_day_type=True - פירוק נוסף לאמצע שבוע / סוף שבוע (עמודות Daypart, weekday_weekend, Count).
+    """
+    daypart = df['Daypart'] if 'Daypart' in df.columns else daypart_column(df)
+    if by_day_type:
+        return daypart_breakdown(df.groupby([daypart, day_type_column(df)], observed=True).size())
+    counts = df.groupby(daypart, observed=True).size()
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    counts = counts.rename_axis('Daypart').reset_index(name='Count')
+    counts['Daypart'] = counts['Daypart'].astype(str)
+    return counts
+
+
+def co_purchase(df, anchor_item, n=10):
+    """
+    מוצרים שנקנו יחד עם anchor_item - אותן עמודות כמו BasketMatrix.co_purchased
+    (QuantityWithAnchor, TotalSales, Support, Confidence, Lift), מחושבות ישירות מהשורות.
+    """
+    anchor_transactions = df.loc[df['Item'] == anchor_item, 'Transaction'].unique()
+    columns = ['Item', 'QuantityWithAnchor', 'TotalSales', 'Support', 'Confidence', 'Lift']
+    if len(anchor_transactions) == 0:
+        return pd.DataFrame(columns=columns)
+
+    items = df['Item'].astype(str)
+    in_anchor = df['Transaction'].isin(anchor_transactions)
+    distinct = ~df.duplicated(subset=['Transaction', 'Item'])
+    n_transactions = df['Transaction'].nunique()
+
+    result = pd.DataFrame({
+        'QuantityWithAnchor': items[in_anchor].value_counts(),
+        'TotalSales': items.value_counts(),
+        'TransactionsWithAnchor': items[in_anchor & distinct].value_counts(),
+        'ItemTransactions': items[distinct].value_counts(),
+    }).fillna(0).rename_axis('Item').reset_index()
+    result = result[(result['QuantityWithAnchor'] > 0) & (result['Item'] != anchor_item)]
+
+    result['Support'] = result['TransactionsWithAnchor'] / n_transactions
+    result['Confidence'] = result['TransactionsWithAnchor'] / len(anchor_transactions)
+    result['Lift'] = result['Confidence'] * n_transactions / result['ItemTransactions']
+    result[['QuantityWithAnchor', 'TotalSales']] = result[['QuantityWithAnchor', 'TotalSales']].astype(np.int64)
+    result = result.sort_values(['QuantityWithAnchor', 'Item'], ascending=[False, True], kind='stable')
+    return result[columns].head(n).reset_index(drop=True)
+
+
+def trend_frequency(start_date, end_date, granularity='auto'):
+    """
+    רזולוציית גרף המגמה ('D', 'W' או 'M'). במצב 'auto' לפי אורך הטווח: עד רבעון - ימים,
+    עד שנתיים - שבועות, ומעבר לכך - חודשים.
+    """
+    if granularity != 'auto':
+        return TREND_FREQUENCIES[granularity]
+    days = (end_date - start_date).days + 1
+    if days <= 92:
+        return 'D'
+    return 'W' if days <= 730 else 'M'
+
+
+def lttb_indices(x, y, threshold):
+    """
+    מיקומי הנקודות שנשמרות בדילול Largest-Triangle-Three-Buckets לכל היותר threshold נקודות:
+    הנקודה הראשונה והאחרונה, ומכל דלי ביניים הנקודה שיוצרת את המשולש הגדול ביותר עם הנקודה
+    שנבחרה בדלי הקודם ועם ממוצע הדלי הבא - שיאים ושפלים נשמרים, בניגוד לדגימה קבועה.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)  # threshold-2 דליים על הנקודות הפנימיות
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        next_lo, next_hi = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+        next_x, next_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        areas = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                       - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def transactions_trend(counts, max_points=MAX_TREND_POINTS):
+    """
+    ספירות עסקאות לפי תקופה (סדרה עם אינדקס Period) כטבלת גרף (Period - תחילת התקופה, UniqueTransactions),
+    מדוללת ב-LTTB ל-max_points נקודות לכל היותר.
+    """
+    trend = pd.DataFrame({'Period': counts.index.start_time, 'UniqueTransactions': counts.to_numpy()})
+    x = trend['Period'].to_numpy().astype('datetime64[s]').astype(np.float64)
+    keep = lttb_indices(x, trend['UniqueTransactions'].to_numpy(dtype=np.float64), max_points)
+    return trend.iloc[keep].reset_index(drop=True)
+
+
+def anchor_for(item):
+    """מוצר העוגן לטבלת "נקנה יחד עם": המוצר הנבחר, או קפה כאשר לא נבחר מוצר."""
+    return DEFAULT_ANCHOR_ITEM if item is None else item
+
+
+class ResultCache:
+    """
+    תוצאות לפי הקלטים שלהן (LRU חסום ב-max_entries), למשל חלקי dashboard_view - משותף לכל הסשנים, כך
+    שכל סשן שומר רק את הפילטרים שלו ולא עותק של התוצאות. המבנים שבמפתחות (קובייה, סלים) מושווים לפי זהות.
+    התוצאות משותפות ולכן אסור לשנות אותן במקום.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        result = compute()  # מחוץ לנעילה: סשנים אחרים לא ממתינים (חישוב כפול של אותו מפתח אינו מזיק)
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+
+# השדות שכל חלק של dashboard_view מחשב - חלק שהקלטים שלו כבר חושבו נלקח מהמטמון (cache=)
+_VIEW_PARTS = {
+    'kpis': ('kpis',),
+    'top_items': ('top_items',),
+    'hourly': ('hourly',),
+    'monthly_transactions': ('monthly_transactions',),
+    'transactions_trend': ('trend_frequency', 'trend_points', 'transactions_trend'),
+    'daypart': ('daypart',),
+    'co_purchased': ('co_purchased',),
+}
+
+
+def dashboard_view(cube, basket, start_date, end_date, item=None, sketches=None, top_n=10, timer=None,
+                   trend_granularity=None, max_trend_points=MAX_TREND_POINTS, cache=None):
+    """
+    כל הטבלאות שהדשבורד מציג עבור פילטר אחד (item=None עבור כל המוצרים).
+    sketches - סקיצות HyperLogLog אופציונליות לספירת עסקאות מקורבת.
+    trend_granularity - None עבור מגמה חודשית (monthly_transactions), או 'auto'/'day'/'week'/'month'
+                        עבור transactions_trend ברזולוציה מתאימה, מדוללת ל-max_trend_points נקודות.
+    timer - פונקציה אופציונלית שמקבלת שם ומחזירה context manager למדידת כל חישוב (ראו profiling.py).
+    cache - ResultCache אופציונלי: כל חלק נשמר בו לפי הקלטים שלו (המבנים והפילטרים שהוא תלוי בהם), וחלק
+            שכבר חושב נלקח ממנו - למשל מעבר בין 'כל המוצרים' לקפה אינו מחשב מחדש את "נקנה יחד עם".
+    """
+    if timer is None:
+        timer = lambda name: contextlib.nullcontext()
+    anchor_item = anchor_for(item)
+    view = {'anchor_item': anchor_item}
+
+    def part(name, inputs, compute):
+        def computed():
+            with timer(name):
+                compute()
+            return {field: view[field] for field in _VIEW_PARTS[name]}
+
+        # המבנים (קובייה, סלים, סקיצות) מושווים לפי זהות - מבנה שנבנה מחדש הוא קלט חדש
+        view.update(computed() if cache is None else cache.get_or_compute((name,) + inputs, computed))
+
+    def compute_trend():
+        view['trend_frequency'] = trend_frequency(start_date, end_date, trend_granularity)
+        counts = cube.transactions_by_period(start_date, end_date, item, view['trend_frequency'], sketches=sketches)
+        view['trend_points'] = len(counts)  # מספר התקופות לפני הדילול
+        view['transactions_trend'] = transactions_trend(counts, max_trend_points)
+
+    cube_filter = (cube, start_date, end_date, item)
+    part('kpis', cube_filter + (sketches,),
+         lambda: view.update(kpis=cube.kpis(start_date, end_date, item, sketches=sketches)))
+    part('top_items', cube_filter + (top_n,),
+         lambda: view.update(top_items=cube.top_items(start_date, end_date, item, n=top_n)))
+    part('hourly', cube_filter,
+         lambda: view.update(hourly=cube.hourly(start_date, end_date, item)))
+    if trend_granularity is None:
+        part('monthly_transactions', cube_filter + (sketches,),
+             lambda: view.update(monthly_transactions=cube.monthly_transactions(start_date, end_date, item,
+                                                                                sketches=sketches)))
+    else:
+        part('transactions_trend', cube_filter + (sketches, trend_granularity, max_trend_points), compute_trend)
+    part('daypart', cube_filter,
+         lambda: view.update(daypart=cube.daypart_counts(start_date, end_date, item, by_day_type=True)))
+    part('co_purchased', (basket, anchor_item, start_date, end_date, top_n),
+         lambda: view.update(co_purchased=basket.co_purchased(anchor_item, start_date, end_date, n=top_n)))
+    return view
@@ -0,0 +1,320 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+
+from basket import get_basket_matrix
+
+# --- כריית צמדי מוצרים וחוקי אסוציאציה ---
+# לכל יום נשמרת טבלת ספירות של צמדי מוצרים (מטריצה דלילה משולשת עליונה), יחד עם מספר העסקאות
+# של כל מוצר ומספר העסקאות הכולל. צמדים שכיחים בטווח תאריכים מתקבלים מסכימת הטבלאות היומיות,
+# בלי לכרות מחדש את העסקאות, ויום חדש מתווסף בלי לגעת בשאר הימים (add_day).
+# הספירה היומית היא Apriori וקטורי לרמת הצמדים: P.T @ P על מטריצת הנוכחות של סלי היום.
+# אופציונלית נשמרות גם כמויות יומיות (P.T @ Q), שמאפשרות לענות על "נקנה יחד עם" ללא מטריצת הסלים
+# המלאה - כך עובד מצב הטעינה במקטעים (chunked_loader.py), שבו העסקאות עצמן לא נשמרות בזיכרון.
+
+
+def count_pairs(presence):
+    """
+    סופר צמדים עבור קבוצת עסקאות (מטריצת נוכחות בינארית עסקאות x מוצרים).
+    מחזיר (מטריצת צמדים משולשת עליונה, מספר עסקאות לכל מוצר, מספר העסקאות).
+    """
+    gram = (presence.T @ presence).tocsr()
+    item_transactions = gram.diagonal().astype(np.int64)
+    pairs = sp.triu(gram, k=1, format='csr')
+    pairs.data = pairs.data.astype(np.int64)
+    return pairs, item_transactions, presence.shape[0]
+
+
+class PairCounts:
+    """
+    ספירות צמדים יומיות הניתנות למיזוג.
+
+    days - ימים ממוינים (datetime64[D]).
+    day_pairs - לכל יום, מטריצת CSR (מוצרים x מוצרים, משולשת עליונה) של מספר העסקאות שכללו את שני המוצרים.
+    day_item_transactions - מערך (ימים x מוצרים) של מספר העסקאות שכללו כל מוצר.
+    day_transactions - מספר העסקאות בכל יום.
+    day_anchor_quantities - (אופציונלי) לכל יום, מטריצת CSR שבה [i, j] = יחידות של j בעסקאות שכללו את i.
+    day_item_quantities - (אופציונלי) מערך (ימים x מוצרים) של היחידות שנמכרו מכל מוצר.
+    """
+
+    def __init__(self, items, days, day_pairs, day_item_transactions, day_transactions,
+                 day_anchor_quantities=None, day_item_quantities=None):
+        self.items = items
+        self.days = days
+        self.day_pairs = day_pairs
+        self.day_item_transactions = day_item_transactions
+        self.day_transactions = day_transactions
+        self.day_anchor_quantities = day_anchor_quantities
+        self.day_item_quantities = day_item_quantities
+
+    @property
+    def has_quantities(self):
+        return self.day_anchor_quantities is not None
+
+    @classmethod
+    def from_basket(cls, basket, with_quantities=False):
+        """
+        בונה את הטבלאות היומיות ממטריצת סלי הקנייה (השורות כבר ממוינות לפי יום העסקה).
+        with_quantities=True - שומר גם את הכמויות היומיות הדרושות ל-co_purchased.
+        """
+        days, starts = np.unique(basket.transaction_days, return_index=True)
+        bounds = np.append(starts, len(basket.transaction_days))
+        day_pairs, day_item_transactions, day_transactions = [], [], []
+        day_anchor_quantities, day_item_quantities = [], []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            pairs, item_transactions, n_transactions = count_pairs(basket.presence[lo:hi])
+            day_pairs.append(pairs)
+            day_item_transactions.append(item_transactions)
+            day_transactions.append(n_transactions)
+            if with_quantities:
+                quantities = basket.quantities[lo:hi]
+                anchor_quantities = (basket.presence[lo:hi].T @ quantities).tocsr()
+                anchor_quantities.data = anchor_quantities.data.astype(np.int64)
+                day_anchor_quantities.append(anchor_quantities)
+                day_item_quantities.append(np.asarray(quantities.sum(axis=0)).ravel().astype(np.int64))
+        n_items = len(basket.items)
+        return cls(
+            list(basket.items),
+            days,
+            day_pairs,
+            np.array(day_item_transactions, dtype=np.int64).reshape(len(days), n_items),
+            np.array(day_transactions, dtype=np.int64),
+            day_anchor_quantities if with_quantities else None,
+            np.array(day_item_quantities, dtype=np.int64).reshape(len(days), n_items) if with_quantities else None,
+        )
+
+    def copy(self):
+        """עותק שניתן למזג לתוכו ימים חדשים בלי לשנות את המקור (המטריצות היומיות עצמן משותפות)."""
+        return PairCounts(
+            list(self.items),
+            self.days.copy(),
+            list(self.day_pairs),
+            self.day_item_transactions.copy(),
+            self.day_transactions.copy(),
+            list(self.day_anchor_quantities) if self.has_quantities else None,
+            self.day_item_quantities.copy() if self.has_quantities else None,
+        )
+
+    def _grow_items(self, items):
+        """מרחיב את הטבלאות לרשימת מוצרים ארוכה יותר (self.items חייבת להיות תחילית שלה)."""
+        n_items = len(items)
+        if n_items == len(self.items):
+            return
+        def resized(matrix):  # מטריצה חדשה עם שורות ריקות בסוף - המקור (אולי משותף לעותק אחר) לא משתנה
+            indptr = np.append(matrix.indptr, np.full(n_items - matrix.shape[0], matrix.indptr[-1]))
+            return sp.csr_matrix((matrix.data, matrix.indices, indptr), shape=(n_items, n_items))
+
+        self.day_pairs = [resized(matrix) for matrix in self.day_pairs]
+        if self.has_quantities:
+            self.day_anchor_quantities = [resized(matrix) for matrix in self.day_anchor_quantities]
+        extra = ((0, 0), (0, n_items - len(self.items)))
+        self.day_item_transactions = np.pad(self.day_item_transactions, extra)
+        if self.day_item_quantities is not None:
+            self.day_item_quantities = np.pad(self.day_item_quantities, extra)
+        self.items = list(items)
+
+    def add_day(self, day, pairs, item_transactions, n_transactions, anchor_quantities=None, item_quantities=None):
+        """ממזג ספירות של יום (חדש או קיים) - עלות ביחס לגודל היום בלבד, ללא כרייה מחדש של ההיסטוריה."""
+        day = np.datetime64(day, 'D')
+        position = np.searchsorted(self.days, day)
+        if position < len(self.days) and self.days[position] == day:
+            self.day_pairs[position] = self.day_pairs[position] + pairs
+            self.day_item_transactions[position] += item_transactions
+            self.day_transactions[position] += n_transactions
+            if self.has_quantities:
+                self.day_anchor_quantities[position] = self.day_anchor_quantities[position] + anchor_quantities
+                self.day_item_quantities[position] += item_quantities
+            return
+        self.days = np.insert(self.days, position, day)
+        self.day_pairs.insert(position, pairs)
+        self.day_item_transactions = np.insert(self.day_item_transactions, position, item_transactions, axis=0)
+        self.day_transactions = np.insert(self.day_transactions, position, n_transactions)
+        if self.has_quantities:
+            self.day_anchor_quantities.insert(position, anchor_quantities)
+            self.day_item_quantities = np.insert(self.day_item_quantities, position, item_quantities, axis=0)
+
+    def merge(self, other):
+        """
+        ממזג את הספירות של other (חלק אחר של הנתונים, עם רשימת מוצרים שמרחיבה את זו של self) יום אחר יום.
+        כל עסקה צריכה להיספר רק באחד מהשניים.
+        """
+        self._grow_items(other.items)
+        for position, day in enumerate(other.days):
+            self.add_day(
+                day,
+                other.day_pairs[position],
+                other.day_item_transactions[position],
+                other.day_transactions[position],
+                other.day_anchor_quantities[position] if other.has_quantities else None,
+                other.day_item_quantities[position] if other.has_quantities else None,
+            )
+
+    @classmethod
+    def concat(cls, parts, items=None):
+        """
+        מאחד ספירות של חלקים נפרדים מהנתונים (למשל קבצי הסניפים, ראו partitions.py) בבת אחת - ימים
+        משותפים מסוכמים. כל עסקה צריכה להיספר בחלק אחד בלבד. items - רשימת המוצרים של התוצאה, שמכילה את
+        המוצרים של כל החלקים בסדר כלשהו (ברירת מחדל: של האחרון).
+        """
+        items = list(parts[-1].items if items is None else items)
+        n_items = len(items)
+        item_index = pd.Index(items)
+        has_quantities = all(part.has_quantities for part in parts)
+        days, day_positions = np.unique(np.concatenate([part.days for part in parts]), return_inverse=True)
+        day_item_transactions = np.zeros((len(days), n_items), dtype=np.int64)
+        day_transactions = np.zeros(len(days), dtype=np.int64)
+        day_item_quantities = np.zeros((len(days), n_items), dtype=np.int64) if has_quantities else None
+        day_pairs = [[] for _ in days]  # לכל יום - הרשומות (שורה, עמודה, ערך) של כל החלקים, בקודים המאוחדים
+        day_anchor_quantities = [[] for _ in days]
+
+        def remapped(matrix, codes, triangular=False):
+            coo = matrix.tocoo()
+            rows, cols = codes[coo.row], codes[coo.col]
+            if triangular:  # בסדר מוצרים אחר צמד עשוי לעבור מתחת לאלכסון - מוחזר למשולש העליון
+                rows, cols = np.minimum(rows, cols), np.maximum(rows, cols)
+            return rows, cols, coo.data
+
+        offset = 0
+        for part in parts:
+            codes = item_index.get_indexer(part.items)
+            positions = day_positions[offset:offset + len(part.days)]
+            offset += len(part.days)
+            # הימים של כל חלק ייחודיים, ולכן סכימה ישירה לשורות ולעמודות הממופות
+            day_item_transactions[np.ix_(positions, codes)] += part.day_item_transactions
+            day_transactions[positions] += part.day_transactions
+            if has_quantities:
+                day_item_quantities[np.ix_(positions, codes)] += part.day_item_quantities
+            for local, position in enumerate(positions):
+                day_pairs[position].append(remapped(part.day_pairs[local], codes, triangular=True))
+                if has_quantities:
+                    day_anchor_quantities[position].append(remapped(part.day_anchor_quantities[local], codes))
+
+        def combined(entries):  # רשומות כפולות (אותו צמד מכמה חלקים) מסוכמות בהמרה ל-CSR
+            rows, cols, data = (np.concatenate(column) for column in zip(*entries))
+            return sp.csr_matrix((data.astype(np.int64), (rows, cols)), shape=(n_items, n_items))
+
+        return cls(
+            items,
+            days,
+            [combined(entries) for entries in day_pairs],
+            day_item_transactions,
+            day_transactions,
+            [combined(entries) for entries in day_anchor_quantities] if has_quantities else None,
+            day_item_quantities,
+        )
+
+    def merge_range(self, start_date, end_date):
+        """מסכם את הטבלאות היומיות בטווח: (מטריצת צמדים, עסקאות לכל מוצר, מספר עסקאות)."""
+        lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side='right')
+        n_items = len(self.items)
+        pairs = sp.csr_matrix((n_items, n_items), dtype=np.int64)
+        for day_pairs in self.day_pairs[lo:hi]:
+            pairs = pairs + day_pairs
+        return pairs.tocoo(), self.day_item_transactions[lo:hi].sum(axis=0), int(self.day_transactions[lo:hi].sum())
+
+    def co_purchased(self, anchor_item, start_date, end_date, n=10):
+        """
+        מוצרים שנקנו יחד עם anchor_item בטווח - אותן עמודות ואותו חישוב כמו BasketMatrix.co_purchased,
+        מתוך הכמויות היומיות (דורש with_quantities=True).
+        """
+        columns = ['Item', 'QuantityWithAnchor', 'TotalSales', 'Support', 'Confidence', 'Lift']
+        if anchor_item not in self.items:
+            return pd.DataFrame(columns=columns)
+        code = self.items.index(anchor_item)
+        lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side='right')
+        item_transactions = self.day_item_transactions[lo:hi].sum(axis=0)
+        anchor_transactions = item_transactions[code]
+        if hi <= lo or anchor_transactions == 0:
+            return pd.DataFrame(columns=columns)
+
+        n_items = len(self.items)
+        quantity_with_anchor = np.zeros(n_items, dtype=np.int64)
+        transactions_with_anchor = np.zeros(n_items, dtype=np.int64)
+        for position in range(lo, hi):
+            quantity_with_anchor += self.day_anchor_quantities[position][code].toarray().ravel()
+            pairs = self.day_pairs[position]  # משולשת עליונה: הצמדים של המוצר נמצאים בשורה ובעמודה שלו
+            transactions_with_anchor += pairs[code].toarray().ravel() + pairs[:, code].toarray().ravel()
+        transactions_with_anchor[code] = anchor_transactions
+        n_transactions = int(self.day_transactions[lo:hi].sum())
+
+        result = pd.DataFrame({
+            'Item': self.items,
+            'QuantityWithAnchor': quantity_with_anchor,
+            'TotalSales': self.day_item_quantities[lo:hi].sum(axis=0),
+            'Support': transactions_with_anchor / n_transactions,
+            'Confidence': transactions_with_anchor / anchor_transactions,
+            'Lift': np.divide(
+                transactions_with_anchor * n_transactions,
+                anchor_transactions * item_transactions,
+                out=np.zeros(n_items),
+                where=item_transactions > 0
+            ),
+        })
+        result = result[(result['QuantityWithAnchor'] > 0) & (result['Item'] != anchor_item)]
+        result = result.sort_values(['QuantityWithAnchor', 'Item'], ascending=[False, True], kind='stable')
+        return result.head(n).reset_index(drop=True)
+
+    def top_pairs(self, start_date, end_date, k=10, min_support=0.0, item=None):
+        """K צמדי המוצרים השכיחים ביותר בטווח (לפי מספר העסקאות המשותפות)."""
+        pairs, _, n_transactions = self.merge_range(start_date, end_date)
+        names = np.asarray(self.items, dtype=object)
+        first, second = names[pairs.row], names[pairs.col]
+        swap = first > second  # כל צמד מוצג בסדר אלפביתי, ללא תלות בסדר הקודים של המוצרים
+        result = pd.DataFrame({
+            'ItemA': np.where(swap, second, first),
+            'ItemB': np.where(swap, first, second),
+            'Transactions': pairs.data,
+        })
+        result['Support'] = result['Transactions'] / n_transactions if n_transactions else 0.0
+        result = result[(result['Transactions'] > 0) & (result['Support'] >= min_support)]
+        if item is not None:
+            result = result[(result['ItemA'] == item) | (result['ItemB'] == item)]
+        result = result.sort_values(['Transactions', 'ItemA', 'ItemB'], ascending=[False, True, True], kind='stable')
+        return result.head(k).reset_index(drop=True)
+
+    def rules(self, start_date, end_date, k=10, min_support=0.01, min_confidence=0.0, item=None):
+        """
+        חוקי אסוציאציה A -> B מכל הצמדים השכיחים (שני הכיוונים), ממוינים לפי Lift.
+        Support = P(A,B), Confidence = P(B|A), Lift = P(B|A) / P(B).
+        """
+        pairs, item_transactions, n_transactions = self.merge_range(start_date, end_date)
+        columns = ['Antecedent', 'Consequent', 'Support', 'Confidence', 'Lift']
+        if n_transactions == 0:
+            return pd.DataFrame(columns=columns)
+
+        frequent = pairs.data >= min_support * n_transactions
+        a, b, together = pairs.row[frequent], pairs.col[frequent], pairs.data[frequent]
+        antecedent = np.concatenate([a, b])
+        consequent = np.concatenate([b, a])
+        together = np.concatenate([together, together]).astype(np.float64)
+
+        names = np.asarray(self.items, dtype=object)
+        confidence = together / item_transactions[antecedent]
+        result = pd.DataFrame({
+            'Antecedent': names[antecedent],
+            'Consequent': names[consequent],
+            'Support': together / n_transactions,
+            'Confidence': confidence,
+            'Lift': confidence * n_transactions / item_transactions[consequent],
+        })
+        result = result[result['Confidence'] >= min_confidence]
+        if item is not None:
+            result = result[(result['Antecedent'] == item) | (result['Consequent'] == item)]
+        result = result.sort_values(['Lift', 'Support', 'Antecedent', 'Consequent'],
+                                    ascending=[False, False, True, True], kind='stable')
+        return result.head(k).reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner="סופר צמדי מוצרים...", max_entries=4)
+def _build_pair_counts(version, _basket):
+    return PairCounts.from_basket(_basket)
+
+
+def get_pair_counts(dataset):
+    """מחזיר את ספירות הצמדים היומיות של גרסת הנתונים הנוכחית (נבנות פעם אחת ומשותפות לכל הסשנים)."""
+    if dataset.get('pair_counts') is not None:  # נבנו כבר בזמן טעינה במקטעים
+        return dataset['pair_counts']
+    return _build_pair_counts(dataset['version'], get_basket_matrix(dataset))
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import streamlit as st
+
+# --- מנוע סלי קנייה (מטריצת עסקאות x מוצרים דלילה) ---
+# המטריצה נבנית פעם אחת לכל גרסה של הנתונים. שורות המטריצה ממוינות לפי זמן תחילת העסקה,
+# כך שטווח תאריכים הוא טווח רציף של שורות, ושאלת "מה נקנה יחד עם X" נענית במכפלות מטריצה-וקטור.
+
+
+class BasketMatrix:
+    """
+    quantities - מטריצת CSR בגודל (עסקאות x מוצרים) עם כמות היחידות של כל מוצר בכל עסקה.
+    presence - אותה מטריצה בערכים בינאריים (האם המוצר הופיע בעסקה).
+    items - שמות המוצרים לפי סדר העמודות.
+    transaction_days - היום של כל שורה (ממוין), לחיתוך לפי טווח תאריכים.
+    """
+
+    def __init__(self, quantities, items, transaction_days):
+        self.quantities = quantities
+        self.presence = sp.csr_matrix(
+            (np.ones_like(quantities.data, dtype=np.float64), quantities.indices, quantities.indptr),
+            shape=quantities.shape
+        )
+        self.items = items
+        self.item_codes = {item: code for code, item in enumerate(items)}
+        self.transaction_days = transaction_days
+
+    @classmethod
+    def from_frame(cls, df):
+        """בונה את המטריצה מטבלת עסקאות ממוינת לפי זמן (Transaction, Item קטגוריאלית, date_time)."""
+        # factorize ממספר את העסקאות לפי סדר ההופעה הראשונה - כלומר לפי זמן תחילת העסקה
+        transaction_codes, transactions = pd.factorize(df['Transaction'])
+        item_codes = df['Item'].cat.codes.to_numpy()
+        quantities = sp.csr_matrix(
+            (np.ones(len(df), dtype=np.float64), (transaction_codes, item_codes)),
+            shape=(len(transactions), len(df['Item'].cat.categories))
+        )
+        quantities.sum_duplicates()  # כמה יחידות מאותו מוצר באותה עסקה מצטברות לכמות אחת
+
+        first_rows = np.unique(transaction_codes, return_index=True)[1]
+        transaction_days = df['date_time'].to_numpy()[first_rows].astype('datetime64[D]')
+        return cls(quantities, [str(item) for item in df['Item'].cat.categories], transaction_days)
+
+    def _rows_in_range(self, start_date, end_date):
+        lo = np.searchsorted(self.transaction_days, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self.transaction_days, np.datetime64(end_date, 'D'), side='right')
+        return lo, hi
+
+    def co_purchased(self, anchor_item, start_date, end_date, n=10):
+        """
+        מוצרים שנקנו יחד עם anchor_item בטווח התאריכים, ממוינים לפי כמות היחידות שנמכרו יחד איתו.
+
+        QuantityWithAnchor - יחידות של המוצר שנמכרו בעסקאות שכללו את anchor_item.
+        TotalSales - סך היחידות של המוצר בטווח.
+        Support - שיעור העסקאות בטווח שכללו את שני המוצרים.
+        Confidence - שיעור העסקאות של anchor_item שכללו גם את המוצר.
+        Lift - Confidence חלקי השיעור הכללי של עסקאות עם המוצר (מעל 1 = נקנים יחד יותר מהמקרי).
+        """
+        columns = ['Item', 'QuantityWithAnchor', 'TotalSales', 'Support', 'Confidence', 'Lift']
+        code = self.item_codes.get(anchor_item)
+        lo, hi = self._rows_in_range(start_date, end_date)
+        if code is None or hi <= lo:
+            return pd.DataFrame(columns=columns)
+
+        quantities = self.quantities[lo:hi]
+        presence = self.presence[lo:hi]
+        anchor = presence[:, code].toarray().ravel()  # וקטור אינדיקטור: האם העסקה כוללת את anchor_item
+        anchor_transactions = anchor.sum()
+        if anchor_transactions == 0:
+            return pd.DataFrame(columns=columns)
+
+        quantity_with_anchor = quantities.T @ anchor
+        transactions_with_anchor = presence.T @ anchor
+        item_transactions = np.bincount(presence.indices, minlength=presence.shape[1])
+        total_sales = np.bincount(quantities.indices, weights=quantities.data, minlength=quantities.shape[1])
+        n_transactions = hi - lo
+
+        result = pd.DataFrame({
+            'Item': self.items,
+            'QuantityWithAnchor': quantity_with_anchor.astype(np.int64),
+            'TotalSales': total_sales.astype(np.int64),
+            'Support': transactions_with_anchor / n_transactions,
+            'Confidence': transactions_with_anchor / anchor_transactions,
+            'Lift': np.divide(
+                transactions_with_anchor * n_transactions,
+                anchor_transactions * item_transactions,
+                out=np.zeros(len(self.items)),
+                where=item_transactions > 0
+            ),
+        })
+        result = result[(result['QuantityWithAnchor'] > 0) & (result['Item'] != anchor_item)]
+        return result.sort_values('QuantityWithAnchor', ascending=False, kind='stable').head(n).reset_index(drop=True)
+
+
+def co_purchase_display_table(co_purchased, anchor_item):
+    """טבלת התצוגה (בעברית) של תוצאת co_purchased - משמשת את הדשבורד ואת דוח ה-PDF."""
+    if co_purchased.empty:
+        return pd.DataFrame()
+    return pd.DataFrame({
+        'מוצר': co_purchased['Item'],
+        f'כמות מכירות עם {anchor_item}': co_purchased['QuantityWithAnchor'],
+        'סה"כ מכירות מוצר': co_purchased['TotalSales'],
+        # הצגת אחוזים ללא נקודה עשרונית + סימן %
+        f'שיעור מכירות עם {anchor_item} (%)': (
+            (co_purchased['QuantityWithAnchor'] / co_purchased['TotalSales']) * 100
+        ).round(0).astype(int).astype(str) + '%',
+        'תמיכה (%)': (co_purchased['Support'] * 100).round(1).astype(str) + '%',
+        'ביטחון (%)': (co_purchased['Confidence'] * 100).round(1).astype(str) + '%',
+        'Lift': co_purchased['Lift'].round(2),
+    })
+
+
+@st.cache_resource(show_spinner="בונה מטריצת סלי קנייה...", max_entries=4)
+def _build_basket_matrix(version, _df):
+    return BasketMatrix.from_frame(_df)
+
+
+def get_basket_matrix(dataset):
+    """מחזיר את מטריצת הסלים של גרסת הנתונים הנוכחית (נבנית פעם אחת ומשותפת לכל הסשנים)."""
+    return _build_basket_matrix(dataset['version'], dataset['df'])
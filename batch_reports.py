@@ -0,0 +1,156 @@
+"""
+מחולל דוחות PDF ללא Streamlit - דוח לכל צירוף של טווח תאריכים x מוצר, במקביל על פני מספר תהליכים.
+
+דוגמאות:
+    python batch_reports.py --out-dir reports
+    python batch_reports.py --items Coffee Bread --ranges 2017-01-01:2017-01-31 2017-02-01:2017-02-28
+    python batch_reports.py --months 2017-01 2017-02 --workers 8
+
+ברירת המחדל: כל המוצרים (ודוח כללי) x כל החודשים שבנתונים.
+תהליכי העבודה נפתחים ב-spawn בכל הפלטפורמות (fork אחרי שה-threads של pandas/pyarrow כבר רצים
+עלול להיתקע). הטבלה עצמה לא מועתקת לכל תהליך: ה-sidecar של Arrow (ראו data_loader) נכתב פעם אחת
+בתהליך הראשי, וכל תהליך ממפה אותו לזיכרון, כך שהדפים משותפים ביניהם.
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from analytics import dashboard_view
+from basket import BasketMatrix, co_purchase_display_table
+from charts import daypart_figure, hourly_figure, monthly_figure, top_items_figure
+from data_loader import ALL_ITEMS_LABEL, read_sales_data
+from report import generate_pdf_report
+from sales_cube import SalesCube
+
+# הנתונים המעובדים של תהליך העבודה (מאותחלים ב-_init_worker)
+_cube = None
+_basket = None
+
+
+def _init_worker(csv_path):
+    """אתחול תהליך עבודה: ממפה את ה-sidecar (שהתהליך הראשי כבר כתב) ובונה ממנו את הקובייה ואת הסלים."""
+    global _cube, _basket
+    df = read_sales_data(csv_path)
+    _cube = SalesCube.from_frame(df)
+    _basket = BasketMatrix.from_frame(df)
+
+
+def report_arguments(cube, basket, start_date, end_date, item=None):
+    """מחשב את כל הקלטים של generate_pdf_report עבור פילטר אחד - אותו חישוב כמו בדשבורד."""
+    view = dashboard_view(cube, basket, start_date, end_date, item)
+    kpis = view['kpis']
+    if kpis['total_items_sold'] == 0:
+        return None
+    return (
+        kpis['unique_transactions'],
+        kpis['total_items_sold'],
+        kpis['unique_items'],
+        kpis['avg_items_per_transaction'],
+        top_items_figure(view['top_items']),
+        hourly_figure(view['hourly']),
+        daypart_figure(view['daypart']),
+        monthly_figure(view['monthly_transactions']),
+        co_purchase_display_table(view['co_purchased'], view['anchor_item']),
+        view['anchor_item'],
+    )
+
+
+def report_file_name(start_date, end_date, item):
+    label = re.sub(r'[^\w.-]+', '_', item or 'all_items').strip('_')
+    return f"Bakery_Sales_Report_{label}_{start_date:%Y%m%d}-{end_date:%Y%m%d}.pdf"
+
+
+def _render_report(job):
+    """תהליך עבודה: בונה דוח אחד וכותב אותו לקובץ. מחזיר (נתיב או None, שגיאה או None)."""
+    start_date, end_date, item, out_dir = job
+    try:
+        args = report_arguments(_cube, _basket, start_date, end_date, item)
+        if args is None:
+            return None, None  # אין מכירות בצירוף הזה - אין דוח
+        pdf = generate_pdf_report(*args).getvalue()  # לפני פתיחת הקובץ - דוח שנכשל לא משאיר קובץ ריק
+        path = os.path.join(out_dir, report_file_name(start_date, end_date, item))
+        with open(path, 'wb') as report_file:
+            report_file.write(pdf)
+        return path, None
+    except Exception as e:
+        return None, f"{item or ALL_ITEMS_LABEL} {start_date}..{end_date}: {e}"
+
+
+def _parse_range(value):
+    start, _, end = value.partition(':')
+    try:
+        return datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"טווח לא חוקי '{value}' (הפורמט: YYYY-MM-DD:YYYY-MM-DD)")
+
+
+def _month_range(month):
+    period = pd.Period(month, freq='M')
+    return period.start_time.date(), period.end_time.date()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="יצירת דוחות PDF למאפייה עבור מטריצה של טווחי תאריכים x מוצרים.")
+    parser.add_argument('--csv', default="bakery_sales_revised.csv", help="קובץ הנתונים")
+    parser.add_argument('--out-dir', default="reports", help="תיקיית הפלט")
+    parser.add_argument('--items', nargs='+', help="מוצרים (ברירת מחדל: כל המוצרים, כולל דוח כללי)")
+    parser.add_argument('--no-overall', action='store_true', help="לא ליצור דוח כללי לכל המוצרים")
+    parser.add_argument('--ranges', nargs='+', type=_parse_range, help="טווחי תאריכים בפורמט START:END")
+    parser.add_argument('--months', nargs='+', help="חודשים בפורמט YYYY-MM (ברירת מחדל: כל החודשים בנתונים)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="מספר תהליכים במקביל")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.csv):
+        print(f"קובץ הנתונים לא נמצא בנתיב: {args.csv}", file=sys.stderr)
+        return 1
+
+    load_started = time.perf_counter()
+    df = read_sales_data(args.csv)  # כותב את ה-sidecar אם אינו עדכני - תהליכי העבודה רק ממפים אותו
+    load_seconds = time.perf_counter() - load_started
+
+    ranges = list(args.ranges or [])
+    months = args.months
+    if not ranges and not months:
+        months = pd.period_range(df['date_time'].min(), df['date_time'].max(), freq='M').strftime('%Y-%m').tolist()
+    ranges += [_month_range(month) for month in months or []]
+
+    items = args.items or sorted(str(item) for item in df['Item'].unique())
+    items = ([] if args.no_overall else [None]) + items
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = [(start_date, end_date, item, args.out_dir) for start_date, end_date in ranges for item in items]
+
+    written, skipped, errors = 0, 0, []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(args.csv,)) as pool:
+        for future in as_completed([pool.submit(_render_report, job) for job in jobs]):
+            path, error = future.result()
+            if error:
+                errors.append(error)
+            elif path:
+                written += 1
+            else:
+                skipped += 1
+    elapsed = time.perf_counter() - started
+
+    print(f"טעינת נתונים: {len(df):,} שורות ב-{load_seconds:.2f} שניות")
+    print(f"דוחות: {written} נכתבו, {skipped} ללא נתונים, {len(errors)} נכשלו "
+          f"({len(jobs)} צירופים, {args.workers} תהליכים)")
+    print(f"זמן: {elapsed:.2f} שניות, {written / elapsed if elapsed else 0:.2f} דוחות לשנייה -> {args.out_dir}")
+    for error in errors:
+        print(f"  שגיאה: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+מדידת ביצועים של חישובי הדשבורד על נתונים סינתטיים בגדלים שונים.
+
+דוגמאות:
+    python benchmark.py                                  # 20K, 200K, 2M שורות
+    python benchmark.py --sizes 20000 5000000 50000000 --repeat 3
+    python benchmark.py --json bench_results.jsonl       # שמירת התוצאות להשוואה בין גרסאות
+
+לכל גודל נמדדים: המימושים הישירים על הטבלה (analytics.py), בניית המבנים המחושבים מראש
+(קובייה, מטריצת סלים) והשאילתה המלאה של העמוד (dashboard_view) - זמן מינימלי וחציוני מכמה חזרות.
+אותן מדידות רצות גם כבדיקות pytest-benchmark (tests/test_benchmark.py), עם השוואה למדידות בסיס שמורות.
+"""
+import argparse
+import datetime
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from basket import BasketMatrix
+from data_loader import build_item_positions, filter_positions, filter_sales, parse_dates
+from sales_cube import SalesCube
+
+# יחידת הזמן של עמודת date_time כפי שהטוען מייצר אותה (תלויה בגרסת pandas) - הטבלה הסינתטית זהה לה
+LOADER_TIMESTAMP_DTYPE = parse_dates(pd.Series(["10/30/2016 9:58"])).dtype
+
+SHIPPED_ROWS = 20_507  # גודל הקובץ המצורף bakery_sales_revised.csv
+DEFAULT_SIZES = [SHIPPED_ROWS, 200_000, 2_000_000]
+
+
+def synthetic_sales(n_rows, n_items=94, days=365, seed=0):
+    """
+    טבלת עסקאות סינתטית במבנה של הקובץ המעובד (ממוינת לפי זמן, Item קטגוריאלית).
+    פופולריות המוצרים לפי התפלגות Zipf, ~2.2 פריטים לעסקה ושעות פעילות 7-20 עם שיא בצהריים.
+    """
+    rng = np.random.default_rng(seed)
+    basket_sizes = rng.geometric(1 / 2.2, size=n_rows // 2 + 1)
+    basket_sizes = basket_sizes[:np.searchsorted(np.cumsum(basket_sizes), n_rows) + 1]
+    transactions = np.repeat(np.arange(1, len(basket_sizes) + 1), basket_sizes)[:n_rows]
+
+    n_transactions = transactions[-1]
+    offsets = np.sort(rng.integers(0, days, size=n_transactions))
+    hours = np.clip(np.round(rng.normal(12.5, 2.5, size=n_transactions)), 7, 20).astype(np.int64)
+    minutes = rng.integers(0, 60, size=n_transactions)
+    start = np.datetime64('2016-10-30', 'm')
+    txn_times = start + (offsets * 1440 + hours * 60 + minutes).astype('timedelta64[m]')
+    txn_times = np.sort(txn_times)  # מזהי עסקאות עולים עם הזמן, כמו בקובץ המקורי
+
+    popularity = 1 / np.arange(1, n_items + 1) ** 1.1
+    items = rng.choice(n_items, size=n_rows, p=popularity / popularity.sum())
+    categories = [f"Item {code:03d}" for code in range(n_items)]
+
+    df = pd.DataFrame({
+        'Transaction': transactions,
+        'Item': pd.Categorical.from_codes(items, categories=categories),
+        'date_time': pd.to_datetime(txn_times[transactions - 1]).astype(LOADER_TIMESTAMP_DTYPE),
+    })
+    df['YearMonth'] = df['date_time'].dt.to_period('M').astype(str)
+    return df
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings)
+
+
+def benchmark_cases(df):
+    """מחזיר רשימה של (שם, פונקציה ללא ארגומנטים) עבור טבלה אחת."""
+    start_date = df['date_time'].iloc[0].date()
+    end_date = df['date_time'].iloc[-1].date()
+    mid_start = start_date + (end_date - start_date) / 4
+    mid_end = end_date - (end_date - start_date) / 4
+    top_item = str(df['Item'].value_counts().index[0])
+    dataset = {
+        'df': df,
+        'timestamps': df['date_time'].to_numpy(),
+        'item_positions': build_item_positions(df['Item']),
+    }
+    cube = SalesCube.from_frame(df)
+    basket = BasketMatrix.from_frame(df)
+    filtered = analytics.filter_sales_frame(df, mid_start, mid_end)
+
+    return [
+        ('filter_sales_frame (mask)', lambda: analytics.filter_sales_frame(df, mid_start, mid_end)),
+        ('filter_positions (searchsorted + item)', lambda: filter_positions(dataset, mid_start, mid_end, top_item)),
+        ('filter_sales (searchsorted)', lambda: filter_sales(dataset, mid_start, mid_end)),
+        ('filter_sales (searchsorted + item)', lambda: filter_sales(dataset, mid_start, mid_end, top_item)),
+        ('compute_kpis', lambda: analytics.compute_kpis(filtered)),
+        ('top_items', lambda: analytics.top_items(filtered)),
+        ('hourly_counts', lambda: analytics.hourly_counts(filtered)),
+        ('monthly_transactions', lambda: analytics.monthly_transactions(filtered)),
+        ('daypart_counts', lambda: analytics.daypart_counts(filtered)),
+        ('co_purchase', lambda: analytics.co_purchase(filtered, top_item)),
+        ('SalesCube.from_frame', lambda: SalesCube.from_frame(df)),
+        ('BasketMatrix.from_frame', lambda: BasketMatrix.from_frame(df)),
+        ('dashboard_view (all items)', lambda: analytics.dashboard_view(cube, basket, mid_start, mid_end)),
+        ('dashboard_view (one item)', lambda: analytics.dashboard_view(cube, basket, mid_start, mid_end, top_item)),
+    ]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="מדידת ביצועים של חישובי הדשבורד על נתונים סינתטיים.")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help="מספרי שורות (עד 50M)")
+    parser.add_argument('--repeat', type=int, default=5, help="מספר חזרות לכל מדידה")
+    parser.add_argument('--only', nargs='+', help="להריץ רק מדידות ששמן מכיל את אחת המחרוזות")
+    parser.add_argument('--json', help="קובץ JSON lines להוספת התוצאות")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for n_rows in args.sizes:
+        df = synthetic_sales(n_rows)
+        print(f"\n{n_rows:,} שורות ({df['Transaction'].iloc[-1]:,} עסקאות)")
+        for name, func in benchmark_cases(df):
+            if args.only and not any(part in name for part in args.only):
+                continue
+            best, median = time_call(func, args.repeat)
+            print(f"  {name:<38} min {best * 1000:10.2f} ms   median {median * 1000:10.2f} ms")
+            results.append({'rows': n_rows, 'case': name, 'min_s': best, 'median_s': median})
+
+    if args.json:
+        stamp = datetime.datetime.now().isoformat(timespec='seconds')
+        with open(args.json, 'a', encoding='utf-8') as output:
+            for result in results:
+                output.write(json.dumps({'timestamp': stamp, **result}) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import plotly.express as px
+
+# --- בניית הגרפים של הדשבורד ---
+# הפונקציות מקבלות את הטבלאות המצטברות ומחזירות אובייקטי Plotly, ללא תלות ב-Streamlit,
+# כך שהדשבורד ומחולל הדוחות (batch_reports.py) מציגים גרפים זהים.
+
+
+def top_items_figure(top_items):
+    """גרף 1: 10 הפריטים הנמכרים ביותר (עמודות Item, Count)."""
+    return px.bar(top_items, x='Item', y='Count',
+                  title="🏆 Top 10 Bestselling Bakery Items",
+                  text='Count',
+                  color_discrete_sequence=['#D2691E'], # צבע שוקולד
+                  labels={'Count': 'מספר מכירות', 'Item': 'פריט'})
+
+
+def hourly_figure(hourly):
+    """גרף 2: התפלגות מכירות לפי שעה ביום (עמודות Hour, Count - כל 24 השעות)."""
+    fig = px.bar(hourly, x='Hour', y='Count',
+                 title="Transactions per Hour of Day",
+                 text='Count',
+                 color_discrete_sequence=['#FFA07A'], # צבע סלמון בהיר
+                 labels={'Count': 'מספר עסקאות', 'Hour': 'שעה'})
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig.update_layout(xaxis_title="שעה ביום", yaxis_title="מספר עסקאות")
+    fig.update_yaxes(range=[0, hourly['Count'].max() * 1.1])
+    fig.update_xaxes(dtick=1, range=[-0.5, 23.5])
+    return fig
+
+
+def monthly_figure(monthly_transactions):
+    """גרף 3: מגמת עסקאות חודשית (עמודות YearMonth, UniqueTransactions)."""
+    fig = px.line(monthly_transactions, x='YearMonth', y='UniqueTransactions',
+                  title="Total Transactions Over Time (Monthly)",
+                  labels={'YearMonth': 'שנה-חודש', 'UniqueTransactions': 'מספר עסקאות ייחודיות'},
+                  markers=True,
+                  line_shape='linear',
+                  color_discrete_sequence=['#8B4513'] # צבע חום אוכף
+                  )
+    fig.update_layout(hovermode="x unified")
+    return fig
+
+
+_TREND_TITLES = {'D': "Daily", 'W': "Weekly", 'M': "Monthly"}
+
+
+def trend_figure(trend, freq):
+    """
+    גרף 3 ברזולוציה משתנה: מגמת עסקאות לפי יום, שבוע או חודש (עמודות Period, UniqueTransactions).
+    סמנים מוצגים רק כשיש מעט נקודות, כדי שגם סדרה ארוכה תישאר קריאה.
+    """
+    fig = px.line(trend, x='Period', y='UniqueTransactions',
+                  title=f"Total Transactions Over Time ({_TREND_TITLES[freq]})",
+                  labels={'Period': 'תקופה', 'UniqueTransactions': 'מספר עסקאות ייחודיות'},
+                  markers=len(trend) <= 60,
+                  line_shape='linear',
+                  color_discrete_sequence=['#8B4513'] # צבע חום אוכף, כמו בגרף החודשי
+                  )
+    fig.update_layout(hovermode="x unified")
+    return fig
+
+
+def forecast_figure(forecast):
+    """
+    גרף 5: ביקוש שעתי בפועל בימים האחרונים והתחזית לימים הבאים (עמודות date_time, Count, Series).
+    """
+    fig = px.line(forecast, x='date_time', y='Count', color='Series',
+                  title="Hourly Demand Forecast",
+                  labels={'date_time': 'תאריך ושעה', 'Count': 'פריטים', 'Series': ''},
+                  line_shape='linear',
+                  color_discrete_sequence=['#8B4513', '#D2691E'] # בפועל בחום אוכף, התחזית בשוקולד
+                  )
+    fig.update_traces(selector={'name': 'תחזית'}, line_dash='dash')
+    fig.update_layout(hovermode="x unified")
+    return fig
+
+
+def daypart_figure(daypart):
+    """
+    גרף 4: התפלגות מכירות לפי חלק ביום (עמודות Daypart, Count). מחזיר None כשאין נתונים.
+    כאשר יש עמודת weekday_weekend, כל חלק יום מפורק לאמצע שבוע / סוף שבוע (טבעת חיצונית).
+    """
+    if daypart.empty:
+        return None
+    if 'weekday_weekend' in daypart.columns:
+        fig = px.sunburst(daypart, path=['Daypart', 'weekday_weekend'], values='Count',
+                          title="Sales by Daypart (Weekday / Weekend)",
+                          color='Daypart',
+                          color_discrete_sequence=px.colors.qualitative.Pastel,
+                          labels={'Count': 'מספר מכירות'})
+        fig.update_traces(textinfo='label+percent root', insidetextorientation='radial')
+        return fig
+    return px.pie(daypart, names='Daypart', values='Count',
+                  title="Sales by Daypart",
+                  hole=0.4,
+                  color_discrete_sequence=px.colors.qualitative.Pastel, # נשאר פסטל
+                  labels={'Count': 'מספר מכירות'})
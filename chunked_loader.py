@@ -0,0 +1,220 @@
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+
+from association_rules import PairCounts
+from basket import BasketMatrix
+from data_loader import ALL_ITEMS_LABEL, REQUIRED_COLUMNS, file_signature, prepare_sales_frame
+from hll import DistinctSketches
+from sales_cube import SalesCube
+
+# --- טעינה במקטעים (out-of-core) עבור קבצי עסקאות גדולים מהזיכרון ---
+# הקובץ (CSV או Parquet) נקרא במקטעים של chunk_rows שורות. כל מקטע מעובד כמו טבלה רגילה
+# (prepare_sales_frame), מקופל לאגרגציות שהדשבורד צריך - קובייה, ספירות צמדים וכמויות יומיות,
+# סקיצות HLL אופציונליות - ונזרק. השורות הגולמיות לא נשמרות, כך שהזיכרון בשיא תלוי בגודל המקטע
+# ובגודל האגרגציות (ימים x שעות x מוצרים, ימים x צמדים), ולא במספר השורות בקובץ.
+#
+# הנחה: השורות של כל עסקה רציפות בקובץ (כך כותבת מערכת הקופה). השורות של העסקה האחרונה
+# במקטע מועברות למקטע הבא, כדי שכל עסקה תיספר במקטע אחד בלבד וספירת העסקאות תישאר מדויקת.
+
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+def _raw_chunks(path, chunk_rows):
+    """קורא את הקובץ במקטעים גולמיים (DataFrame) - Parquet לפי קבוצות שורות, אחרת CSV."""
+    if path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def split_last_transaction(raw, carry=None):
+    """
+    מצרף את השורות שהועברו מהמקטע הקודם (carry) ומפריד את רצף השורות של העסקה האחרונה,
+    שעשויה להימשך במקטע הבא. מחזיר (שורות של עסקאות שלמות, השורות להעברה).
+    """
+    missing = [col_name for col_name in REQUIRED_COLUMNS if col_name not in raw.columns]
+    if missing:
+        raise KeyError(missing[0])
+    if carry is not None and len(carry):
+        raw = pd.concat([carry, raw], ignore_index=True)
+    transactions = raw['Transaction'].to_numpy()
+    changes = np.flatnonzero(transactions[1:] != transactions[:-1])
+    split = changes[-1] + 1 if len(changes) else 0  # תחילת רצף השורות של העסקה האחרונה
+    return raw.iloc[:split], raw.iloc[split:]
+
+
+def iter_transaction_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """מקטעים גולמיים שבהם כל עסקה שלמה: השורות של העסקה האחרונה במקטע עוברות למקטע הבא."""
+    carry = None
+    for raw in _raw_chunks(path, chunk_rows):
+        complete, carry = split_last_transaction(raw, carry)
+        if len(complete):
+            yield complete
+    if carry is not None and len(carry):
+        yield carry
+
+
+class AggregateBuilder:
+    """המצב המצטבר של הטעינה: כל מקטע מעובד מקופל לתוכו ונזרק (משמש גם את tail_follow.py)."""
+
+    def __init__(self, relative_error=None):
+        self.relative_error = relative_error
+        self.items = pd.Index([], dtype=object)  # רשימת המוצרים - מתרחבת בלבד, כדי שקודים קיימים לא ישתנו
+        self.cubes = []  # קוביות שעוד לא אוחדו (מאוחדות בקבוצות כדי לא לשלם על כל מקטע)
+        self.pending_cells = 0
+        self.pair_counts = None
+        self.sketches = []  # כמו הקוביות - סקיצות שעוד לא אוחדו, ממוזגות בקבוצות
+        self.pending_sketch_bytes = 0
+        self.item_sales = pd.Series(dtype=np.int64)
+        self.min_time = None
+        self.max_time = None
+        self.rows = 0
+
+    def add(self, df):
+        # קטגוריות המוצרים של המקטע מיושרות לרשימה המצטברת (מוצרים חדשים נוספים בסוף)
+        new_items = df['Item'].cat.categories.difference(self.items, sort=False)
+        self.items = self.items.append(pd.Index(sorted(new_items), dtype=object))
+        df['Item'] = df['Item'].cat.set_categories(self.items)
+
+        cube = SalesCube.from_frame(df)
+        self.cubes.append(cube)
+        self.pending_cells += len(cube.cells)
+        if self.pending_cells > 2 * len(self.cubes[0].cells):
+            self.cubes = [SalesCube.concat(self.cubes)]
+            self.pending_cells = len(self.cubes[0].cells)
+
+        pair_counts = PairCounts.from_basket(BasketMatrix.from_frame(df), with_quantities=True)
+        if self.pair_counts is None:
+            self.pair_counts = pair_counts
+        else:
+            self.pair_counts.merge(pair_counts)
+
+        if self.relative_error is not None:
+            sketches = DistinctSketches.from_frame(df, self.relative_error)
+            self.sketches.append(sketches)
+            self.pending_sketch_bytes += sketches.nbytes
+            if self.pending_sketch_bytes > 2 * self.sketches[0].nbytes:
+                self.sketches = [DistinctSketches.concat(self.sketches)]
+                self.pending_sketch_bytes = self.sketches[0].nbytes
+
+        counts = df['Item'].value_counts()
+        self.item_sales = self.item_sales.add(counts[counts > 0], fill_value=0)
+        chunk_min, chunk_max = df['date_time'].iloc[0], df['date_time'].iloc[-1]
+        self.min_time = chunk_min if self.min_time is None else min(self.min_time, chunk_min)
+        self.max_time = chunk_max if self.max_time is None else max(self.max_time, chunk_max)
+        self.rows += len(df)
+
+    @classmethod
+    def combine(cls, builders):
+        """
+        מצב אחד מכמה מצבים שנבנו בנפרד (למשל קובץ לכל סניף ויום, ראו partitions.py), ללא קיפול מחדש של
+        השורות. רשימת המוצרים היא האיחוד הממוין; כל עסקה צריכה להופיע במצב אחד בלבד. המקורות לא משתנים.
+        """
+        combined = cls(builders[0].relative_error)
+        combined.items = pd.Index(sorted(set().union(*(builder.items for builder in builders))), dtype=object)
+        combined.cubes = [SalesCube.concat([cube for builder in builders for cube in builder.cubes],
+                                           combined.items)]
+        combined.pending_cells = len(combined.cubes[0].cells)
+        combined.pair_counts = PairCounts.concat([builder.pair_counts for builder in builders], combined.items)
+        if combined.relative_error is not None:
+            combined.sketches = [DistinctSketches.concat(
+                [sketches for builder in builders for sketches in builder.sketches], combined.items)]
+            combined.pending_sketch_bytes = combined.sketches[0].nbytes
+        combined.item_sales = pd.concat([builder.item_sales for builder in builders]).groupby(level=0).sum()
+        combined.min_time = min(builder.min_time for builder in builders)
+        combined.max_time = max(builder.max_time for builder in builders)
+        combined.rows = sum(builder.rows for builder in builders)
+        return combined
+
+    def copy(self):
+        """עותק שקיפול לתוכו אינו משנה את המצב הזה (רשימות וספירות הצמדים מועתקות; השאר מוחלף ולא משתנה)."""
+        copied = copy.copy(self)
+        copied.cubes = list(self.cubes)
+        copied.sketches = list(self.sketches)
+        copied.pair_counts = self.pair_counts.copy() if self.pair_counts is not None else None
+        return copied
+
+    def snapshot(self):
+        """
+        האגרגציות הנוכחיות במבנה של dataset (ללא df, version ו-load_timings).
+        הקובייה והסקיצות מאוחדות כאן; ספירות הצמדים מוחזרות כפי שהן - מיזוג נוסף לתוכן ישנה גם את ה-snapshot.
+        """
+        if self.rows == 0:
+            raise ValueError("לא נמצאו שורות עם תאריך תקין בקובץ")
+        if len(self.cubes) > 1:
+            self.cubes = [SalesCube.concat(self.cubes)]
+            self.pending_cells = len(self.cubes[0].cells)
+        if len(self.sketches) > 1:
+            self.sketches = [DistinctSketches.concat(self.sketches)]
+            self.pending_sketch_bytes = self.sketches[0].nbytes
+        total_item_sales = (self.item_sales.astype(np.int64).sort_values(ascending=False, kind='stable')
+                            .rename_axis('Item').reset_index(name='TotalSales'))
+        total_item_sales['Item'] = total_item_sales['Item'].astype(str)
+        return {
+            'cube': self.cubes[0],
+            'pair_counts': self.pair_counts,
+            'sketches': self.sketches[0] if self.sketches else None,
+            'rows': self.rows,
+            'min_date': self.min_time.date(),
+            'max_date': self.max_time.date(),
+            'total_item_sales': total_item_sales,
+            'all_items_options': [ALL_ITEMS_LABEL] + sorted(total_item_sales['Item'].tolist()),
+        }
+
+
+def read_sales_aggregates(path, chunk_rows=DEFAULT_CHUNK_ROWS, relative_error=None, timings=None):
+    """
+    טוען את הקובץ במקטעים ומחזיר את האגרגציות בלבד (ללא השורות הגולמיות), ללא Streamlit.
+    relative_error - כאשר מוגדר, נבנות גם סקיצות HyperLogLog במיזוג בין המקטעים.
+    timings - מילון אופציונלי שאליו נרשם זמן כל שלב (מצטבר על כל המקטעים) במילישניות.
+    """
+    aggregates = AggregateBuilder(relative_error)
+    chunk_timings = {}
+    started = time.perf_counter()
+    for raw in iter_transaction_chunks(path, chunk_rows):
+        read_ms = (time.perf_counter() - started) * 1000
+        chunk_timings['read_chunks'] = chunk_timings.get('read_chunks', 0) + read_ms
+
+        step_timings = {}
+        df = prepare_sales_frame(raw, step_timings)
+        started = time.perf_counter()
+        if len(df):
+            aggregates.add(df)
+        step_timings['fold_aggregates'] = (time.perf_counter() - started) * 1000
+        for name, ms in step_timings.items():
+            chunk_timings[name] = chunk_timings.get(name, 0) + ms
+        started = time.perf_counter()
+
+    started = time.perf_counter()
+    dataset = aggregates.snapshot()
+    chunk_timings['finalize'] = (time.perf_counter() - started) * 1000
+    if timings is not None:
+        timings.update(chunk_timings)
+    return dataset
+
+
+@st.cache_resource(show_spinner="טוען נתונים במקטעים...", max_entries=2)
+def _load_sales_aggregates(path, signature, chunk_rows, relative_error):
+    load_timings = {}
+    dataset = read_sales_aggregates(path, chunk_rows, relative_error, load_timings)
+    dataset.update({
+        'df': None,  # אין שורות גולמיות בזיכרון - כל המדדים נענים מהאגרגציות
+        'version': (path,) + signature,
+        'load_timings': load_timings,
+    })
+    return dataset
+
+
+def load_sales_aggregates(path, chunk_rows=DEFAULT_CHUNK_ROWS, relative_error=None):
+    """
+    המקבילה של data_loader.load_sales_data למצב הטעינה במקטעים: אותם מפתחות (min_date, max_date,
+    all_items_options, version...) אך df=None, והקובייה, ספירות הצמדים והסקיצות כבר בנויים.
+    """
+    return _load_sales_aggregates(path, file_signature(path), chunk_rows, relative_error)
@@ -1,17 +1,25 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import contextlib
+import datetime
 import os
-import io
 
-# --- ייבוא ספריות לייצוא PDF ---
-# ודא שהתקנת אותן: pip install reportlab kaleido
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT # ליישור טקסט
+from data_loader import load_sales_data
+from chunked_loader import load_sales_aggregates
+from tail_follow import get_followed_sales
+from partitions import is_partitioned_source, load_partitioned_sales
+from sales_cube import get_sales_cube
+from basket import co_purchase_display_table, get_basket_matrix
+from association_rules import get_pair_counts
+from hll import get_distinct_sketches
+from analytics import ResultCache, dashboard_view
+from query_engine import get_duckdb_sales, get_history_cube, load_duckdb_dataset
+from report import get_pdf_report, submit_pdf_report
+from charts import daypart_figure, forecast_figure, hourly_figure, monthly_figure, top_items_figure, trend_figure
+from figure_cache import cached_figure
+from forecast import HISTORY_DAYS, REGRESSION, get_forecast_models
+from profiling import get_profiler
+import settings
 
 # --- הגדרות עמוד ---
 st.set_page_config(
@@ -22,6 +30,9 @@ st.set_page_config(
 
 st.title("📊 Bakery Sales Dashboard")
 
+# מדידת זמנים לכל קטע בעמוד - פעיל רק עם ?profile=1 או DASHBOARD_PROFILE=1 (ראו profiling.py)
+profiler = get_profiler()
+
 # --- CSS מותאם אישית ---
 st.markdown("""
 <style>
@@ -104,49 +115,87 @@ div[data-testid="stMetricLabel"] {
 
 
 # --- טעינת נתונים --- 
-csv_path = "bakery_sales_revised.csv"
-if not os.path.exists(csv_path):
+# הטעינה מתבצעת דרך מטמון משותף (data_loader) ולא בכל ריצה מחדש של הסקריפט.
+# במצב DASHBOARD_INGEST_MODE=chunked הקובץ נקרא במקטעים ונשמרות רק האגרגציות (chunked_loader).
+# במצב מעקב (DASHBOARD_FOLLOW_SECONDS) רק שורות שנוספו לסוף הקובץ מעובדות בכל רענון (tail_follow)
+# מקור שהוא תיקייה או glob של קבצים לפי סניף ותאריך נטען דרך partitions - רק הקבצים של הפילטרים הנבחרים
+csv_path = settings.DATA_SOURCE
+partitioned = is_partitioned_source(csv_path)
+if not partitioned and not os.path.exists(csv_path):
     st.error(f"קובץ הנתונים לא נמצא בנתיב: `{csv_path}`. אנא ודא את הנתיב והרשאות.")
     st.stop()
 
+profiler.begin("load")
 try:
-    df = pd.read_csv(csv_path)
+    relative_error = settings.HLL_RELATIVE_ERROR if settings.DISTINCT_MODE == "approx" else None
+    if partitioned:
+        # הפילטרים נקראים מה-session_state (הקולבקים רצים לפני הסקריפט); בריצה הראשונה - כל הטווח וכל הסניפים
+        dataset = load_partitioned_sales(csv_path, st.session_state.get('start_date'), st.session_state.get('end_date'),
+                                         st.session_state.get('selected_stores') or None, settings.LOAD_WORKERS or None,
+                                         relative_error)
+    elif settings.FOLLOW_SECONDS > 0:
+        followed = get_followed_sales(csv_path, settings.CHUNK_ROWS, relative_error)
+        dataset = followed.dataset
+    elif settings.INGEST_MODE == "chunked":
+        dataset = load_sales_aggregates(csv_path, settings.CHUNK_ROWS, relative_error)
+    elif settings.QUERY_ENGINE == "duckdb":
+        # הקובץ נשאל במקומו ב-DuckDB - בלי טבלת pandas ובלי המבנים שנבנים ממנה (ראו query_engine.py)
+        dataset = load_duckdb_dataset(csv_path)
+    else:
+        dataset = load_sales_data(csv_path)
+except KeyError as e:
+    # --- בדיקת עמודות קריטיות ---
+    st.error(f"חסרה עמודת '{e.args[0]}' בקובץ הנתונים. אנא ודא את מבנה הקובץ.")
+    st.stop()
+except ImportError as e:
+    st.error(f"{e}. ניתן לחזור למנוע pandas עם DASHBOARD_ENGINE=pandas.")
+    st.stop()
 except Exception as e:
     st.error(f"שגיאה בטעינת הקובץ: {e}. ודא שהקובץ תקין ונגיש.")
     st.stop()
 
-# --- בדיקת עמודות קריטיות ---
-required_columns = ['date_time', 'Transaction', 'Item']
-for col_name in required_columns:
-    if col_name not in df.columns:
-        st.error(f"חסרה עמודת '{col_name}' בקובץ הנתונים. אנא ודא את מבנה הקובץ.")
-        st.stop()
-
-# --- עיבוד נתונים ראשוני (לפני פילטור) ---
-df['date_time'] = pd.to_datetime(df['date_time'], errors='coerce')
-df = df.dropna(subset=['date_time']) # הסרת שורות עם תאריכים לא חוקיים
+if dataset is None:
+    # מעקב אחרי קובץ שעדיין ריק (או שהוחלף בקובץ ריק) - ממתינים לשורות ומריצים את העמוד כשהן מגיעות
+    @st.fragment(run_every=settings.FOLLOW_SECONDS)
+    def wait_for_rows():
+        followed.refresh()
+        if followed.dataset is not None:
+            st.rerun()
+        st.info("⏳ קובץ הנתונים עדיין ריק - ממתין לשורות חדשות...")
 
-# קביעת תאריכי ברירת מחדל לפילטר: התאריך המוקדם והמאוחר ביותר בנתונים
-min_overall_date = df['date_time'].min().date()
-max_overall_date = df['date_time'].max().date()
+    wait_for_rows()
+    st.stop()
 
-# יצירת עמודת שנה-חודש (YYYY-MM) לגרף המגמה (לפני פילטור כי נשתמש בזה לסך המכירות הכללי)
-df['YearMonth'] = df['date_time'].dt.to_period('M').astype(str)
+# הנתונים כבר עברו עיבוד ראשוני בזמן הטעינה (תאריכים, עמודות קטגוריאליות, YearMonth)
+df = dataset['df'] # None במצב טעינה במקטעים
+profiler.add_build_timings("טעינה קרה", dataset['load_timings'])
 
-# חישוב סך המכירות לכל מוצר (כדי להשתמש בזה בטבלת הקפה) - נשאר גלובלי לכלל הנתונים
-total_item_sales = df['Item'].value_counts().reset_index()
-total_item_sales.columns = ['Item', 'TotalSales']
+# קביעת תאריכי ברירת מחדל לפילטר: התאריך המוקדם והמאוחר ביותר בנתונים
+min_overall_date = dataset['min_date']
+max_overall_date = dataset['max_date']
 
-# קבלת רשימת המוצרים הייחודיים עבור פילטר המוצר
-all_items_options = ['כל המוצרים'] + sorted(df['Item'].unique().tolist())
+# רשימת המוצרים הייחודיים עבור פילטר המוצר
+all_items_options = dataset['all_items_options']
+# במקור מחולק הרשימה היא של הקבצים שנקראו; מוצר שנבחר קודם נשאר ברשימה (ויוצג "אין נתונים")
+if st.session_state.get('selected_item', 'כל המוצרים') not in all_items_options:
+    all_items_options = all_items_options + [st.session_state.selected_item]
 
+profiler.begin("filters")
 # --- אתחול St.session_state לניהול פילטרים ---
+# כאשר נוספו נתונים, פילטר שהסתיים בתאריך האחרון בנתונים ממשיך להסתיים בתאריך האחרון החדש
+if 'end_date' in st.session_state and st.session_state.get('data_max_date') == st.session_state.end_date:
+    st.session_state.end_date = max_overall_date
+    st.session_state.pop('end_date_widget_key', None) # הווידג'ט ייווצר מחדש עם הערך החדש
+st.session_state.data_max_date = max_overall_date
+
 if 'start_date' not in st.session_state:
     st.session_state.start_date = min_overall_date
 if 'end_date' not in st.session_state:
     st.session_state.end_date = max_overall_date
 if 'selected_item' not in st.session_state: # זה המשתנה שנשתמש בו לסינון
     st.session_state.selected_item = 'כל המוצרים'
+if 'selected_stores' not in st.session_state: # רשימה ריקה = כל הסניפים (רק במקור מחולק)
+    st.session_state.selected_stores = []
 
 
 # --- פונקציות קולבק לעדכון פילטרים ---
@@ -162,352 +211,433 @@ def update_selected_item_filter():
     """מעדכן את st.session_state.selected_item כאשר ה-selectbox משתנה."""
     st.session_state.selected_item = st.session_state.product_selectbox_widget_key
 
+def update_selected_stores():
+    """מעדכן את st.session_state.selected_stores כאשר בחירת הסניפים משתנה."""
+    st.session_state.selected_stores = st.session_state.stores_widget_key
+
+def apply_filters():
+    """במצב טופס: מחיל את כל הפילטרים שבטופס יחד (קולבק יחיד של כפתור "החל פילטרים")."""
+    update_start_date()
+    update_end_date()
+    update_selected_item_filter()
+    if 'stores_widget_key' in st.session_state:
+        update_selected_stores()
+
 
 def reset_filters():
     """מאפס את כל הפילטרים לערכי ברירת המחדל."""
     st.session_state.start_date = min_overall_date
     st.session_state.end_date = max_overall_date
     st.session_state.selected_item = 'כל המוצרים'
+    st.session_state.selected_stores = []
     
     # כדי לוודא שגם הווידג'טים מתאפסים חזותית, נעדכן את ה-keys שלהם
     st.session_state.start_date_widget_key = min_overall_date
-    st.session_state.end_date_widget_key = max_overall_date
+    st.session_state.pop('end_date_widget_key', None) # הווידג'ט ייווצר מחדש עם הערך החדש
     st.session_state.product_selectbox_widget_key = 'כל המוצרים'
+    st.session_state.pop('stores_widget_key', None)
     
     # אין צורך ב-st.rerun() כאן. שינוי st.session_state כבר גורם לריצה מחדש.
     # האזהרה "no-op" תיעלם כי אנחנו לא קוראים ל-rerun בתוך הקולבק.
 
 
 # --- סרגל צד לפילטרים ---
+# במצב טופס (DASHBOARD_FILTER_MODE=form) שינוי בווידג'טים אינו מריץ את העמוד; כל הפילטרים מוחלים יחד
+# בלחיצה על "החל פילטרים" (בטופס הקולבק היחיד מותר על כפתור השליחה)
+filter_form = settings.FILTER_MODE == "form"
+
+def on_filter_change(callback):
+    return None if filter_form else callback
+
 with st.sidebar:
     st.header("🔍 פילטרים")
-    
-    st.write("בחר טווח תאריכים לסינון הנתונים:")
-    st.date_input(
-        "מתאריך",
-        min_value=min_overall_date,
-        max_value=max_overall_date,
-        value=st.session_state.start_date,
-        key="start_date_widget_key", # Key for the widget
-        on_change=update_start_date # Callback for this date input
-    )
-    st.date_input(
-        "עד תאריך",
-        min_value=min_overall_date,
-        max_value=max_overall_date,
-        value=st.session_state.end_date,
-        key="end_date_widget_key", # Key for the widget
-        on_change=update_end_date # Callback for this date input
-    )
 
+    with st.form("filters_form", border=False) if filter_form else contextlib.nullcontext():
+        st.write("בחר טווח תאריכים לסינון הנתונים:")
+        st.date_input(
+            "מתאריך",
+            min_value=min_overall_date,
+            max_value=max_overall_date,
+            value=st.session_state.start_date,
+            key="start_date_widget_key", # Key for the widget
+            on_change=on_filter_change(update_start_date) # Callback for this date input
+        )
+        st.date_input(
+            "עד תאריך",
+            min_value=min_overall_date,
+            max_value=max_overall_date,
+            value=st.session_state.end_date,
+            key="end_date_widget_key", # Key for the widget
+            on_change=on_filter_change(update_end_date) # Callback for this date input
+        )
+
+        st.markdown("---")
+
+        st.write("בחר מוצר לסינון הנתונים:")
+        st.selectbox(
+            "בחר מוצר",
+            options=all_items_options,
+            index=all_items_options.index(st.session_state.selected_item),
+            key="product_selectbox_widget_key", # זה ה-key של הווידג'ט עצמו
+            on_change=on_filter_change(update_selected_item_filter) # הקולבק שירוץ בעת שינוי
+        )
+
+        if 'stores' in dataset:
+            st.write("בחר סניפים לסינון הנתונים:")
+            st.multiselect(
+                "סניפים",
+                options=dataset['stores'],
+                default=st.session_state.selected_stores,
+                key="stores_widget_key",
+                on_change=on_filter_change(update_selected_stores),
+                placeholder="כל הסניפים"
+            )
+            st.caption(f"📂 נקראו {dataset['partitions_read']:,} מתוך {dataset['partitions_total']:,} קבצים")
+            for path, problem in dataset['partitions_skipped']:
+                st.warning(f"⚠️ הקובץ `{path}` דולג: {problem}.")
+
+        if filter_form:
+            st.form_submit_button("החל פילטרים", on_click=apply_filters, type="primary")
+
+    # הבדיקה אחרי כל הווידג'טים: ווידג'ט שלא הוצג בריצה (למשל אחרי st.stop) מאבד את הערך שלו
     if st.session_state.start_date > st.session_state.end_date:
         st.error("שגיאה: תאריך ההתחלה חייב להיות קטן או שווה לתאריך הסיום.")
         st.stop()
-    
-    st.markdown("---")
 
-    st.write("בחר מוצר לסינון הנתונים:")
-    st.selectbox(
-        "בחר מוצר",
-        options=all_items_options,
-        index=all_items_options.index(st.session_state.selected_item),
-        key="product_selectbox_widget_key", # זה ה-key של הווידג'ט עצמו
-        on_change=update_selected_item_filter # הקולבק שירוץ בעת שינוי
-    )
-    
     st.markdown("---")
     
     st.button("איפוס פילטרים", on_click=reset_filters)
 
+    if settings.FOLLOW_SECONDS > 0:
+        # רק הקטע הזה מתרענן במחזוריות; כשנוספו שורות לקובץ (בסשן הזה או באחר) - ריצה מלאה של העמוד
+        @st.fragment(run_every=settings.FOLLOW_SECONDS)
+        def follow_new_rows():
+            followed.refresh()
+            if followed.dataset is None or followed.dataset['version'] != dataset['version']:
+                st.rerun()
+            st.caption(f"🔄 מעקב אחר הקובץ: {followed.rows_read:,} שורות, "
+                       f"נבדק לאחרונה ב-{pd.Timestamp(followed.last_refresh, unit='s'):%H:%M:%S} (UTC)")
+
+        follow_new_rows()
+
     st.markdown("---")
     st.info("💡 טיפ: השתמש בפילטרים לניתוח מעמיק יותר של נתוני המאפייה שלך.")
 
 # --- סינון הנתונים לפי טווח התאריכים ומוצר נבחר ---
-# הסינון מתבצע על בסיס הערכים המעודכנים ב-st.session_state
-df_filtered = df[(df['date_time'].dt.date >= st.session_state.start_date) & 
-                 (df['date_time'].dt.date <= st.session_state.end_date)].copy()
-
-if st.session_state.selected_item != "כל המוצרים":
-    df_filtered = df_filtered[df_filtered['Item'] == st.session_state.selected_item]
+# הסינון מתבצע על בסיס הערכים המעודכנים ב-st.session_state.
+# כל החישובים נמצאים ב-analytics.dashboard_view, כחיתוך של המבנים המחושבים מראש
+# (קובייה מצטברת ומטריצת סלים) - ללא סריקה של העסקאות הגולמיות.
+start_date = st.session_state.start_date
+end_date = st.session_state.end_date
+selected_item = None if st.session_state.selected_item == "כל המוצרים" else st.session_state.selected_item
+
+# --- דילוג על חישובים שהקלטים שלהם לא השתנו ---
+# כל ריצה (שינוי פילטר, כפתור, slider) מריצה את כל הסקריפט. התוצאה של כל קטע נשמרת במטמון אחד לגרסת
+# הנתונים, משותף לכל הסשנים, לפי הקלטים של הקטע; קטע שהקלטים שלו כבר חושבו נלקח ממנו במקום להיות מחושב
+# מחדש (ראו analytics.dashboard_view, cache=). ב-session_state נשמרים רק הפילטרים, לא עותקים של התוצאות.
+@st.cache_resource(max_entries=4)
+def _build_result_cache(version):
+    return ResultCache()
+
+
+result_cache = _build_result_cache(dataset['version'])
+
+
+def section_memo(name, inputs, compute):
+    """תוצאת compute() לקטע name - מהמטמון המשותף אם כבר חושבה עבור אותם inputs (מבנים מושווים לפי זהות)."""
+    return result_cache.get_or_compute((name,) + inputs, compute)
+
+
+profiler.begin("aggregations")
+# במצב מקורב (DASHBOARD_DISTINCT_MODE=approx) העסקאות הייחודיות נספרות ממיזוג סקיצות HyperLogLog יומיות
+sketches = None
+distinct_help = " (ערך מדויק)"
+if settings.DISTINCT_MODE == "approx" and settings.QUERY_ENGINE != "duckdb":
+    sketches = get_distinct_sketches(dataset, settings.HLL_RELATIVE_ERROR)
+    distinct_help = f" (ערך מקורב: HyperLogLog, שגיאה יחסית טיפוסית ±{sketches.relative_error:.1%})"
+
+# גרף המגמה: חודשי (ברירת מחדל) או ברזולוציה משתנה עם דילול (DASHBOARD_TREND_GRANULARITY)
+trend_granularity = None if settings.TREND_GRANULARITY == "month" else settings.TREND_GRANULARITY
+
+engine = None
+if settings.QUERY_ENGINE == "duckdb" and not partitioned:
+    # כל החישובים כשאילתות DuckDB על הקובץ עצמו (ספירה מדויקת תמיד) - ראו query_engine.py
+    try:
+        engine = dataset.get('engine') or get_duckdb_sales(csv_path)
+    except ImportError as e:
+        st.error(f"{e}. ניתן לחזור למנוע pandas עם DASHBOARD_ENGINE=pandas.")
+        st.stop()
+    view = dashboard_view(engine, engine, start_date, end_date, selected_item, timer=profiler.section,
+                          trend_granularity=trend_granularity, max_trend_points=settings.TREND_MAX_POINTS,
+                          cache=result_cache)
+else:
+    # במצב טעינה במקטעים אין מטריצת סלים; "נקנה יחד עם" נענה מהכמויות היומיות שבספירות הצמדים
+    basket = get_basket_matrix(dataset) if df is not None else get_pair_counts(dataset)
+    view = dashboard_view(get_sales_cube(dataset), basket,
+                          start_date, end_date, selected_item, sketches=sketches, timer=profiler.section,
+                          trend_granularity=trend_granularity, max_trend_points=settings.TREND_MAX_POINTS,
+                          cache=result_cache)
+
+# --- KPI's על הנתונים המסוננים ---
+kpis = view['kpis']
+total_items_sold = kpis['total_items_sold']
+unique_transactions = kpis['unique_transactions']
+unique_items = kpis['unique_items']
+avg_items_per_transaction = kpis['avg_items_per_transaction']
 
 # בדיקה אם יש נתונים לאחר הסינון
-if df_filtered.empty:
+if total_items_sold == 0:
     st.warning("אין נתונים בטווח התאריכים או עבור המוצר שנבחרו. אנא בחר פילטרים אחרים.")
+    profiler.finish(start_date=start_date, end_date=end_date, item=selected_item)
     st.stop()
 
-
-# --- חישוב KPI's על הנתונים המסוננים ---
-total_items_sold = len(df_filtered)
-unique_transactions = df_filtered['Transaction'].nunique()
-
-if unique_transactions > 0:
-    avg_items_per_transaction = total_items_sold / unique_transactions
-else:
-    avg_items_per_transaction = 0
-
 # --- KPI's (מדדי ביצועים מרכזיים) ---
+profiler.begin("kpis")
 st.subheader("📈 מדדי מפתח")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric("סה\"כ עסקאות", unique_transactions, help="מספר העסקאות הייחודיות שבוצעו במאפייה בטווח התאריכים והמוצר הנבחרים.")
+    st.metric("סה\"כ עסקאות", unique_transactions, help="מספר העסקאות הייחודיות שבוצעו במאפייה בטווח התאריכים והמוצר הנבחרים." + distinct_help)
 
 with col2:
     st.metric("סה\"כ פריטים שנמכרו", total_items_sold, help="הכמות הכוללת של פריטים שנמכרו בכל העסקאות בטווח התאריכים והמוצר הנבחרים.")
 
 with col3:
-    st.metric("מספר פריטים ייחודיים", df_filtered['Item'].nunique(), help="מספר סוגי הפריטים השונים (מוצרים) הנמכרים במאפייה בטווח התאריכים והמוצר הנבחרים.")
+    st.metric("מספר פריטים ייחודיים", unique_items, help="מספר סוגי הפריטים השונים (מוצרים) הנמכרים במאפייה בטווח התאריכים והמוצר הנבחרים.")
 
 with col4:
-    st.metric("ממוצע פריטים לעסקה", f"{avg_items_per_transaction:.2f}", help="הכמות הממוצעת של פריטים שנמכרו בכל עסקה בטווח התאריכים והמוצר הנבחרים.")
+    st.metric("ממוצע פריטים לעסקה", f"{avg_items_per_transaction:.2f}", help="הכמות הממוצעת של פריטים שנמכרו בכל עסקה בטווח התאריכים והמוצר הנבחרים." + distinct_help)
 
 st.markdown("---")
 
-# --- גרפים (מבוססים על df_filtered) ---
+# --- גרפים (מבוססים על הקובייה המצטברת) ---
+# כל גרף נלקח ממטמון לפי תוכן הטבלה שלו (figure_cache) - גרף שהנתונים שלו לא השתנו לא נבנה מחדש
 
 # גרף 1: 10 הפריטים הנמכרים ביותר
+profiler.begin("top-10")
 st.subheader("🔝 10 הפריטים הנמכרים ביותר")
-top_items = df_filtered['Item'].value_counts().head(10).reset_index()
-top_items.columns = ['Item', 'Count']
-
-fig1 = px.bar(top_items, x='Item', y='Count',
-              title="🏆 Top 10 Bestselling Bakery Items",
-              text='Count',
-              color_discrete_sequence=['#D2691E'], # צבע שוקולד
-              labels={'Count': 'מספר מכירות', 'Item': 'פריט'})
+top_items = view['top_items']
+with profiler.section("figure"):
+    fig1 = cached_figure(top_items_figure, top_items)
 
-st.plotly_chart(fig1, use_container_width=True)
+with profiler.section("plotly_chart"):
+    st.plotly_chart(fig1, use_container_width=True)
 
 st.markdown("---")
 
-# --- טבלה חדשה: מוצרים הנמכרים יחד עם קפה (מבוסס על df_filtered) ---
-st.subheader("☕ מוצרים הנקנים לרוב עם קפה")
-
-if st.session_state.selected_item == "כל המוצרים" or st.session_state.selected_item == "Coffee":
-    if 'Coffee' in df_filtered['Item'].unique():
-        coffee_transactions = df_filtered[df_filtered['Item'] == 'Coffee']['Transaction'].unique()
-        df_coffee_transactions = df_filtered[df_filtered['Transaction'].isin(coffee_transactions)]
-        items_with_coffee = df_coffee_transactions[df_coffee_transactions['Item'] != 'Coffee']['Item']
+# --- טבלה: מוצרים הנקנים יחד עם המוצר הנבחר (מבוסס על מטריצת סלי הקנייה) ---
+# מוצר העוגן הוא המוצר הנבחר בסרגל הצד, או קפה כאשר נבחרו 'כל המוצרים'.
+# הטבלה מחושבת פעם אחת ומשמשת גם את התצוגה וגם את דוח ה-PDF.
+profiler.begin("co-purchase table")
+anchor_item = view['anchor_item']
+st.subheader(f"☕ מוצרים הנקנים לרוב עם {anchor_item}")
+
+co_purchase_table_df = co_purchase_display_table(view['co_purchased'], anchor_item) # ריקה כאשר אין נתונים
+
+if not co_purchase_table_df.empty:
+    st.table(co_purchase_table_df)
+    st.info(f"💡 טבלה זו מציגה את 10 המוצרים הנמכרים ביותר יחד עם {anchor_item}, כולל סך מכירותיהם בטווח ושיעור המכירות עם {anchor_item}. "
+            "תמיכה = שיעור העסקאות שכללו את שני המוצרים, ביטחון = שיעור העסקאות עם המוצר הנבחר שכללו גם את המוצר, "
+            "Lift מעל 1 = המוצרים נקנים יחד יותר מהצפוי במקרה. הנתונים מסוננים לפי טווח התאריכים הנבחר.")
+elif anchor_item in all_items_options:
+    st.info(f"אין נתונים על פריטים אחרים שנמכרו יחד עם {anchor_item} בטווח התאריכים הנבחר.")
+else:
+    st.warning(f"⚠️ הפריט '{anchor_item}' לא נמצא בנתונים, לכן לא ניתן להציג את המוצרים הנמכרים איתו.")
 
-        if not items_with_coffee.empty:
-            top_items_with_coffee_df = items_with_coffee.value_counts().head(10).reset_index()
-            top_items_with_coffee_df.columns = ['מוצר', 'כמות מכירות עם קפה']
 
-            top_items_with_coffee_df = pd.merge(top_items_with_coffee_df, total_item_sales,
-                                                left_on='מוצר', right_on='Item', how='left')
-            top_items_with_coffee_df = top_items_with_coffee_df.drop(columns='Item')
+st.markdown("---")
 
-            # --- שינוי כאן: הצגת אחוזים ללא נקודה עשרונית + סימן % ---
-            top_items_with_coffee_df['שיעור מכירות עם קפה (%)'] = (
-                (top_items_with_coffee_df['כמות מכירות עם קפה'] / top_items_with_coffee_df['TotalSales']) * 100
-            ).round(0).astype(int).astype(str) + '%' # <--- השינוי כאן: המרה לסטרינג והוספת %
+# --- צמדי מוצרים וחוקי אסוציאציה (מתוך ספירות צמדים יומיות שמוזגו לטווח הנבחר) ---
+profiler.begin("association rules")
+st.subheader("🔗 צמדי מוצרים וחוקי אסוציאציה")
+pair_counts = engine if engine is not None else get_pair_counts(dataset) # ב-DuckDB - שאילתות על הקובץ
+rules_item = selected_item # כאשר נבחר מוצר ספציפי, מוצגים רק צמדים וחוקים שכוללים אותו
+
+
+# הסף נבחר בתוך fragment: הזזת ה-slider מריצה מחדש רק את הקטע הזה ולא את כל העמוד
+@st.fragment
+def association_rules_section():
+    min_support_pct = st.slider("תמיכה מינימלית (%)", min_value=0.1, max_value=10.0, value=1.0, step=0.1,
+                                help="שיעור העסקאות המינימלי שבהן הצמד מופיע כדי להיחשב שכיח.")
+    min_support = min_support_pct / 100
+    top_pairs, rules = section_memo(
+        'association rules', (pair_counts, start_date, end_date, min_support, rules_item),
+        lambda: (pair_counts.top_pairs(start_date, end_date, k=10, min_support=min_support, item=rules_item),
+                 pair_counts.rules(start_date, end_date, k=10, min_support=min_support, item=rules_item)))
+
+    pairs_col, rules_col = st.columns(2)
+    with pairs_col:
+        if not top_pairs.empty:
+            st.table(pd.DataFrame({
+                'מוצר א': top_pairs['ItemA'],
+                'מוצר ב': top_pairs['ItemB'],
+                'עסקאות משותפות': top_pairs['Transactions'],
+                'תמיכה (%)': (top_pairs['Support'] * 100).round(1).astype(str) + '%',
+            }))
+        else:
+            st.info("אין צמדי מוצרים שעוברים את סף התמיכה בטווח הנבחר.")
+    with rules_col:
+        if not rules.empty:
+            st.table(pd.DataFrame({
+                'אם נקנה': rules['Antecedent'],
+                'אז נקנה גם': rules['Consequent'],
+                'תמיכה (%)': (rules['Support'] * 100).round(1).astype(str) + '%',
+                'ביטחון (%)': (rules['Confidence'] * 100).round(1).astype(str) + '%',
+                'Lift': rules['Lift'].round(2),
+            }))
+        else:
+            st.info("אין חוקי אסוציאציה שעוברים את סף התמיכה בטווח הנבחר.")
 
-            top_items_with_coffee_df.rename(columns={'TotalSales': 'סה"כ מכירות מוצר'}, inplace=True)
 
-            display_columns_order = ['מוצר', 'כמות מכירות עם קפה', 'סה"כ מכירות מוצר', 'שיעור מכירות עם קפה (%)']
-            st.table(top_items_with_coffee_df[display_columns_order])
-            st.info("💡 טבלה זו מציגה את 10 המוצרים הנמכרים ביותר יחד עם קפה, כולל סך מכירותיהם ושיעור המכירות עם קפה. הנתונים מסוננים לפי טווח התאריכים הנבחר.")
-        else:
-            st.info("אין נתונים על פריטים אחרים שנמכרו יחד עם קפה בטווח התאריכים או עבור המוצר הנבחר.")
-    else:
-        st.warning("⚠️ הפריט 'Coffee' לא נמצא בנתונים בטווח התאריכים או עבור המוצר הנבחר, לכן לא ניתן להציג את המוצרים הנמכרים איתו.")
-else:
-    st.info("טבלת 'מוצרים הנקנים לרוב עם קפה' מוצגת רק כאשר 'כל המוצרים' נבחר או כאשר 'Coffee' נבחר כמוצר ספציפי.")
+association_rules_section()
 
 
 st.markdown("---")
 
 # גרף 2: התפלגות מכירות לפי שעה ביום
+profiler.begin("hourly")
 st.subheader("⏰ התפלגות מכירות לפי שעה ביום")
-df_filtered['Hour'] = df_filtered['date_time'].dt.hour
-hourly = df_filtered.groupby('Hour').size().reset_index(name='Count')
-all_hours = pd.DataFrame({'Hour': range(24)})
-hourly = pd.merge(all_hours, hourly, on='Hour', how='left').fillna(0)
-
-fig2 = px.bar(hourly, x='Hour', y='Count',
-              title="Transactions per Hour of Day",
-              text='Count',
-              color_discrete_sequence=['#FFA07A'], # צבע סלמון בהיר
-              labels={'Count': 'מספר עסקאות', 'Hour': 'שעה'})
-fig2.update_traces(texttemplate='%{text}', textposition='outside')
-fig2.update_layout(xaxis_title="שעה ביום", yaxis_title="מספר עסקאות")
-fig2.update_yaxes(range=[0, hourly['Count'].max() * 1.1]) 
-fig2.update_xaxes(dtick=1, range=[-0.5, 23.5])
-
-st.plotly_chart(fig2, use_container_width=True)
+hourly = view['hourly'] # כולל את כל 24 השעות, גם שעות ללא מכירות
+with profiler.section("figure"):
+    fig2 = cached_figure(hourly_figure, hourly)
+
+with profiler.section("plotly_chart"):
+    st.plotly_chart(fig2, use_container_width=True)
 
 st.markdown("---")
 
 # גרף 3: מגמת עסקאות לפי חודש (שנה-חודש)
-st.subheader("📊 מגמת עסקאות חודשית")
-df_filtered['YearMonth'] = df_filtered['date_time'].dt.to_period('M').astype(str)
-monthly_transactions = df_filtered.groupby('YearMonth')['Transaction'].nunique().reset_index()
-monthly_transactions.columns = ['YearMonth', 'UniqueTransactions']
-monthly_transactions['YearMonth'] = pd.to_datetime(monthly_transactions['YearMonth'])
-monthly_transactions = monthly_transactions.sort_values('YearMonth')
-monthly_transactions['YearMonth'] = monthly_transactions['YearMonth'].dt.strftime('%Y-%m')
-
-fig4 = px.line(monthly_transactions, x='YearMonth', y='UniqueTransactions',
-                title="Total Transactions Over Time (Monthly)",
-                labels={'YearMonth': 'שנה-חודש', 'UniqueTransactions': 'מספר עסקאות ייחודיות'},
-                markers=True,
-                line_shape='linear',
-                color_discrete_sequence=['#8B4513'] # צבע חום אוכף
-                )
-fig4.update_layout(hovermode="x unified")
-st.plotly_chart(fig4, use_container_width=True)
+profiler.begin("monthly")
+# סכום הספירות היומיות של עסקאות ייחודיות (כל עסקה משויכת ליום אחד) - ממוין לפי חודש / תקופה
+if trend_granularity is None:
+    st.subheader("📊 מגמת עסקאות חודשית")
+    monthly_transactions = view['monthly_transactions']
+    with profiler.section("figure"):
+        fig4 = cached_figure(monthly_figure, monthly_transactions)
+else:
+    st.subheader("📊 מגמת עסקאות")
+    transactions_trend = view['transactions_trend']
+    with profiler.section("figure"):
+        fig4 = cached_figure(trend_figure, transactions_trend, view['trend_frequency'])
+with profiler.section("plotly_chart"):
+    st.plotly_chart(fig4, use_container_width=True)
+if trend_granularity is not None and view['trend_points'] > len(transactions_trend):
+    st.caption(f"ℹ️ מוצגות {len(transactions_trend)} מתוך {view['trend_points']} נקודות "
+               "(דילול LTTB ששומר על השיאים והשפלים של המגמה)")
+if sketches is not None:
+    st.caption("ℹ️ מספר העסקאות בכל חודש" + distinct_help)
 
 st.markdown("---")
 
 # גרף 4: התפלגות מכירות לפי חלק ביום (Daypart)
+profiler.begin("daypart")
 st.subheader("🌞 התפלגות מכירות לפי חלק ביום")
-if 'Daypart' not in df_filtered.columns or df_filtered['Daypart'].empty:
-    def get_daypart(hour):
-        if 5 <= hour < 12:
-            return 'Morning'
-        elif 12 <= hour < 17:
-            return 'Afternoon'
-        elif 17 <= hour < 21:
-            return 'Evening'
-        else:
-            return 'Night'
-    df_filtered['Daypart'] = df_filtered['Hour'].apply(get_daypart)
-    
-if 'Daypart' in df_filtered.columns and not df_filtered['Daypart'].empty:
-    daypart = df_filtered['Daypart'].value_counts().reset_index()
-    daypart.columns = ['Daypart', 'Count']
+# חלקי היום (מעמודת period_day, מחושבים פעם אחת בטעינה) עם פירוק לאמצע שבוע / סוף שבוע, מתוך הקובייה
+daypart = view['daypart']
+with profiler.section("figure"):
+    fig3 = cached_figure(daypart_figure, daypart)
+if fig3 is not None:
+    with profiler.section("plotly_chart"):
+        st.plotly_chart(fig3, use_container_width=True)
+else:
+    st.warning("⚠️ אין מכירות לחלוקה לפי חלקי יום בנתונים המסוננים. דלג על גרף זה.")
 
-    fig3 = px.pie(daypart, names='Daypart', values='Count',
-                  title="Sales by Daypart",
-                  hole=0.4,
-                  color_discrete_sequence=px.colors.qualitative.Pastel, # נשאר פסטל
-                  labels={'Count': 'מספר מכירות'})
+st.markdown("---")
 
-    st.plotly_chart(fig3, use_container_width=True)
+# גרף 5: תחזית ביקוש - מהסוף של כל הנתונים (לא לפי טווח התאריכים), לפי פילטר המוצר
+profiler.begin("forecast")
+horizon_days = settings.FORECAST_HORIZON_DAYS
+st.subheader(f"🔮 תחזית ביקוש ל-{horizon_days} הימים הבאים")
+# המודלים מותאמים פעם אחת לכל גרסת נתונים (לכל המוצרים יחד); בכל ריצה מתבצעת רק התחזית
+if partitioned:
+    # ב-dataset רק הקבצים שבטווח ובסניפים הנבחרים - התחזית מחלון האימון בסוף המקור, מכל הסניפים,
+    # כך שהיא לא תלויה בפילטרים ולא מותאמת מחדש בכל שינוי שלהם
+    forecast_dataset = load_partitioned_sales(csv_path, max_overall_date - datetime.timedelta(days=HISTORY_DAYS - 1),
+                                              max_overall_date, None, settings.LOAD_WORKERS or None)
+    forecast_cube = get_sales_cube(forecast_dataset)
+elif dataset.get('engine') is not None:
+    # מצב DuckDB: קובייה של חלון האימון בלבד, מקיבוצי SQL
+    forecast_dataset, forecast_cube = dataset, get_history_cube(dataset, HISTORY_DAYS)
+else:
+    forecast_dataset, forecast_cube = dataset, get_sales_cube(dataset)
+forecasts = get_forecast_models(forecast_dataset, forecast_cube, settings.FORECAST_BUDGET_SECONDS,
+                                settings.FORECAST_WORKERS or None)
+forecast_summary = forecasts.summary(selected_item)
+if forecast_summary['items'] == 0:
+    st.info("אין מספיק מכירות של המוצר בחצי השנה האחרונה בנתונים לחישוב תחזית.")
 else:
-    st.warning("⚠️ אין עמודת 'Daypart' או שהיא ריקה בנתונים המסוננים. דלג על גרף זה.")
+    with profiler.section("predict"):
+        # תלוי רק במוצר (לא בטווח התאריכים) - שינוי תאריכים אינו מריץ את התחזית מחדש
+        forecast_chart = section_memo('forecast', (forecasts, selected_item, horizon_days),
+                                      lambda: forecasts.chart_frame(selected_item, horizon_days))
+    with profiler.section("figure"):
+        fig5 = cached_figure(forecast_figure, forecast_chart)
+    with profiler.section("plotly_chart"):
+        st.plotly_chart(fig5, use_container_width=True)
+
+    predicted = forecast_chart[forecast_chart['Series'] == 'תחזית']
+    daily_forecast = (predicted.groupby(predicted['date_time'].dt.date)['Count'].sum().round().astype(int)
+                      .rename_axis('תאריך').rename('פריטים צפויים').reset_index())
+    st.dataframe(daily_forecast, hide_index=True, use_container_width=True)
+
+    if selected_item is not None:
+        if forecasts.models[forecasts.item_codes[selected_item]] == REGRESSION:
+            model_name = "רגרסיה (שעה, יום בשבוע, סוף שבוע, מגמה)"
+        else:
+            model_name = "עונתי נאיבי (השבוע האחרון)"
+        st.caption(f"מודל: {model_name}. שגיאה ממוצעת בבדיקה על השבועיים האחרונים: "
+                   f"{forecast_summary['mae']:.2f} פריטים לשעה.")
+    else:
+        st.caption(f"סכום התחזיות של {forecast_summary['items']} מוצרים: {forecast_summary['regression_items']} לפי רגרסיה, "
+                   f"השאר עונתי נאיבי (המודל עם השגיאה הנמוכה בבדיקה על השבועיים האחרונים).")
+    if forecasts.timed_out:
+        st.caption(f"⏱️ ההתאמה של {forecasts.timed_out} מוצרים לא הסתיימה בתקציב הזמן - הם מקבלים את המודל העונתי הנאיבי.")
 
 st.markdown("---")
 
-# --- פונקציה ליצירת דוח PDF ---
-def generate_pdf_report(
-    unique_transactions_val,
-    total_items_sold_val,
-    unique_items_val,
-    avg_items_per_transaction_val,
-    fig1_obj, fig2_obj, fig3_obj, fig4_obj,
-    coffee_table_df
-):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    Story = []
-
-    # כותרת הדוח
-    Story.append(Paragraph("דוח מכירות מאפייה - סיכום", styles['h1']))
-    Story.append(Spacer(1, 0.2 * inch))
-
-    # מדדי מפתח (KPIs)
-    Story.append(Paragraph("<b>מדדי מפתח:</b>", styles['h2']))
-    Story.append(Paragraph(f"<b>סה\"כ עסקאות:</b> {unique_transactions_val}", styles['Normal']))
-    Story.append(Paragraph(f"<b>סה\"כ פריטים שנמכרו:</b> {total_items_sold_val}", styles['Normal']))
-    Story.append(Paragraph(f"<b>מספר פריטים ייחודיים:</b> {unique_items_val}", styles['Normal']))
-    Story.append(Paragraph(f"<b>ממוצע פריטים לעסקה:</b> {avg_items_per_transaction_val:.2f}", styles['Normal']))
-    Story.append(Spacer(1, 0.2 * inch))
-
-    # טבלת מוצרים הנקנים עם קפה
-    if not coffee_table_df.empty:
-        Story.append(Paragraph("<b>מוצרים הנקנים לרוב עם קפה:</b>", styles['h2']))
-        # ודא שהעמודה מוצגת כאחוז שלם ב-PDF גם כן
-        coffee_table_df_for_pdf = coffee_table_df.copy()
-        # הערה: עמודת 'שיעור מכירות עם קפה (%)' כבר מכילה את ה-% מהלוגיקה של ה-DataFrame למטה.
-        # לכן כאן רק נמיר אותה לסטרינג אם היא לא כבר כזו, כדי לוודא תאימות לטבלה של reportlab.
-        coffee_table_df_for_pdf['שיעור מכירות עם קפה (%)'] = coffee_table_df_for_pdf['שיעור מכירות עם קפה (%)'].astype(str)
-
-        data = [coffee_table_df_for_pdf.columns.tolist()] + coffee_table_df_for_pdf.values.tolist()
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        Story.append(table)
-        Story.append(Spacer(1, 0.2 * inch))
-
-    # הוספת גרפים כתמונות
-    chart_objects = [
-        ("10 הפריטים הנמכרים ביותר", fig1_obj),
-        ("התפלגות מכירות לפי שעה ביום", fig2_obj),
-        ("מגמת עסקאות חודשית", fig4_obj), # fig4 הוא גרף מגמת העסקאות
-        ("התפלגות מכירות לפי חלק ביום", fig3_obj) # fig3 הוא גרף ה-Daypart
-    ]
-
-    for title, fig_obj in chart_objects:
-        if fig_obj: # ודא שהגרף קיים (במקרה של Daypart שלא תמיד מוצג)
-            img_buffer = io.BytesIO()
-            fig_obj.write_image(img_buffer, format="png", width=800, height=500, scale=2) # הגדל רזולוציה
-            img_buffer.seek(0)
-            
-            img = Image(img_buffer)
-            img.drawHeight = 4 * inch # התאמת גובה התמונה ב-PDF
-            img.drawWidth = 6 * inch  # התאמת רוחב התמונה ב-PDF
-            
-            Story.append(Paragraph(f"<b>{title}:</b>", styles['h2']))
-            Story.append(img)
-            Story.append(Spacer(1, 0.2 * inch))
-
-    doc.build(Story)
-    buffer.seek(0)
-    return buffer
-
 # --- כפתור הורדת דוח PDF בסרגל הצד ---
+profiler.begin("pdf")
 with st.sidebar:
     st.markdown("---")
     st.subheader("🗂️ אפשרויות ייצוא")
 
-    # הכנת נתונים עבור טבלת הקפה ב-PDF (אם רלוונטי)
-    pdf_coffee_table_df = pd.DataFrame() # ברירת מחדל ריקה
-    if st.session_state.selected_item == "כל המוצרים" or st.session_state.selected_item == "Coffee":
-        if 'Coffee' in df_filtered['Item'].unique():
-            coffee_transactions = df_filtered[df_filtered['Item'] == 'Coffee']['Transaction'].unique()
-            df_coffee_transactions = df_filtered[df_filtered['Transaction'].isin(coffee_transactions)]
-            items_with_coffee = df_coffee_transactions[df_coffee_transactions['Item'] != 'Coffee']['Item']
-            if not items_with_coffee.empty:
-                pdf_coffee_table_df = items_with_coffee.value_counts().head(10).reset_index()
-                pdf_coffee_table_df.columns = ['מוצר', 'כמות מכירות עם קפה']
-                pdf_coffee_table_df = pd.merge(pdf_coffee_table_df, total_item_sales,
-                                                left_on='מוצר', right_on='Item', how='left')
-                pdf_coffee_table_df = pdf_coffee_table_df.drop(columns='Item')
-                # --- שינוי כאן: הצגת אחוזים ללא נקודה עשרונית + סימן % גם עבור ה-PDF ---
-                pdf_coffee_table_df['שיעור מכירות עם קפה (%)'] = (
-                    (pdf_coffee_table_df['כמות מכירות עם קפה'] / pdf_coffee_table_df['TotalSales']) * 100
-                ).round(0).astype(int).astype(str) + '%' # <--- השינוי כאן
-                pdf_coffee_table_df.rename(columns={'TotalSales': 'סה"כ מכירות מוצר'}, inplace=True)
-                pdf_coffee_table_df = pdf_coffee_table_df[['מוצר', 'כמות מכירות עם קפה', 'סה"כ מכירות מוצר', 'שיעור מכירות עם קפה (%)']]
-
-
-    # יצירת הדוח PDF כאשר הכפתור נלחץ
+    # הדוח נוצר ברקע (report.py) ונשמר לפי גרסת הנתונים והפילטרים - הורדה חוזרת של אותה תצוגה מיידית
+    report_key = (dataset['version'], start_date, end_date, selected_item, settings.DISTINCT_MODE)
     if st.sidebar.button("הורד דוח PDF"):
-        with st.spinner("יוצר דוח PDF..."):
-            pdf_buffer = generate_pdf_report(
-                unique_transactions,
-                total_items_sold,
-                df_filtered['Item'].nunique(),
-                avg_items_per_transaction,
-                fig1, fig2, fig3, fig4, # העברת אובייקטי הגרפים
-                pdf_coffee_table_df # העברת הדאטהפריים של טבלת הקפה
-            )
-        st.sidebar.download_button(
-            label="לחץ כאן להורדת הדוח",
-            data=pdf_buffer,
-            file_name="Bakery_Sales_Report.pdf",
-            mime="application/pdf"
+        submit_pdf_report(
+            report_key,
+            unique_transactions,
+            total_items_sold,
+            unique_items,
+            avg_items_per_transaction,
+            fig1, fig2, fig3, fig4, # העברת אובייקטי הגרפים
+            co_purchase_table_df, # העברת הדאטהפריים של טבלת המוצרים הנקנים יחד
+            anchor_item
         )
-        st.sidebar.success("דוח PDF נוצר בהצלחה!")
 
+    pdf_future = get_pdf_report(report_key)
+    if pdf_future is not None and not pdf_future.done():
+        # בזמן שהדוח נבנה, רק הקטע הזה מתרענן כל שנייה - שאר הדשבורד נשאר זמין
+        @st.fragment(run_every=1.0)
+        def wait_for_pdf_report():
+            if pdf_future.done():
+                st.rerun() # ריצה מלאה אחת מציגה את כפתור ההורדה ועוצרת את הרענון המחזורי
+            st.info("⏳ יוצר דוח PDF ברקע...")
+
+        wait_for_pdf_report()
+    elif pdf_future is not None:
+        if pdf_future.exception() is not None:
+            st.sidebar.error(f"שגיאה ביצירת דוח PDF: {pdf_future.exception()}")
+        else:
+            st.sidebar.download_button(
+                label="לחץ כאן להורדת הדוח",
+                data=pdf_future.result(),
+                file_name="Bakery_Sales_Report.pdf",
+                mime="application/pdf"
+            )
+            st.sidebar.success("דוח PDF נוצר בהצלחה!")
 
 st.info("🚀 הדשבורד עודכן בהצלחה! המשך לשפר ולנתח את נתוני המאפייה שלך.")
+
+# טבלת הזמנים ותרשים הלהבה בסרגל הצד, וייצוא הריצה ל-JSON lines (במצב מדידה בלבד)
+profiler.finish(start_date=start_date, end_date=end_date, item=selected_item)
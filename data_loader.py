@@ -0,0 +1,269 @@
+import datetime
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import streamlit as st
+
+import settings
+from daypart import day_type_column, daypart_column
+
+# --- שכבת טעינת נתונים עם מטמון ---
+# הקובץ נקרא פעם אחת לכל גרסה שלו (mtime + גודל) ומשותף לכל הסשנים בתהליך.
+# בנוסף נשמר לצידו קובץ Arrow IPC ("sidecar") כדי שהפעלה קרה לא תצטרך לפענח טקסט מחדש.
+# ה-sidecar נקרא במיפוי זיכרון (memory map): עמודות המספרים והתאריכים וקודי העמודות הקטגוריאליות
+# (מספרים שלמים קטנים) הם תצוגות לקריאה בלבד על דפי הקובץ, כך שהטבלה לא מועתקת לזיכרון התהליך,
+# ותהליכים שונים (למשל עובדי batch_reports.py) חולקים את אותם דפים דרך מטמון מערכת ההפעלה.
+
+DATE_FORMAT = "%m/%d/%Y %H:%M"  # הפורמט של עמודת date_time בקובץ (לדוגמה: 10/30/2016 9:58)
+CATEGORICAL_COLUMNS = ['Item', 'period_day', 'weekday_weekend', 'Store']
+REQUIRED_COLUMNS = ['date_time', 'Transaction', 'Item']
+ALL_ITEMS_LABEL = 'כל המוצרים'
+
+_SIGNATURE_KEY = b"source_signature"
+_SIDECAR_FORMAT = 4  # יש להעלות כאשר מבנה הטבלה המעובדת משתנה, כדי שקבצי sidecar ישנים ייבנו מחדש
+
+
+def file_signature(path):
+    """מחזיר חתימת גרסה לקובץ (זמן שינוי וגודל) - משמשת כמפתח למטמון."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def sidecar_path(csv_path):
+    """הנתיב של קובץ ה-Arrow המומר שנשמר לצד קובץ ה-CSV."""
+    return csv_path + ".arrow"
+
+
+def parse_dates(values):
+    """ממיר את עמודת התאריכים עם פורמט מפורש; רק ערכים שלא תאמו לפורמט עוברים הסקה איטית."""
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    mismatched = parsed.isna() & values.notna()
+    if mismatched.any():
+        parsed[mismatched] = pd.to_datetime(values[mismatched], errors='coerce', format='mixed')
+    return parsed
+
+
+def _record_timing(timings, name, started):
+    """מוסיף ל-timings (אם התבקש) את הזמן במילישניות מאז started."""
+    if timings is not None:
+        timings[name] = (time.perf_counter() - started) * 1000
+
+
+def prepare_sales_frame(df, timings=None):
+    """
+    עיבוד ראשוני: בדיקת עמודות, המרת תאריכים, מיון לפי זמן, עמודות קטגוריאליות ועמודת YearMonth (קטגוריאלית),
+    ועמודות Daypart ו-weekday_weekend קטגוריאליות (ראו daypart.py) - מחושבות פעם אחת כאן.
+    timings - מילון אופציונלי שאליו נרשם זמן כל שלב במילישניות (ראו profiling.py).
+    """
+    missing = [col_name for col_name in REQUIRED_COLUMNS if col_name not in df.columns]
+    if missing:
+        raise KeyError(missing[0])
+
+    started = time.perf_counter()
+    if not pd.api.types.is_datetime64_any_dtype(df['date_time']):
+        df['date_time'] = parse_dates(df['date_time'])
+    df = df.dropna(subset=['date_time'])  # הסרת שורות עם תאריכים לא חוקיים
+    _record_timing(timings, 'parse_dates', started)
+
+    started = time.perf_counter()
+    # הטבלה נשמרת ממוינת לפי זמן כדי שסינון טווח תאריכים יהיה חיפוש בינארי (ראו date_range_positions)
+    df = df.sort_values('date_time', kind='stable')
+
+    for col_name in CATEGORICAL_COLUMNS:
+        if col_name in df.columns:
+            df[col_name] = df[col_name].astype('category')
+
+    df['YearMonth'] = df['date_time'].dt.to_period('M').astype(str).astype('category')
+    df = df.reset_index(drop=True)
+    _record_timing(timings, 'sort_and_categoricals', started)
+
+    started = time.perf_counter()
+    df['Daypart'] = daypart_column(df, settings.DAYPART_BOUNDS)
+    df['weekday_weekend'] = day_type_column(df)
+    _record_timing(timings, 'daypart', started)
+    return df
+
+
+def _sidecar_key(signature):
+    """המפתח שנשמר ב-sidecar: גרסת המבנה, גבולות חלקי היום (משפיעים על עמודת Daypart) וחתימת הקובץ."""
+    return repr((_SIDECAR_FORMAT, settings.DAYPART_BOUNDS, signature)).encode()
+
+
+def _mapped_column(column):
+    """
+    עמודת Arrow מהקובץ הממופה כמערך pandas ללא העתקה: מספרים ותאריכים כתצוגת numpy על הבאפר,
+    ועמודות מילון (קטגוריאליות) כ-Categorical שהקודים שלו הם באפר האינדקסים עצמו.
+    עמודות עם ערכים חסרים או מסוג אחר (מחרוזות) מומרות בהעתקה רגילה.
+    """
+    if column.num_chunks != 1 or column.null_count:
+        return column.to_pandas()
+    array = column.chunk(0)
+    if pa.types.is_dictionary(array.type):
+        return pd.Categorical.from_codes(array.indices.to_numpy(zero_copy_only=True),
+                                         categories=array.dictionary.to_pandas(), ordered=array.type.ordered)
+    if pa.types.is_integer(array.type) or pa.types.is_floating(array.type) or pa.types.is_timestamp(array.type):
+        return array.to_numpy(zero_copy_only=True)
+    return column.to_pandas()
+
+
+def _read_sidecar(csv_path, signature):
+    """
+    ממפה לזיכרון את קובץ ה-Arrow אם הוא קיים ונוצר מאותה גרסה של קובץ ה-CSV.
+    הטבלה המוחזרת נשענת על דפי הקובץ (לקריאה בלבד) ומחזיקה את המיפוי פתוח כל עוד היא בשימוש.
+    """
+    path = sidecar_path(csv_path)
+    try:
+        reader = ipc.open_file(pa.memory_map(path, 'r'))
+        if (reader.schema.metadata or {}).get(_SIGNATURE_KEY) != _sidecar_key(signature):
+            return None
+        table = reader.read_all()
+        return pd.DataFrame({name: pd.Series(_mapped_column(column), name=name, copy=False)
+                             for name, column in zip(table.column_names, table.columns)}, copy=False)
+    except (OSError, pa.ArrowException):
+        return None
+
+
+def _write_sidecar(csv_path, signature, df):
+    """
+    שומר את הטבלה המעובדת כקובץ Arrow IPC לא דחוס (כדי שניתן יהיה למפות אותו ישירות), ב-batch אחד.
+    מחזיר האם הכתיבה הצליחה; כישלון (למשל תיקייה לקריאה בלבד) אינו קריטי.
+    """
+    path = sidecar_path(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SIGNATURE_KEY] = _sidecar_key(signature)
+    table = table.replace_schema_metadata(metadata)
+    tmp_path = path + ".tmp"
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(table), 1))
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def build_item_positions(items):
+    """אינדקס מיקומי שורות לכל מוצר (מערכים ממוינים), כדי שסינון מוצר לא ישווה מחרוזות בכל השורות."""
+    codes = items.cat.codes.to_numpy()
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(items.cat.categories) + 1))
+    return {
+        str(category): order[bounds[code]:bounds[code + 1]]
+        for code, category in enumerate(items.cat.categories)
+        if bounds[code + 1] > bounds[code]
+    }
+
+
+def date_range_positions(timestamps, start_date, end_date):
+    """מחזיר את טווח המיקומים [lo, hi) של השורות בין start_date ל-end_date (כולל) במערך זמנים ממוין."""
+    # הגבולות ביחידה של המערך (ns / us לפי גרסת pandas) - אחרת numpy ממיר את כל המערך בכל חיפוש
+    lo = np.searchsorted(timestamps, np.datetime64(start_date, 'D').astype(timestamps.dtype), side='left')
+    hi = np.searchsorted(timestamps, np.datetime64(end_date + datetime.timedelta(days=1), 'D').astype(timestamps.dtype),
+                         side='left')
+    return lo, hi
+
+
+def filter_positions(dataset, start_date, end_date, item=None):
+    """
+    השורות שעוברות את הסינון, ללא גישה לטבלה עצמה: slice רציף של הטבלה הממוינת עבור טווח תאריכים,
+    או מערך מיקומים ממוין (תצוגה על אינדקס המיקומים של המוצר) כאשר נבחר מוצר.
+    """
+    lo, hi = date_range_positions(dataset['timestamps'], start_date, end_date)
+    if item is None:
+        return slice(lo, hi)
+    positions = dataset['item_positions'].get(item, np.empty(0, dtype=np.intp))
+    return positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+
+
+def filter_sales(dataset, start_date, end_date, item=None):
+    """
+    מסנן את העסקאות לפי טווח תאריכים ומוצר (ראו filter_positions).
+    טווח התאריכים הוא חיתוך רציף של הטבלה הממוינת (תצוגה, ללא העתקה); רק השורות של מוצר נבחר מועתקות.
+    """
+    positions = filter_positions(dataset, start_date, end_date, item)
+    if isinstance(positions, slice):
+        return dataset['df'].iloc[positions]
+    return dataset['df'].take(positions)
+
+
+def read_sales_data(csv_path, signature=None, timings=None):
+    """
+    טוען את נתוני המכירות ללא Streamlit: מה-sidecar אם הוא עדכני, אחרת מה-CSV (ושומר sidecar).
+    בשני המקרים, אם ה-sidecar זמין, הטבלה המוחזרת ממופה מהקובץ ולא מוחזקת בזיכרון התהליך.
+    timings - מילון אופציונלי שאליו נרשם זמן כל שלב בטעינה במילישניות.
+    """
+    if signature is None:
+        signature = file_signature(csv_path)
+    started = time.perf_counter()
+    df = _read_sidecar(csv_path, signature)
+    _record_timing(timings, 'read_sidecar', started)
+    if df is not None:
+        return df
+
+    started = time.perf_counter()
+    raw = pd.read_csv(csv_path)
+    _record_timing(timings, 'read_csv', started)
+    df = prepare_sales_frame(raw, timings)
+
+    started = time.perf_counter()
+    if _write_sidecar(csv_path, signature, df):
+        # הטבלה שנבנתה בזיכרון מוחלפת בגרסה הממופה, כדי שגם הטעינה הראשונה תשתף את דפי הקובץ
+        mapped = _read_sidecar(csv_path, signature)
+        if mapped is not None:
+            df = mapped
+    _record_timing(timings, 'write_sidecar', started)
+    return df
+
+
+def build_dataset(df, version, load_timings, date_range=None):
+    """
+    מבנה ה-dataset המשותף של טבלה מעובדת: הטבלה, אינדקסי הסינון, טווח התאריכים ורשימת המוצרים.
+    version - מפתח גרסת הנתונים (למטמונים של הקובייה, מטריצת הסלים והדוחות).
+    date_range - (תאריך ראשון, תאריך אחרון) לפילטר התאריכים; ברירת המחדל: הטווח של הטבלה עצמה.
+    """
+    started = time.perf_counter()
+    if date_range is None:
+        date_range = (df['date_time'].min().date(), df['date_time'].max().date())
+
+    # חישוב סך המכירות לכל מוצר (לטבלת הקפה) - גלובלי לכלל הנתונים
+    total_item_sales = df['Item'].value_counts().reset_index()
+    total_item_sales.columns = ['Item', 'TotalSales']
+    total_item_sales['Item'] = total_item_sales['Item'].astype(str)
+    total_item_sales = total_item_sales[total_item_sales['TotalSales'] > 0]
+
+    dataset = {
+        'df': df,
+        'version': version,
+        'timestamps': df['date_time'].to_numpy(),
+        'item_positions': build_item_positions(df['Item']),
+        'min_date': date_range[0],
+        'max_date': date_range[1],
+        'total_item_sales': total_item_sales,
+        'all_items_options': [ALL_ITEMS_LABEL] + sorted(total_item_sales['Item'].tolist()),
+        'load_timings': load_timings,
+    }
+    _record_timing(load_timings, 'indexes', started)
+    return dataset
+
+
+@st.cache_resource(show_spinner="טוען נתונים...", max_entries=4)
+def _load_sales_data(csv_path, signature):
+    load_timings = {}  # זמני הטעינה הקרה (פעם אחת לכל גרסת קובץ) - מוצגים במצב מדידה
+    df = read_sales_data(csv_path, signature, load_timings)
+    return build_dataset(df, (csv_path,) + signature, load_timings)
+
+
+def load_sales_data(csv_path):
+    """
+    מחזיר את הנתונים המעובדים מתוך מטמון משותף לכל התהליך.
+    המטמון מתבטל אוטומטית כאשר זמן השינוי או הגודל של הקובץ משתנים.
+    האובייקטים המוחזרים משותפים בין הסשנים - אין לשנות אותם במקום.
+    """
+    return _load_sales_data(csv_path, file_signature(csv_path))
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# --- חלקי היום (Daypart) וסוג היום (אמצע שבוע / סוף שבוע) ---
+# שתי העמודות נבנות פעם אחת בזמן הטעינה כעמודות קטגוריאליות (ראו data_loader.prepare_sales_frame).
+# חלק היום נלקח מעמודת period_day שבקובץ כאשר היא קיימת, ואחרת מחושב וקטורית מהשעה לפי גבולות.
+
+DAYPART_ORDER = ['Morning', 'Afternoon', 'Evening', 'Night']
+DEFAULT_DAYPART_BOUNDS = (5, 12, 17, 21)  # תחילת הבוקר, הצהריים, הערב והלילה (שעות)
+DAY_TYPE_ORDER = ['weekday', 'weekend']
+
+# קוד חלק היום לפי מספר הגבולות שעברו (np.searchsorted): לפני הבוקר ואחרי תחילת הלילה - לילה
+_DAYPART_CODES = np.array([3, 0, 1, 2, 3], dtype=np.int8)
+
+
+def parse_daypart_bounds(value):
+    """ממיר מחרוזת כמו "5,12,17,21" לארבעה גבולות שעות עולים."""
+    bounds = tuple(int(part) for part in value.split(','))
+    if len(bounds) != 4 or list(bounds) != sorted(bounds) or not 0 <= bounds[0] <= bounds[3] <= 24:
+        raise ValueError(f"גבולות חלקי היום חייבים להיות ארבע שעות עולות בין 0 ל-24, התקבל: {value}")
+    return bounds
+
+
+def hour_to_daypart(hours, bounds=DEFAULT_DAYPART_BOUNDS):
+    """ממפה מערך שעות לחלקי יום (וקטורית) - Categorical מסודר לפי DAYPART_ORDER."""
+    positions = np.searchsorted(np.asarray(bounds), np.asarray(hours), side='right')
+    return pd.Categorical.from_codes(_DAYPART_CODES[positions], categories=DAYPART_ORDER, ordered=True)
+
+
+def daypart_column(df, bounds=None):
+    """
+    עמודת Daypart לטבלת העסקאות: מתוך period_day כאשר היא קיימת ולא הוגדרו גבולות מפורשים,
+    אחרת לפי שעת העסקה. ערכי period_day לא מוכרים מחושבים גם הם מהשעה.
+    """
+    by_hour = hour_to_daypart(df['date_time'].dt.hour, bounds or DEFAULT_DAYPART_BOUNDS)
+    if bounds is not None or 'period_day' not in df.columns:
+        return pd.Series(by_hour, index=df.index, name='Daypart')
+
+    # המיפוי נעשה על הקטגוריות (ערכים ייחודיים בודדים) ולא על כל השורות
+    period_day = df['period_day'].astype('category')
+    labels = period_day.cat.categories.astype(str).str.strip().str.capitalize()
+    category_codes = np.array([DAYPART_ORDER.index(label) if label in DAYPART_ORDER else -1 for label in labels],
+                              dtype=np.int8)
+    row_codes = period_day.cat.codes.to_numpy()
+    codes = np.where(row_codes >= 0, category_codes[row_codes], -1)
+    codes = np.where(codes >= 0, codes, by_hour.codes)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=DAYPART_ORDER, ordered=True),
+                     index=df.index, name='Daypart')
+
+
+def day_type_column(df):
+    """עמודת weekday_weekend: מהקובץ כאשר היא קיימת, אחרת לפי היום בשבוע (שבת-ראשון = סוף שבוע)."""
+    if 'weekday_weekend' in df.columns:
+        values = df['weekday_weekend'].astype(str).str.strip().str.lower()
+    else:
+        values = pd.Series(np.where(df['date_time'].dt.dayofweek >= 5, 'weekend', 'weekday'), index=df.index)
+    return pd.Series(pd.Categorical(values, categories=DAY_TYPE_ORDER), index=df.index, name='weekday_weekend')
@@ -0,0 +1,35 @@
+import hashlib
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+# --- מטמון גרפים לפי תוכן הנתונים ---
+# בניית גרף ב-Plotly Express (px.bar / px.line / px.sunburst) לוקחת עשרות מילישניות, והיא חוזרת
+# בכל ריצה של הסקריפט גם כשהטבלה המצטברת לא השתנתה (למשל לחיצה על כפתור ה-PDF או הזזת המחוון).
+# הגרף נשמר במטמון משותף לפי hash של הטבלה שממנה נבנה, כך שגרף שלא השתנה נלקח מוכן מהמטמון.
+# במטמון נשמר ה-JSON של הגרף ולא האובייקט: כל קריאה מקבלת Figure חדש משלה (שחזור מ-JSON זול בהרבה
+# מבנייה מחדש), כך ששינוי של גרף בסשן אחד או בדוח לא דולף לסשנים האחרים.
+
+
+def frame_digest(data):
+    """hash של תוכן הטבלה (ערכים, שמות עמודות וסוגים) - זהה לכל טבלה עם אותו תוכן."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(name), str(dtype)) for name, dtype in data.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _build_figure_json(builder_name, digest, args, _builder, _data):
+    return _builder(_data, *args).to_json()
+
+
+def cached_figure(builder, data, *args):
+    """
+    מחזיר עותק של builder(data, *args) מהמטמון כאשר כבר נבנה גרף מטבלה עם אותו תוכן ואותם ארגומנטים.
+    args - ארגומנטים נוספים (hashable) שמשפיעים על הגרף, למשל רזולוציית המגמה.
+    """
+    figure_json = _build_figure_json(f"{builder.__module__}.{builder.__qualname__}", frame_digest(data), args,
+                                     builder, data)
+    return pio.from_json(figure_json)
@@ -0,0 +1,230 @@
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- תחזית ביקוש לפי מוצר (יום x שעה) ---
+# לכל מוצר מותאמים פעם אחת לכל גרסת נתונים (מטמון משותף) שני מודלים קלים על סדרת הביקוש השעתית:
+#   עונתי נאיבי - כל שעה בשבוע הבא כמו אותה שעה ואותו יום בשבוע האחרון;
+#   רגרסיה - פרופיל שעתי, יום בשבוע, פרופיל שעתי נפרד לסוף שבוע (weekday_weekend) ומגמה ליניארית.
+# מטריצת המשתנים זהה לכל המוצרים (אותה רשת ימים x שעות), ולכן הרגרסיה של כל המוצרים היא פתרון אחד
+# של מערכת ridge עם עמודת יעד לכל מוצר. לכל מוצר נבחר המודל עם השגיאה הנמוכה בבדיקה על
+# השבועיים האחרונים (backtest). בריצה של העמוד מתבצעת רק התחזית עצמה (מכפלת מטריצה בווקטור).
+#
+# עם מאות מוצרים ההתאמה מחולקת לקבוצות מוצרים שרצות ב-threads (פעולות numpy משחררות את ה-GIL;
+# בלי fork בתוך שרת Streamlit מרובה threads), בתוך תקציב זמן: קבוצה שלא התחילה עד סוף התקציב לא
+# מותאמת, ומוצריה מקבלים את המודל העונתי הנאיבי (שאינו דורש התאמה).
+
+HISTORY_DAYS = 182  # חלון האימון - חצי השנה האחרונה בנתונים
+HOLDOUT_DAYS = 14  # הימים האחרונים בחלון שעליהם נבחר המודל של כל מוצר
+SEASON_DAYS = 7
+RIDGE = 1e-3  # רגולריזציה (יחסית למספר התצפיות) - המשתנים הקטגוריאליים תלויים זה בזה
+ITEMS_PER_TASK = 64  # מספר המוצרים בכל משימה
+THREAD_POOL_MIN_ITEMS = 200  # מתחת לזה ההתאמה ב-thread הנוכחי מהירה יותר מהפעלת threads
+
+SEASONAL_NAIVE = 'seasonal_naive'
+REGRESSION = 'regression'
+
+
+def demand_array(cube, history_days=HISTORY_DAYS):
+    """
+    סדרת הביקוש מהקובייה: (ימים, מוצרים, מערך [מוצרים, ימים, 24] של פריטים שנמכרו בכל שעה).
+    כוללת את כל הימים בחלון (גם ימים ללא מכירות) ורק מוצרים שנמכרו בחלון.
+    """
+    cells = cube.cells
+    days = pd.date_range(cells['day'].iloc[0], cells['day'].iloc[-1], freq='D')[-history_days:]
+    cells = cells[cells['day'] >= days[0]]
+    counts = cells.groupby('Item', observed=True)['Count'].sum()
+    items = [str(item) for item in counts.index[counts > 0]]
+    item_codes = pd.Categorical(cells['Item'].astype(str), categories=items).codes
+    keep = item_codes >= 0
+
+    day_index = ((cells['day'] - days[0]) // pd.Timedelta(days=1)).to_numpy()
+    flat = (item_codes[keep].astype(np.int64) * len(days) + day_index[keep]) * 24 + cells['hour'].to_numpy()[keep]
+    demand = np.bincount(flat, weights=cells['Count'].to_numpy()[keep], minlength=len(items) * len(days) * 24)
+    return days, items, demand.reshape(len(items), len(days), 24)
+
+
+def design_matrix(days, origin):
+    """
+    משתני הרגרסיה לכל (יום, שעה) ברשת: שעה (24), יום בשבוע (6, יום שני הוא הבסיס),
+    שעה בסוף שבוע (24, שבת-ראשון כמו ב-daypart.day_type_column) ומגמה בשנים מ-origin.
+    """
+    n_rows = len(days) * 24
+    rows = np.arange(n_rows)
+    hours = np.tile(np.arange(24), len(days))
+    weekdays = np.repeat(days.dayofweek.to_numpy(), 24)
+    weekend = weekdays >= 5
+
+    features = np.zeros((n_rows, 24 + 6 + 24 + 1))
+    features[rows, hours] = 1
+    features[rows[weekdays > 0], 24 + weekdays[weekdays > 0] - 1] = 1
+    features[rows[weekend], 30 + hours[weekend]] = 1
+    features[:, -1] = np.repeat(((days - origin) // pd.Timedelta(days=1)).to_numpy() / 365, 24)
+    return features
+
+
+def fit_regression(features, targets, ridge=RIDGE):
+    """מקדמי ridge לכל עמודות היעד יחד (משתנים x מוצרים) - מערכת אחת לכל המוצרים."""
+    gram = features.T @ features + ridge * len(features) * np.eye(features.shape[1])
+    return np.linalg.solve(gram, features.T @ targets)
+
+
+def seasonal_naive(demand, horizon_days):
+    """תחזית עונתית נאיבית: השבוע האחרון חוזר על עצמו ([מוצרים, ימים, 24] -> [מוצרים, אופק, 24])."""
+    last_season = demand[:, -SEASON_DAYS:]
+    return np.take(last_season, np.arange(horizon_days) % SEASON_DAYS, axis=1)
+
+
+def _fit_chunk(columns, inputs, deadline):
+    """
+    מתאים את הרגרסיה לקבוצת מוצרים: מקדמים על כל החלון, ותחזית לימי הבדיקה ממודל שאומן בלעדיהם.
+    None - הגיע תורה של הקבוצה אחרי deadline (perf_counter), והיא לא מותאמת.
+    """
+    if time.perf_counter() > deadline:
+        return None
+    train_features, train_targets, holdout_features, features, targets = inputs
+    holdout_predictions = holdout_features @ fit_regression(train_features, train_targets[:, columns])
+    return columns, fit_regression(features, targets[:, columns]), holdout_predictions
+
+
+class ForecastModels:
+    """
+    המודלים של כל המוצרים לגרסת נתונים אחת, והתחזית עבור מוצר או כלל המוצרים.
+
+    coefficients - מקדמי הרגרסיה (משתנים x מוצרים), NaN למוצרים שלא הותאמו בתקציב הזמן.
+    models - המודל שנבחר לכל מוצר; errors - MAE שעתי בבדיקה לכל מודל ומוצר.
+    """
+
+    def __init__(self, days, items, demand, coefficients, models, errors, fit_seconds):
+        self.days = days
+        self.items = items
+        self.item_codes = {item: code for code, item in enumerate(items)}
+        self.demand = demand
+        # שעות שבהן המוצר נמכר בחלון - הרגרסיה (משתנים משותפים לכל השעות) אינה חוזה מחוץ להן
+        self.active_hours = demand.sum(axis=1) > 0
+        self.coefficients = coefficients
+        self.models = models
+        self.errors = errors
+        self.fit_seconds = fit_seconds
+
+    @property
+    def timed_out(self):
+        """מספר המוצרים שההתאמה שלהם לא הסתיימה בתקציב הזמן."""
+        return int(np.isnan(self.coefficients[0]).sum()) if len(self.items) else 0
+
+    def _codes(self, item):
+        if item is None:
+            return np.arange(len(self.items))
+        code = self.item_codes.get(item)
+        return np.array([], dtype=np.int64) if code is None else np.array([code])
+
+    def predict(self, item=None, horizon_days=7):
+        """
+        תחזית שעתית לאופק (עמודות date_time, Forecast) למוצר, או סכום התחזיות של כל המוצרים (item=None).
+        כל מוצר לפי המודל שנבחר עבורו; ערכים שליליים מאופסים.
+        """
+        future_days = pd.date_range(self.days[-1] + pd.Timedelta(days=1), periods=horizon_days, freq='D')
+        codes = self._codes(item)
+        regression = codes[self.models[codes] == REGRESSION]
+        naive = codes[self.models[codes] != REGRESSION]
+
+        forecast = np.zeros(horizon_days * 24)
+        if len(regression):
+            features = design_matrix(future_days, self.days[0])
+            hourly = np.clip(features @ self.coefficients[:, regression], 0, None)
+            forecast += (hourly * np.tile(self.active_hours[regression].T, (horizon_days, 1))).sum(axis=1)
+        if len(naive):
+            forecast += seasonal_naive(self.demand[naive], horizon_days).sum(axis=0).ravel()
+        timestamps = np.repeat(future_days.to_numpy(), 24) + np.tile(np.arange(24), horizon_days).astype('timedelta64[h]')
+        return pd.DataFrame({'date_time': timestamps, 'Forecast': forecast})
+
+    def history(self, item=None, days=14):
+        """הביקוש השעתי בפועל בימים האחרונים (עמודות date_time, Count)."""
+        codes = self._codes(item)
+        recent = self.days[-days:]
+        counts = self.demand[codes][:, -days:].sum(axis=0).ravel() if len(codes) else np.zeros(len(recent) * 24)
+        timestamps = np.repeat(recent.to_numpy(), 24) + np.tile(np.arange(24), len(recent)).astype('timedelta64[h]')
+        return pd.DataFrame({'date_time': timestamps, 'Count': counts})
+
+    def chart_frame(self, item=None, horizon_days=7, history_days=14):
+        """הביקוש בפועל והתחזית בטבלה אחת לגרף (עמודות date_time, Count, Series)."""
+        history = self.history(item, history_days).assign(Series='בפועל')
+        forecast = self.predict(item, horizon_days).rename(columns={'Forecast': 'Count'}).assign(Series='תחזית')
+        return pd.concat([history, forecast], ignore_index=True)
+
+    def summary(self, item=None):
+        """המודל והשגיאה בבדיקה: למוצר - המודל שנבחר; לכלל המוצרים - מספר המוצרים בכל מודל."""
+        codes = self._codes(item)
+        chosen = self.models[codes]
+        return {
+            'items': len(codes),
+            'regression_items': int((chosen == REGRESSION).sum()),
+            'mae': float(np.where(chosen == REGRESSION, self.errors[REGRESSION][codes],
+                                  self.errors[SEASONAL_NAIVE][codes]).sum()) if len(codes) else 0.0,
+        }
+
+
+def fit_forecast_models(cube, budget_seconds=2.0, workers=None, history_days=HISTORY_DAYS):
+    """
+    מתאים את המודלים לכל המוצרים בקובייה, ללא Streamlit.
+    budget_seconds - תקציב הזמן להתאמת הרגרסיה; מוצרים שלא הסתיימו בו נשארים עם המודל הנאיבי.
+    workers - מספר ה-threads להתאמה (ברירת מחדל: מספר הליבות); 1 - ב-thread הנוכחי.
+    """
+    started = time.perf_counter()
+    days, items, demand = demand_array(cube, history_days)
+    n_items = len(items)
+    coefficients = np.full((55, n_items), np.nan)
+    models = np.full(n_items, SEASONAL_NAIVE, dtype=object)
+    errors = {SEASONAL_NAIVE: np.zeros(n_items), REGRESSION: np.full(n_items, np.inf)}
+    if n_items == 0 or len(days) < HOLDOUT_DAYS + SEASON_DAYS:
+        return ForecastModels(days, items, demand, coefficients, models, errors, time.perf_counter() - started)
+
+    # בדיקה: המודלים שאומנו על החלון ללא הימים האחרונים חוזים את הימים האחרונים
+    train_demand, holdout_demand = demand[:, :-HOLDOUT_DAYS], demand[:, -HOLDOUT_DAYS:]
+    holdout_targets = holdout_demand.reshape(n_items, -1).T
+    # השעות הפעילות נקבעות מימי האימון בלבד - כמו בתחזית אמיתית, שבה ימי הבדיקה עוד לא ידועים
+    holdout_active = np.tile((train_demand.sum(axis=1) > 0).T, (HOLDOUT_DAYS, 1))
+    naive_holdout = seasonal_naive(train_demand, HOLDOUT_DAYS).reshape(n_items, -1).T
+    errors[SEASONAL_NAIVE] = np.abs(naive_holdout - holdout_targets).mean(axis=0)
+
+    inputs = (
+        design_matrix(days[:-HOLDOUT_DAYS], days[0]),
+        train_demand.reshape(n_items, -1).T,
+        design_matrix(days[-HOLDOUT_DAYS:], days[0]),
+        design_matrix(days, days[0]),
+        demand.reshape(n_items, -1).T,
+    )
+    chunks = np.array_split(np.arange(n_items), math.ceil(n_items / ITEMS_PER_TASK))
+    deadline = started + budget_seconds
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and n_items >= THREAD_POOL_MIN_ITEMS and len(chunks) > 1:
+        # הקלטים משותפים ל-threads ללא העתקה; כשהפונקציה חוזרת אף thread כבר לא רץ (משימה אחת לכל היותר
+        # חורגת מהתקציב, ומשימות שלא התחילו בזמן חוזרות מיד)
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            results = list(pool.map(lambda chunk: _fit_chunk(chunk, inputs, deadline), chunks))
+    else:
+        results = [_fit_chunk(chunk, inputs, deadline) for chunk in chunks]
+    results = [result for result in results if result is not None]
+
+    for columns, chunk_coefficients, holdout_predictions in results:
+        coefficients[:, columns] = chunk_coefficients
+        predictions = np.clip(holdout_predictions, 0, None) * holdout_active[:, columns]
+        errors[REGRESSION][columns] = np.abs(predictions - holdout_targets[:, columns]).mean(axis=0)
+    models[errors[REGRESSION] < errors[SEASONAL_NAIVE]] = REGRESSION
+    return ForecastModels(days, items, demand, coefficients, models, errors, time.perf_counter() - started)
+
+
+@st.cache_resource(show_spinner="מתאים מודלי תחזית...", max_entries=4)
+def _build_forecast_models(version, budget_seconds, workers, _cube):
+    return fit_forecast_models(_cube, budget_seconds, workers)
+
+
+def get_forecast_models(dataset, cube, budget_seconds=2.0, workers=None):
+    """מחזיר את מודלי התחזית של גרסת הנתונים הנוכחית (מותאמים פעם אחת ומשותפים לכל הסשנים)."""
+    return _build_forecast_models(dataset['version'], budget_seconds, workers, cube)
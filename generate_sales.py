@@ -0,0 +1,211 @@
+"""
+מחולל נתוני מכירות סינתטיים במבנה של bakery_sales_revised.csv, בכל גודל (עד מאות מיליוני שורות).
+
+דוגמאות:
+    python generate_sales.py synthetic_10m.csv --rows 10000000
+    python generate_sales.py sales/synthetic.parquet --rows 200000000 --days 730
+    python generate_sales.py synthetic_skewed.csv --rows 2000000 --skew 1.4 --seasonality 0.3
+
+העמודות: Transaction, Item, date_time, period_day, weekday_weekend. הנתונים נוצרים ונכתבים במקטעים
+של ימים רצופים (streaming), כך שהזיכרון תלוי בגודל המקטע (--chunk-rows) ולא בגודל הקובץ.
+ההתפלגויות דומות לקובץ המקורי: פופולריות מוצרים לפי Zipf (קפה ולחם בראש), סל של ~2.2 פריטים,
+פרופיל שעתי עם שיא בבוקר ובצהריים (מאוחר יותר בסוף שבוע), יותר עסקאות בסוף שבוע ועונתיות שנתית.
+מספר השורות בפועל קרוב למבוקש (מספר העסקאות בכל יום מוגרל).
+
+קובץ CSV נטען ישירות (DASHBOARD_DATA_SOURCE=synthetic_10m.csv); קובץ Parquet נטען כמקור מחולק -
+תיקייה או תבנית glob (DASHBOARD_DATA_SOURCE="sales/*.parquet", ראו partitions.py).
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from daypart import DAY_TYPE_ORDER, DEFAULT_DAYPART_BOUNDS
+
+# המוצרים הנפוצים בקובץ המקורי, לפי סדר הפופולריות; מעבר להם - "Item NNN"
+BAKERY_ITEMS = [
+    'Coffee', 'Bread', 'Tea', 'Cake', 'Pastry', 'Sandwich', 'Medialuna', 'Hot chocolate', 'Cookies',
+    'Brownie', 'Farm House', 'Muffin', 'Alfajores', 'Juice', 'Soup', 'Scone', 'Toast', 'Scandinavian',
+    'Truffles', 'Coke', 'Spanish Brunch', 'Baguette', 'Fudge', 'Jam', 'Tiffin', 'Mineral water',
+    'Jammie Dodgers', 'Chicken Stew', 'Hearty & Seasonal', 'Salad',
+]
+
+PERIOD_DAY_VALUES = ['morning', 'afternoon', 'evening', 'night']  # כמו בעמודת period_day של הקובץ
+MEAN_BASKET = 2.2  # פריטים לעסקה בממוצע
+MAX_BASKET = 12
+WEEKDAY_FACTORS = np.array([0.9, 0.9, 0.95, 1.0, 1.15, 1.45, 1.3])  # שני..ראשון - סוף שבוע עמוס יותר
+
+# משקל כל שעה ביום (0-23): פתיחה ב-7, שיא בבוקר ובצהריים, מעט עסקאות בערב
+WEEKDAY_HOURS = np.array([0, 0, 0, 0, 0, 0, 0, 2, 6, 10, 12, 13, 13, 12, 10, 8, 6, 4, 2, 1, 1, 0.5, 0.2, 0])
+WEEKEND_HOURS = np.array([0, 0, 0, 0, 0, 0, 0, 0.5, 2, 6, 11, 14, 15, 14, 12, 9, 6, 4, 2, 1, 1, 0.5, 0.2, 0])
+
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def item_names(n_items):
+    """שמות המוצרים: המוצרים האמיתיים לפי סדר, ואחריהם "Item NNN"."""
+    return BAKERY_ITEMS[:n_items] + [f"Item {code:03d}" for code in range(len(BAKERY_ITEMS), n_items)]
+
+
+def _period_day_codes():
+    """קוד period_day לכל שעה (0-23), לפי גבולות חלקי היום שבברירת המחדל של הדשבורד."""
+    positions = np.searchsorted(np.asarray(DEFAULT_DAYPART_BOUNDS), np.arange(24), side='right')
+    return np.array([3, 0, 1, 2, 3], dtype=np.int8)[positions]
+
+
+def daily_transactions(days, n_rows, seasonality, rng):
+    """מספר העסקאות בכל יום: יום בשבוע x עונתיות שנתית (שיא בחורף), עם רעש פואסוני."""
+    weekly = WEEKDAY_FACTORS[days.dayofweek.to_numpy()]
+    yearly = 1 + seasonality * np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 15) / 365.25)
+    weights = weekly * yearly
+    return rng.poisson(n_rows / MEAN_BASKET * weights / weights.sum())
+
+
+def _minute_labels(days):
+    """date_time כטקסט לכל דקה בימים (כמו בקובץ: 10/30/2016 9:58) - דקה i היא days[i // 1440]."""
+    minutes = [f"{hour}:{minute:02d}" for hour in range(24) for minute in range(60)]
+    return [f"{day.month}/{day.day}/{day.year} {minute}" for day in days for minute in minutes]
+
+
+def sales_batches(n_rows, days=365, n_items=94, start='2016-10-30', skew=1.1, seasonality=0.15, seed=0,
+                  chunk_rows=DEFAULT_CHUNK_ROWS, timestamps_as_text=True):
+    """
+    מייצר את העסקאות כ-pyarrow.RecordBatch לפי סדר הזמן, מקטע של ימים רצופים בכל פעם (~chunk_rows שורות).
+    timestamps_as_text - date_time כטקסט בפורמט הקובץ (ל-CSV), אחרת timestamp (ל-Parquet).
+    העמודות הטקסטואליות הן dictionary arrays (הכותב מחליט אם לפענח אותן).
+    """
+    rng = np.random.default_rng(seed)
+    all_days = pd.date_range(start, periods=days, freq='D')
+    txn_counts = daily_transactions(all_days, n_rows, seasonality, rng)
+    names = pa.array(item_names(n_items))
+    popularity = 1 / np.arange(1, n_items + 1) ** skew
+    item_cdf = np.cumsum(popularity) / popularity.sum()
+    hour_cdfs = [np.cumsum(profile) / profile.sum() for profile in (WEEKDAY_HOURS, WEEKEND_HOURS)]
+    period_codes = _period_day_codes()
+    period_values, day_types = pa.array(PERIOD_DAY_VALUES), pa.array(DAY_TYPE_ORDER)
+
+    days_per_chunk = max(1, int(chunk_rows / max(n_rows / days, 1)))
+    next_transaction = 1
+    rows_left = n_rows
+    for first in range(0, days, days_per_chunk):
+        if rows_left <= 0:
+            break
+        chunk_days = all_days[first:first + days_per_chunk]
+        counts = txn_counts[first:first + days_per_chunk]
+        n_transactions = int(counts.sum())
+        if n_transactions == 0:
+            continue
+
+        # זמן כל עסקה: יום, שעה לפי הפרופיל של אמצע שבוע / סוף שבוע, ודקה; מזהי העסקאות עולים עם הזמן
+        txn_day = np.repeat(np.arange(len(chunk_days)), counts)
+        weekend = chunk_days.dayofweek.to_numpy()[txn_day] >= 5
+        hours = np.minimum(np.where(weekend,
+                                    np.searchsorted(hour_cdfs[1], rng.random(n_transactions), side='right'),
+                                    np.searchsorted(hour_cdfs[0], rng.random(n_transactions), side='right')), 23)
+        txn_minute = np.sort(txn_day * 1440 + hours * 60 + rng.integers(0, 60, n_transactions))
+
+        basket_sizes = np.minimum(rng.geometric(1 / MEAN_BASKET, n_transactions), MAX_BASKET)
+        if basket_sizes.sum() > rows_left:  # המקטע האחרון נחתך במספר השורות המבוקש
+            n_transactions = int(np.searchsorted(np.cumsum(basket_sizes), rows_left)) + 1
+            basket_sizes, txn_minute = basket_sizes[:n_transactions], txn_minute[:n_transactions]
+            basket_sizes[-1] -= basket_sizes.sum() - rows_left
+        row_txn = np.repeat(np.arange(n_transactions), basket_sizes)
+        row_minute = txn_minute[row_txn]
+        row_day = row_minute // 1440
+        items = np.minimum(np.searchsorted(item_cdf, rng.random(len(row_txn)), side='right'), n_items - 1)
+
+        if timestamps_as_text:
+            date_time = pa.DictionaryArray.from_arrays(pa.array(row_minute.astype(np.int32)),
+                                                       pa.array(_minute_labels(chunk_days)))
+        else:
+            date_time = pa.array(np.datetime64(chunk_days[0], 's') + (row_minute * 60).astype('timedelta64[s]'))
+        yield pa.RecordBatch.from_arrays([
+            pa.array(row_txn + next_transaction),
+            pa.DictionaryArray.from_arrays(pa.array(items.astype(np.int32)), names),
+            date_time,
+            pa.DictionaryArray.from_arrays(pa.array(period_codes[(row_minute // 60) % 24]), period_values),
+            pa.DictionaryArray.from_arrays(
+                pa.array((chunk_days.dayofweek.to_numpy()[row_day] >= 5).astype(np.int8)), day_types),
+        ], names=['Transaction', 'Item', 'date_time', 'period_day', 'weekday_weekend'])
+        next_transaction += n_transactions
+        rows_left -= len(row_txn)
+
+
+def _decoded(batch):
+    """עמודות dictionary כטקסט רגיל (כותב ה-CSV)."""
+    columns = [column.dictionary_decode() if pa.types.is_dictionary(column.type) else column
+               for column in batch.columns]
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+
+def write_sales(path, n_rows, **options):
+    """
+    כותב את הנתונים הסינתטיים ל-path (CSV או Parquet לפי הסיומת), מקטע אחר מקטע.
+    options - כמו ב-sales_batches. מחזיר (מספר שורות, מספר עסקאות).
+    """
+    parquet = path.endswith('.parquet')
+    batches = sales_batches(n_rows, timestamps_as_text=not parquet, **options)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    writer = None
+    rows = transactions = 0
+    try:
+        for batch in batches:
+            if parquet:
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, batch.schema)
+                writer.write_batch(batch)
+            else:
+                batch = _decoded(batch)
+                if writer is None:
+                    writer = pa_csv.CSVWriter(tmp_path, batch.schema,
+                                              write_options=pa_csv.WriteOptions(quoting_style='none'))
+                writer.write_batch(batch)
+            rows += batch.num_rows
+            transactions = batch.column(0)[-1].as_py()
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("לא נוצרו שורות - בדוק את --rows ו---days")
+    os.replace(tmp_path, path)  # קובץ חלקי לא נשאר בנתיב היעד אם הכתיבה נקטעה
+    return rows, transactions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="מחולל נתוני מכירות סינתטיים במבנה של קובץ המאפייה.")
+    parser.add_argument('path', help="קובץ היעד (.csv או .parquet)")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="מספר השורות (בקירוב; ברירת מחדל: 1M)")
+    parser.add_argument('--days', type=int, default=365, help="מספר הימים, החל מ---start")
+    parser.add_argument('--start', default='2016-10-30', help="התאריך הראשון (YYYY-MM-DD)")
+    parser.add_argument('--items', type=int, default=94, help="מספר המוצרים")
+    parser.add_argument('--skew', type=float, default=1.1, help="מעריך Zipf לפופולריות המוצרים (גבוה = מרוכז יותר)")
+    parser.add_argument('--seasonality', type=float, default=0.15, help="משרעת העונתיות השנתית (0 = ללא)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="שורות בכל מקטע (קובע את הזיכרון)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.path.endswith(('.csv', '.parquet')):
+        print("סיומת הקובץ חייבת להיות .csv או .parquet", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    rows, transactions = write_sales(
+        args.path, args.rows, days=args.days, n_items=args.items, start=datetime.date.fromisoformat(args.start),
+        skew=args.skew, seasonality=args.seasonality, seed=args.seed, chunk_rows=args.chunk_rows)
+    print(f"{args.path}: {rows:,} שורות, {transactions:,} עסקאות, "
+          f"{os.path.getsize(args.path) / 2**20:,.1f} MB ב-{time.perf_counter() - started:.1f} שניות")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
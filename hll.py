@@ -0,0 +1,226 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# --- ספירת עסקאות ייחודיות מקורבת (HyperLogLog) ---
+# לכל יום (ולכל מוצר בכל יום) נשמר סקיצה של m רגיסטרים. סקיצות ניתנות למיזוג בעזרת max,
+# כך שמספר העסקאות הייחודיות בכל טווח מתקבל ממיזוג הסקיצות היומיות - בלי לגבב מחדש אף שורה.
+# השגיאה היחסית הטיפוסית היא כ-1.04/sqrt(m).
+#
+# סקיצות היום נשמרות צפופות (m בתים לכל יום). לצמד (יום, מוצר) יש בדרך כלל עסקאות מעטות בהרבה מ-m,
+# ולכן הסקיצות שלו נשמרות דלילות: רק הרגיסטרים שאינם אפס (מיקום ודירוג, 3 בתים לכל אחד), ברשימה
+# אחת לכל הצמדים (כמו CSR). שורות צפופות נבנות רק לצמדים שבטווח ובמוצר הנבחרים.
+
+
+def precision_for_error(relative_error):
+    """מספר ביטי האינדקס (p) הדרוש כדי ש-1.04/sqrt(2^p) לא יעלה על השגיאה המבוקשת."""
+    p = math.ceil(math.log2((1.04 / relative_error) ** 2))
+    return min(max(p, 4), 16)
+
+
+def standard_error(p):
+    return 1.04 / math.sqrt(1 << p)
+
+
+def _bit_length(values):
+    """אורך בביטים של מערך uint64 (וקטורי ומדויק: כל חצי של 32 ביט מיוצג במדויק ב-float64)."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        high_length = np.where(high > 0, np.floor(np.log2(high)) + 33, 0)
+        low_length = np.where(low > 0, np.floor(np.log2(low)) + 1, 0)
+    return np.where(high > 0, high_length, low_length).astype(np.int64)
+
+
+def register_updates(values, p):
+    """מחזיר לכל ערך את אינדקס הרגיסטר ואת הדירוג (מיקום הביט הדלוק הראשון) לפי גיבוב 64 ביט."""
+    hashes = pd.util.hash_array(np.asarray(values))
+    remaining_bits = 64 - p
+    index = (hashes >> np.uint64(remaining_bits)).astype(np.int64)
+    rest = hashes & np.uint64((1 << remaining_bits) - 1)
+    rank = (remaining_bits - _bit_length(rest) + 1).astype(np.uint8)
+    return index, rank
+
+
+def estimate(registers):
+    """אומדן מספר הערכים הייחודיים מתוך סקיצה אחת או יותר (שורה לכל סקיצה)."""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    # תיקון לטווח הקטן: ספירה לינארית כל עוד יש רגיסטרים ריקים
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def build_registers(keys, values, n_keys, p):
+    """בונה מטריצת רגיסטרים (n_keys x 2^p) מתוך זוגות (מפתח, ערך)."""
+    registers = np.zeros((n_keys, 1 << p), dtype=np.uint8)
+    index, rank = register_updates(values, p)
+    np.maximum.at(registers, (keys, index), rank)
+    return registers
+
+
+def sparse_registers(keys, index, rank, n_keys, p):
+    """
+    רגיסטרים דלילים מתוך עדכונים (מפתח, מיקום רגיסטר, דירוג): הדירוג המרבי לכל (מפתח, רגיסטר).
+    מחזיר (offsets באורך n_keys + 1, מיקומי הרגיסטרים, הדירוגים) - הרשומות של מפתח k בטווח
+    offsets[k]:offsets[k + 1], ממוינות לפי מפתח ומיקום.
+    """
+    flat = keys.astype(np.int64) << p | index.astype(np.int64)
+    order = np.argsort(flat, kind='stable')
+    flat, rank = flat[order], rank[order]
+    if len(flat):
+        starts = np.flatnonzero(np.r_[True, flat[1:] != flat[:-1]])
+        rank = np.maximum.reduceat(rank, starts)
+        flat = flat[starts]
+    offsets = np.searchsorted(flat >> p, np.arange(n_keys + 1), side='left')
+    return offsets, (flat & ((1 << p) - 1)).astype(np.uint16), rank.astype(np.uint8)
+
+
+class DistinctSketches:
+    """
+    סקיצות HyperLogLog של מזהי עסקאות לכל יום ולכל (יום, מוצר).
+
+    days - ימים ממוינים (datetime64[D]); day_registers - שורה צפופה לכל יום.
+    day_item_keys - זוגות (מיקום היום, קוד המוצר) ממוינים לפי יום.
+    day_item_offsets, day_item_index, day_item_rank - הרגיסטרים הדלילים של הזוגות (ראו sparse_registers).
+    """
+
+    def __init__(self, p, items, days, day_registers, day_item_keys, day_item_offsets, day_item_index,
+                 day_item_rank):
+        self.p = p
+        self.items = items
+        self.item_codes = {item: code for code, item in enumerate(items)}
+        self.days = days
+        self.day_registers = day_registers
+        self.day_item_keys = day_item_keys
+        self.day_item_offsets = day_item_offsets
+        self.day_item_index = day_item_index
+        self.day_item_rank = day_item_rank
+
+    @property
+    def nbytes(self):
+        """הזיכרון של הסקיצות בבתים."""
+        return sum(array.nbytes for array in (self.day_registers, self.day_item_keys, self.day_item_offsets,
+                                              self.day_item_index, self.day_item_rank))
+
+    @property
+    def relative_error(self):
+        return standard_error(self.p)
+
+    @classmethod
+    def from_frame(cls, df, relative_error=0.02):
+        p = precision_for_error(relative_error)
+        day_values = df['date_time'].to_numpy().astype('datetime64[D]')
+        days, day_positions = np.unique(day_values, return_inverse=True)
+        index, rank = register_updates(df['Transaction'].to_numpy(), p)
+        day_registers = np.zeros((len(days), 1 << p), dtype=np.uint8)
+        np.maximum.at(day_registers, (day_positions, index), rank)
+
+        item_codes = df['Item'].cat.codes.to_numpy().astype(np.int64)
+        n_items = len(df['Item'].cat.categories)
+        pair_ids, pair_positions = np.unique(day_positions * n_items + item_codes, return_inverse=True)
+        day_item_keys = np.column_stack([pair_ids // n_items, pair_ids % n_items])
+
+        items = [str(item) for item in df['Item'].cat.categories]
+        return cls(p, items, days, day_registers, day_item_keys,
+                   *sparse_registers(pair_positions, index, rank, len(pair_ids), p))
+
+    @classmethod
+    def concat(cls, sketches, items=None):
+        """
+        מאחד סקיצות של חלקים נפרדים מהנתונים (מקסימום רגיסטרים לכל יום ולכל יום x מוצר), כולן באותו דיוק p.
+        items - רשימת המוצרים של התוצאה, שמכילה את אלו של כל הסקיצות (ברירת מחדל: של האחרונה - כאשר
+        הרשימה של כל סקיצה היא תחילית שלה).
+        """
+        if items is None:
+            items = sketches[-1].items
+        item_index = pd.Index(items)
+        p = sketches[0].p
+        all_days = np.concatenate([sketch.days for sketch in sketches])
+        days, day_positions = np.unique(all_days, return_inverse=True)
+        day_registers = np.zeros((len(days), 1 << p), dtype=np.uint8)
+        np.maximum.at(day_registers, day_positions, np.concatenate([sketch.day_registers for sketch in sketches]))
+
+        # מפתחות (יום, מוצר) מומרים למיקומי הימים ולקודי המוצרים המאוחדים ומקודדים למספר אחד
+        n_items = len(items)
+        offsets = np.cumsum([0] + [len(sketch.days) for sketch in sketches])
+        pair_ids = np.concatenate([
+            day_positions[offset + sketch.day_item_keys[:, 0]] * n_items
+            + item_index.get_indexer(sketch.items)[sketch.day_item_keys[:, 1]]
+            for offset, sketch in zip(offsets, sketches)
+        ])
+        unique_ids, pair_positions = np.unique(pair_ids, return_inverse=True)
+        pair_offsets = np.cumsum([0] + [len(sketch.day_item_keys) for sketch in sketches])
+        entry_pairs = pair_positions[np.concatenate([
+            pair_offset + np.repeat(np.arange(len(sketch.day_item_keys)), np.diff(sketch.day_item_offsets))
+            for pair_offset, sketch in zip(pair_offsets, sketches)
+        ])]  # הזוג המאוחד של כל רשומה דלילה
+        day_item_keys = np.column_stack([unique_ids // n_items, unique_ids % n_items])
+        return cls(p, list(items), days, day_registers, day_item_keys, *sparse_registers(
+            entry_pairs, np.concatenate([sketch.day_item_index for sketch in sketches]),
+            np.concatenate([sketch.day_item_rank for sketch in sketches]), len(unique_ids), p))
+
+    def _day_item_registers(self, rows):
+        """שורות רגיסטרים צפופות לזוגות (יום, מוצר) שנבחרו (מיקומים ב-day_item_keys)."""
+        starts = self.day_item_offsets[rows]
+        lengths = self.day_item_offsets[rows + 1] - starts
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        registers = np.zeros((len(rows), 1 << self.p), dtype=np.uint8)
+        registers[np.repeat(np.arange(len(rows)), lengths), self.day_item_index[entries]] = self.day_item_rank[entries]
+        return registers
+
+    def _rows_in_range(self, start_date, end_date, item=None):
+        """מחזיר (מיקומי הימים של השורות, הרגיסטרים) עבור הטווח, לכלל העסקאות או למוצר."""
+        lo = np.searchsorted(self.days, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self.days, np.datetime64(end_date, 'D'), side='right')
+        if item is None:
+            return np.arange(lo, hi), self.day_registers[lo:hi]
+        code = self.item_codes.get(item, -1)
+        first = np.searchsorted(self.day_item_keys[:, 0], lo, side='left')
+        last = np.searchsorted(self.day_item_keys[:, 0], hi, side='left')
+        rows = first + np.flatnonzero(self.day_item_keys[first:last, 1] == code)
+        return self.day_item_keys[rows, 0], self._day_item_registers(rows)
+
+    def count(self, start_date, end_date, item=None):
+        """אומדן מספר העסקאות הייחודיות בטווח (מיזוג הסקיצות היומיות)."""
+        _, registers = self._rows_in_range(start_date, end_date, item)
+        if len(registers) == 0:
+            return 0
+        return int(round(estimate(registers.max(axis=0))[0]))
+
+    def count_by_period(self, start_date, end_date, item=None, freq='M'):
+        """
+        אומדן עסקאות ייחודיות לכל תקופה בטווח - סדרה עם אינדקס Period.
+        freq - 'D' (יום), 'W' (שבוע שמתחיל ביום שני) או 'M' (חודש).
+        """
+        day_positions, registers = self._rows_in_range(start_date, end_date, item)
+        if len(registers) == 0:  # אינדקס Period גם כשאין נתונים - כמו בקובייה (monthly_transactions, גרף המגמה)
+            return pd.Series(dtype=np.int64, index=pd.PeriodIndex([], freq=freq))
+        periods = pd.DatetimeIndex(self.days[day_positions]).to_period(freq)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])  # הימים ממוינים - כל תקופה רצופה
+        merged = np.maximum.reduceat(registers, starts, axis=0)
+        counts = np.round(estimate(merged)).astype(np.int64)
+        return pd.Series(counts, index=periods[starts])
+
+    def count_by_month(self, start_date, end_date, item=None):
+        """אומדן עסקאות ייחודיות לכל חודש בטווח - סדרה עם אינדקס Period חודשי."""
+        return self.count_by_period(start_date, end_date, item, 'M')
+
+
+@st.cache_resource(show_spinner="בונה סקיצות HyperLogLog...", max_entries=4)
+def _build_distinct_sketches(version, relative_error, _df):
+    return DistinctSketches.from_frame(_df, relative_error)
+
+
+def get_distinct_sketches(dataset, relative_error):
+    """מחזיר את סקיצות ה-HLL של גרסת הנתונים הנוכחית עבור שגיאה יחסית נתונה."""
+    prebuilt = dataset.get('sketches')  # נבנו כבר בזמן טעינה במקטעים
+    if prebuilt is not None and prebuilt.p == precision_for_error(relative_error):
+        return prebuilt
+    return _build_distinct_sketches(dataset['version'], relative_error, dataset['df'])
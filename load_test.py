@@ -0,0 +1,244 @@
+"""
+מבחן עומס לדשבורד: סשנים מקבילים (Streamlit AppTest, ללא דפדפן) שמשנים פילטרים, לכל תרחיש בנפרד.
+
+דוגמאות:
+    python generate_sales.py synthetic_10m.csv --rows 10000000
+    python load_test.py --data synthetic_10m.csv --sessions 8 --steps 20
+    python load_test.py --data synthetic_10m.csv --scenarios dates mixed --env DASHBOARD_FILTER_MODE=form
+    python load_test.py --json load_results.jsonl                         # על הקובץ המצורף
+
+כל תרחיש רץ בתהליך חדש (מטמונים קרים, והזיכרון בשיא נמדד לתרחיש לבדו). הריצה הראשונה של כל סשן
+רצה בזו אחר זו (הראשונה שבהן טוענת ובונה את המבנים - "קר"), ואחריהן כל הסשנים מבצעים במקביל, על אותם
+מטמונים משותפים כמו בשרת אמיתי, --steps שינויים. כל שינוי בווידג'ט הוא ריצה מחדש שנמדדת; במצב טופס
+(DASHBOARD_FILTER_MODE=form) השינויים של צעד אחד מוחלים יחד בלחיצה על "החל פילטרים" - ריצה אחת.
+לכל תרחיש מדווחים p50/p95 של זמן הריצה מחדש, הזמן הקר, הזיכרון בשיא (RSS) ומספר השגיאות: ריצות עם
+חריגה או ללא אף ווידג'ט, וסשנים שנעצרו בשגיאה.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # ללא מודול resource (Windows) הזיכרון בשיא אינו נמדד
+    resource = None
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboardv2.py')
+APPLY_FILTERS_LABEL = 'החל פילטרים'
+
+
+# --- תרחישים: כל צעד הוא רשימת שינויים (שם הווידג'ט, ערך) שמשתמש עושה יחד ---
+
+def item_step(rng, context):
+    return [('item', rng.choice(context['items']))]
+
+
+def dates_step(rng, context):
+    first, last = context['date_range']
+    days = (last - first).days
+    start = first + datetime.timedelta(days=int(rng.integers(0, days + 1)))
+    end = start + datetime.timedelta(days=int(rng.integers(0, (last - start).days + 1)))
+    # הסדר שבו משתמש היה משנה: כשההתחלה החדשה אחרי הסיום הנוכחי - קודם הסיום (אחרת טווח לא חוקי באמצע)
+    changes = [('start_date', start), ('end_date', end)]
+    if start > context['selected_dates'][1]:
+        changes.reverse()
+    context['selected_dates'] = (start, end)
+    return changes
+
+
+def slider_step(rng, context):
+    return [('min_support', round(float(rng.uniform(0.1, 10.0)), 1))]
+
+
+def mixed_step(rng, context):
+    steps = [item_step, dates_step, slider_step, lambda rng, context: dates_step(rng, context) + item_step(rng, context)]
+    return steps[rng.integers(len(steps))](rng, context)
+
+
+SCENARIOS = {'item': item_step, 'dates': dates_step, 'slider': slider_step, 'mixed': mixed_step}
+
+
+def _set_widget(at, name, value):
+    """משנה ווידג'ט אחד; False כשהווידג'ט לא הוצג בריצה האחרונה (למשל ה-slider כשאין נתונים בסינון)."""
+    if name == 'min_support' and not at.slider:
+        return False
+    if name == 'item':
+        at.selectbox(key='product_selectbox_widget_key').set_value(value)
+    elif name == 'start_date':
+        at.date_input(key='start_date_widget_key').set_value(value)
+    elif name == 'end_date':
+        at.date_input(key='end_date_widget_key').set_value(value)
+    elif name == 'min_support':
+        at.slider[0].set_value(value)
+    return True
+
+
+def _rendered_widgets(at):
+    return len(at.selectbox) + len(at.date_input) + len(at.slider) + len(at.button) > 0
+
+
+def _timed_run(at, latencies):
+    """
+    ריצה אחת שנמדדת; True כשהיא נכשלה - חריגה בעמוד, או ריצה שלא הציגה אף ווידג'ט (למשל כשהסקריפט
+    לא התקמפל: AppTest לא מדווח זאת ב-at.exception).
+    """
+    started = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - started)
+    return bool(at.exception) or not _rendered_widgets(at)
+
+
+def start_session(timeout):
+    """
+    סשן חדש והריצה הראשונה שלו. מחזיר (AppTest או None כשהריצה נכשלה, זמן הריצה, מספר השגיאות).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    cold = []
+    try:
+        at = AppTest.from_file(DASHBOARD, default_timeout=timeout)
+        if _timed_run(at, cold):
+            return None, cold[0], 1
+    except Exception:  # למשל חריגה בזמן הריצה (timeout) - הסשן לא ממשיך
+        return None, cold[0] if cold else None, 1
+    return at, cold[0], 0
+
+
+def run_session(at, scenario, steps, seed):
+    """
+    steps צעדים מהתרחיש בסשן שכבר רץ פעם אחת (start_session).
+    מחזיר (זמני הריצות מחדש, מספר השגיאות). ריצה ללא ווידג'טים או חריגה בסשן עוצרות אותו.
+    """
+    rng = np.random.default_rng(seed)
+    latencies = []
+    errors = 0
+    try:
+        date_range = (at.date_input(key='start_date_widget_key').value,
+                      at.date_input(key='end_date_widget_key').value)
+        context = {
+            'items': list(at.selectbox(key='product_selectbox_widget_key').options),
+            'date_range': date_range,
+            'selected_dates': date_range,
+        }
+        for _ in range(steps):
+            changes = SCENARIOS[scenario](rng, context)
+            apply_buttons = [button for button in at.button if button.label == APPLY_FILTERS_LABEL]
+            for name, value in changes:
+                if _set_widget(at, name, value) and (not apply_buttons or name == 'min_support'):  # ה-slider אינו בטופס
+                    errors += _timed_run(at, latencies)
+                    if not _rendered_widgets(at):
+                        return latencies, errors  # אין ווידג'טים לשנות - הסשן נעצר
+            if apply_buttons and any(name != 'min_support' for name, _ in changes):
+                apply_buttons[0].click()
+                errors += _timed_run(at, latencies)
+                if not _rendered_widgets(at):
+                    return latencies, errors
+    except Exception:  # ווידג'ט שלא נמצא, timeout וכו' - נספר כשגיאה והסשן נעצר
+        errors += 1
+    return latencies, errors
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024  # macOS בבתים, Linux ב-KB
+
+
+def run_scenario(scenario, sessions, steps, seed=0, timeout=600):
+    """
+    מריץ את הסשנים של תרחיש אחד בתהליך הנוכחי ומחזיר את הסיכום שלו: הריצות הראשונות בזו אחר זו
+    (ריצות במקביל של סקריפט שעוד לא נטען נכשלות לעתים בהידור שלו), והצעדים במקביל (threads).
+    """
+    started = time.perf_counter()
+    opened = [start_session(timeout) for _ in range(sessions)]
+
+    def session_steps(session):
+        at = opened[session][0]
+        return run_session(at, scenario, steps, seed + session) if at is not None else ([], 0)
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(session_steps, range(sessions)))
+    latencies = np.array([latency for session_latencies, _ in results for latency in session_latencies])
+    cold = opened[0][1]  # רק הריצה הראשונה של הסשן הראשון טוענת את הנתונים ובונה את המבנים
+    return {
+        'scenario': scenario,
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000) if len(latencies) else None,
+        'p95_ms': float(np.percentile(latencies, 95) * 1000) if len(latencies) else None,
+        'max_ms': float(latencies.max() * 1000) if len(latencies) else None,
+        'cold_ms': cold * 1000 if cold is not None else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'errors': sum(errors for _, _, errors in opened) + sum(errors for _, errors in results),
+        'wall_s': time.perf_counter() - started,
+    }
+
+
+def _scenario_in_new_process(scenario, sessions, steps, seed, timeout, env):
+    """כל תרחיש בתהליך חדש (spawn): ההגדרות נקראות מחדש מהסביבה, והמטמונים והזיכרון מתחילים מאפס."""
+    context = multiprocessing.get_context('spawn')
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)  # התהליך החדש יורש את הסביבה ברגע שהוא נוצר
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            return pool.submit(run_scenario, scenario, sessions, steps, seed, timeout).result()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _format_ms(value):
+    return f"{value:10.1f}" if value is not None else f"{'-':>10}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="מבחן עומס לדשבורד עם סשנים מקבילים של AppTest.")
+    parser.add_argument('--data', help="קובץ או מקור הנתונים (DASHBOARD_DATA_SOURCE; ברירת מחדל: ההגדרה הקיימת)")
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=['item', 'dates', 'mixed'])
+    parser.add_argument('--sessions', type=int, default=4, help="מספר הסשנים המקבילים בכל תרחיש")
+    parser.add_argument('--steps', type=int, default=10, help="מספר הצעדים (שינויי פילטרים) בכל סשן")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600, help="זמן מרבי לריצה אחת בשניות")
+    parser.add_argument('--env', nargs='+', default=[], metavar='NAME=VALUE',
+                        help="הגדרות נוספות לדשבורד, למשל DASHBOARD_FILTER_MODE=form")
+    parser.add_argument('--json', help="קובץ JSON lines להוספת התוצאות")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = dict(assignment.split('=', 1) for assignment in args.env)
+    if args.data:
+        env['DASHBOARD_DATA_SOURCE'] = os.path.abspath(args.data)
+
+    print(f"{'תרחיש':<8} {'ריצות':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'קר ms':>10} "
+          f"{'RSS MB':>8} {'שגיאות':>7}")
+    results = []
+    for scenario in args.scenarios:
+        result = _scenario_in_new_process(scenario, args.sessions, args.steps, args.seed, args.timeout, env)
+        rss = f"{result['peak_rss_mb']:8.0f}" if result['peak_rss_mb'] is not None else f"{'-':>8}"
+        print(f"{scenario:<8} {result['reruns']:>6} {_format_ms(result['p50_ms'])} {_format_ms(result['p95_ms'])} "
+              f"{_format_ms(result['max_ms'])} {_format_ms(result['cold_ms'])} {rss} {result['errors']:>7}")
+        results.append({**result, 'env': env})
+
+    if args.json:
+        stamp = datetime.datetime.now().isoformat(timespec='seconds')
+        with open(args.json, 'a', encoding='utf-8') as output:
+            for result in results:
+                output.write(json.dumps({'timestamp': stamp, **result}, ensure_ascii=False) + '\n')
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
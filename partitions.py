@@ -0,0 +1,293 @@
+import collections
+import datetime
+import glob
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import streamlit as st
+
+import settings
+from association_rules import PairCounts
+from basket import BasketMatrix
+from chunked_loader import AggregateBuilder
+from data_loader import ALL_ITEMS_LABEL, REQUIRED_COLUMNS, file_signature, parse_dates, prepare_sales_frame
+from hll import DistinctSketches
+from sales_cube import SalesCube
+
+# --- מקור נתונים מחולק לקבצים (סניפים x תאריכים) ---
+# במקום קובץ CSV יחיד, מקור הנתונים יכול להיות תיקייה או תבנית glob של קבצים שכל אחד מהם מכיל
+# את העסקאות של סניף אחד (ובדרך כלל יום אחד). הסניף והתאריך של כל קובץ נלקחים מהנתיב שלו:
+#   sales/store=haifa/2017-01-05.csv       (תיקיית store=<סניף>)
+#   sales/haifa/2017-01-05.csv             (תיקיית המשנה הראשונה מתחת לשורש)
+#   sales/haifa_2017-01-05.csv             (שם הקובץ: <סניף>_<תאריך>)
+# הקבצים נקראים ומסוכמים במקביל, ורק הקבצים של הסניפים הנבחרים ושל התאריכים בטווח הנבחר נקראים בכלל
+# (partition pruning). קובץ ללא תאריך בשם נקרא תמיד.
+#
+# מזהי העסקאות ייחודיים רק בתוך סניף, ולכן מקודדים מחדש: קוד הסניף בסיביות העליונות ומזהה העסקה
+# המקורי בתחתונות - כך ספירת עסקאות ייחודיות נשארת נכונה גם כשמספר סניפים נטענים יחד.
+
+Partition = collections.namedtuple('Partition', ['path', 'store', 'date'])
+
+DATA_EXTENSIONS = ('.csv', '.parquet')
+DEFAULT_STORE = 'default'
+STORE_SHIFT = 40  # מזהי עסקאות בתוך סניף עד 2^40; קוד הסניף בסיביות שמעליהן
+SUMMARY_CACHE_ENTRIES = 1024  # יחידות סיכום (סניף x חודש) במטמון
+
+_DATE_PATTERN = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+_GLOB_CHARACTERS = ('*', '?', '[')
+
+
+def is_partitioned_source(source):
+    """האם מקור הנתונים הוא תיקייה או תבנית glob (ולא קובץ יחיד)."""
+    return os.path.isdir(source) or any(char in source for char in _GLOB_CHARACTERS)
+
+
+def _source_files(source):
+    """(שורש, רשימת קבצי הנתונים) - השורש משמש לזיהוי הסניף מתיקיית המשנה."""
+    if os.path.isdir(source):
+        root = source
+        paths = glob.glob(os.path.join(glob.escape(source), '**', '*'), recursive=True)
+    else:
+        # השורש הוא החלק של התבנית שלפני התו המיוחד הראשון
+        prefix = source[:min(source.index(char) for char in _GLOB_CHARACTERS if char in source)]
+        root = os.path.dirname(prefix) or '.'
+        paths = glob.glob(source, recursive=True)
+    files = [path for path in paths
+             if os.path.isfile(path) and path.endswith(DATA_EXTENSIONS) and not path.endswith('.csv.parquet')]
+    return root, files
+
+
+def _parse_date(text):
+    match = _DATE_PATTERN.search(text)
+    if match is None:
+        return None, None
+    try:
+        return datetime.date(*(int(part) for part in match.groups())), match
+    except ValueError:  # רצף ספרות שאינו תאריך חוקי
+        return None, None
+
+
+def _describe_partition(root, path):
+    """מזהה את הסניף והתאריך של קובץ לפי הנתיב שלו ביחס לשורש (ראו ההסבר בראש הקובץ)."""
+    parts = os.path.relpath(path, root).split(os.sep)
+    stem = os.path.basename(path).split('.')[0]
+
+    date, match = _parse_date(stem)
+    for part in reversed(parts[:-1]):
+        if date is not None:
+            break
+        date, _ = _parse_date(part.split('=', 1)[-1] if part.startswith('date=') else part)
+
+    store = next((part.split('=', 1)[1] for part in parts[:-1] if part.startswith('store=')), None)
+    if store is None and len(parts) > 1:
+        store = parts[0]
+    if store is None:
+        store = (stem[:match.start()] if match else stem).strip('_- ') or DEFAULT_STORE
+    return Partition(path, store, date)
+
+
+def discover_partitions(source):
+    """רשימת הקבצים של מקור הנתונים (Partition: נתיב, סניף, תאריך או None), ממוינת לפי סניף ותאריך."""
+    root, files = _source_files(source)
+    partitions = [_describe_partition(root, path) for path in files]
+    return sorted(partitions, key=lambda partition: (partition.store, partition.date or datetime.date.min,
+                                                     partition.path))
+
+
+def partition_stores(partitions):
+    """שמות הסניפים, ממוינים - הסדר קובע את קוד הסניף במזהי העסקאות."""
+    return sorted({partition.store for partition in partitions})
+
+
+def partition_date_range(partitions):
+    """(התאריך הראשון, האחרון) לפי שמות הקבצים, או None אם יש קבצים ללא תאריך (הטווח ידוע רק אחרי קריאה)."""
+    dates = [partition.date for partition in partitions]
+    if not dates or None in dates:
+        return None
+    return min(dates), max(dates)
+
+
+def prune_partitions(partitions, start_date=None, end_date=None, stores=None):
+    """רק הקבצים שעשויים להכיל שורות בטווח ובסניפים הנבחרים (stores=None - כל הסניפים)."""
+    return [
+        partition for partition in partitions
+        if (stores is None or partition.store in stores)
+        and (partition.date is None
+             or ((start_date is None or partition.date >= start_date) and (end_date is None or partition.date <= end_date)))
+    ]
+
+
+def read_partition(partition, store_code):
+    """
+    קורא קובץ אחד (בקורא של Arrow, שמשחרר את ה-GIL - כך הקריאות המקבילות רצות באמת במקביל),
+    מוסיף עמודת Store ומקודד את מזהי העסקאות לפי הסניף.
+    מעלה ValueError כאשר יש בקובץ מזהי עסקאות חסרים או לא מספריים (הקובץ מדולג, ראו summarize_partition).
+    """
+    if partition.path.endswith('.parquet'):
+        table = pq.read_table(partition.path)
+    else:
+        table = pa_csv.read_csv(partition.path, convert_options=pa_csv.ConvertOptions(
+            column_types={'date_time': pa.string(), 'Item': pa.string()}))
+    raw = table.to_pandas()
+    missing = [col_name for col_name in REQUIRED_COLUMNS if col_name not in raw.columns]
+    if missing:
+        raise KeyError(missing[0])
+    transactions = pd.to_numeric(raw['Transaction'], errors='coerce')
+    if transactions.isna().any() or (transactions % 1 != 0).any():
+        raise ValueError("מזהי עסקאות חסרים או לא מספריים")
+    raw['Transaction'] = transactions.astype(np.int64) + (store_code << STORE_SHIFT)
+    raw['Store'] = partition.store
+    return raw
+
+
+def _empty_sales_frame():
+    return pd.DataFrame({
+        'Transaction': pd.Series(dtype=np.int64),
+        'Item': pd.Series(dtype=str),
+        'date_time': pd.Series(dtype='datetime64[us]'),
+        'Store': pd.Series(dtype=str),
+    })
+
+
+def summary_groups(partitions):
+    """
+    הקבצים מקובצים ליחידות הסיכום: סניף x חודש (קובץ ללא תאריך - יחידה לעצמו). סיכום של כל קובץ יומי
+    לחוד עולה עשרות מילישניות של תקורה קבועה, ויחידה חודשית גם שומרת עסקה שחוצה חצות ביחידה אחת.
+    מחזיר מילון {מפתח היחידה: רשימת הקבצים}, בסדר הקבצים.
+    """
+    groups = {}
+    for partition in partitions:
+        key = ((partition.store, partition.date.year, partition.date.month) if partition.date is not None
+               else (partition.store, partition.path))
+        groups.setdefault(key, []).append(partition)
+    return groups
+
+
+def summarize_partitions(partitions, store_code, relative_error=None):
+    """
+    קורא קבצים של סניף אחד ומקפל אותם ל-AggregateBuilder אחד (קובייה, ספירות צמדים וסקיצות), ללא Streamlit.
+    קובץ עם מזהי עסקאות לא תקינים מדולג. מחזיר (המצב, או None כאשר אין שורות עם תאריך תקין;
+    [(נתיב, בעיה)] לכל קובץ שדולג).
+    """
+    frames, skipped = [], []
+    for partition in partitions:
+        try:
+            frames.append(read_partition(partition, store_code))
+        except ValueError as e:
+            skipped.append((partition.path, str(e)))
+    if not frames:
+        return None, skipped
+    raw = pd.concat(frames, ignore_index=True)
+    if not pd.api.types.is_datetime64_any_dtype(raw['date_time']):
+        raw['date_time'] = parse_dates(raw['date_time'])
+    df = prepare_sales_frame(raw)
+    if df.empty:
+        return None, skipped
+    builder = AggregateBuilder(relative_error)
+    builder.add(df)
+    return builder, skipped
+
+
+def _empty_aggregates(relative_error):
+    """האגרגציות של בחירה ללא קבצים (מבנה כמו AggregateBuilder.snapshot) - העמוד מציג "אין נתונים"."""
+    df = prepare_sales_frame(_empty_sales_frame())
+    return {
+        'cube': SalesCube.from_frame(df),
+        'pair_counts': PairCounts.from_basket(BasketMatrix.from_frame(df), with_quantities=True),
+        'sketches': DistinctSketches.from_frame(df, relative_error) if relative_error is not None else None,
+        'rows': 0,
+        'total_item_sales': pd.DataFrame({'Item': pd.Series(dtype=str), 'TotalSales': pd.Series(dtype=np.int64)}),
+        'all_items_options': [ALL_ITEMS_LABEL],
+    }
+
+
+# --- מטמונים ---
+# הקטלוג (סריקת העץ וחתימות הקבצים) נשמר ל-CATALOG_SECONDS שניות, כך שריצה רגילה לא סורקת את התיקייה.
+# כל יחידת סיכום (summary_groups) מסוכמת פעם אחת לכל גרסה של הקבצים שלה, וכל בחירת טווח או סניפים רק
+# מאחדת את הסיכומים הקיימים (AggregateBuilder.combine) - יחידה שנוספה לבחירה נקראת לבד, בלי לבנות מחדש
+# את כל השאר. לכן הקבצים נבחרים ביחידות שלמות: טווח שמתחיל באמצע חודש קורא את כל החודש.
+
+@st.cache_resource(show_spinner=False, ttl=settings.CATALOG_SECONDS, max_entries=4)
+def _load_catalog(source):
+    catalog = discover_partitions(source)
+    return catalog, {partition.path: file_signature(partition.path) for partition in catalog}
+
+
+@st.cache_resource(show_spinner=False, max_entries=SUMMARY_CACHE_ENTRIES)
+def _summarize_partitions(partitions, signatures, store_code, relative_error, daypart_bounds):
+    return summarize_partitions(partitions, store_code, relative_error)
+
+
+@st.cache_resource(show_spinner="טוען נתונים מהסניפים...", max_entries=4)
+def _load_partitioned_sales(source, signatures, groups, stores, date_range, relative_error, workers,
+                            partitions_total, daypart_bounds):
+    load_timings = {}
+    store_codes = {store: code for code, store in enumerate(stores)}
+    file_versions = {signature[0]: signature[1:] for signature in signatures}
+    started = time.perf_counter()
+    summaries = []
+    if groups:
+        with ThreadPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(groups))) as pool:
+            summaries = list(pool.map(
+                lambda group: _summarize_partitions(group, tuple(file_versions[partition.path] for partition in group),
+                                                    store_codes[group[0].store], relative_error, daypart_bounds),
+                groups))
+    load_timings['read_partitions'] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    builders = [builder for builder, _ in summaries if builder is not None]
+    if builders:
+        dataset = AggregateBuilder.combine(builders).snapshot()
+    elif date_range is None:  # יש קבצים ללא תאריך בשם - כולם נקראו, והטווח נלקח מהנתונים
+        raise ValueError("לא נמצאו שורות עם תאריך תקין בקבצים")
+    else:
+        dataset = _empty_aggregates(relative_error)
+    load_timings['combine_partitions'] = (time.perf_counter() - started) * 1000
+    if date_range is not None:  # טווח הפילטר הוא של כל המקור, לא רק של הקבצים שנקראו
+        dataset['min_date'], dataset['max_date'] = date_range
+    dataset.update({
+        'df': None,  # אין שורות גולמיות בזיכרון - כל המדדים נענים מהאגרגציות, כמו במצב chunked
+        'version': (source,) + signatures,
+        'load_timings': load_timings,
+        'stores': stores,
+        'partitions_read': sum(len(group) for group in groups),
+        'partitions_total': partitions_total,
+        'partitions_skipped': [problem for _, skipped in summaries for problem in skipped],
+    })
+    return dataset
+
+
+def load_partitioned_sales(source, start_date=None, end_date=None, stores=None, workers=None, relative_error=None):
+    """
+    המקבילה של data_loader.load_sales_data למקור מחולק: נקראים רק הקבצים של הסניפים (stores=None - כולם)
+    ושל החודשים בטווח הנבחר, והתוצאה נשמרת במטמון לפי הקבצים שנקראו וגרסתם. כמו במצב chunked, 'df' הוא
+    None והקובייה, ספירות הצמדים והסקיצות (relative_error) כבר בנויים.
+    min_date/max_date הם הטווח של כל המקור (לפילטר), 'stores' - כל הסניפים במקור, partitions_read /
+    partitions_total - מספר הקבצים שנקראו מתוך כל הקבצים, ו-partitions_skipped - [(נתיב, בעיה)] לקבצים
+    שדולגו (למשל מזהי עסקאות לא מספריים).
+    """
+    catalog, catalog_signatures = _load_catalog(source)
+    if not catalog:
+        raise FileNotFoundError(f"לא נמצאו קבצי נתונים במקור {source}")
+    all_stores = partition_stores(catalog)
+    date_range = partition_date_range(catalog)
+    if date_range is not None and start_date is not None and end_date is not None and start_date > end_date:
+        partitions = []  # טווח לא חוקי - הדשבורד מציג שגיאה; אין צורך לקרוא קבצים
+    elif date_range is None:
+        partitions = prune_partitions(catalog, stores=stores)
+    else:
+        partitions = prune_partitions(catalog, start_date, end_date, stores)
+    groups = summary_groups(catalog)
+    selected = summary_groups(partitions)
+    signatures = tuple((partition.path,) + catalog_signatures[partition.path]
+                       for key in selected for partition in groups[key])
+    return _load_partitioned_sales(source, signatures, tuple(tuple(groups[key]) for key in selected),
+                                   tuple(all_stores), date_range, relative_error, workers, len(catalog),
+                                   settings.DAYPART_BOUNDS)
@@ -0,0 +1,149 @@
+import contextlib
+import datetime
+import json
+import threading
+import time
+import uuid
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+import settings
+
+# --- מדידת זמני רינדור לפי קטעים ---
+# מופעל עם ?profile=1 בכתובת או DASHBOARD_PROFILE=1. כל קטע בעמוד מתחיל ב-profiler.begin(שם)
+# (שמסיים את הקטע הקודם), ובתוכו ניתן למדוד חלקים עם with profiler.section(שם) - למשל "top-10/figure".
+# בסוף הריצה מוצגים בסרגל הצד טבלת זמנים ותרשים להבה, וכל ריצה נכתבת כשורת JSON לקובץ
+# (DASHBOARD_PROFILE_LOG) לצורך ניתוח בין סשנים.
+
+_log_lock = threading.Lock()
+
+
+class RenderProfiler:
+    """אוסף זמנים של קטעים בריצה אחת של הסקריפט. כשהוא כבוי, section() כמעט ללא עלות."""
+
+    def __init__(self, enabled, log_path=None, session_id=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.session_id = session_id
+        self.records = []  # (שם מלא, עומק, התחלה במילישניות, משך במילישניות)
+        self.build_timings = {}  # זמני בנייה חד-פעמיים של מבנים במטמון (למשל הטעינה הקרה)
+        self._stack = []
+        self._current = None  # הקטע הראשי הפתוח (שם, זמן התחלה) - נסגר ב-begin הבא או ב-finish
+        self._started = time.perf_counter()
+
+    def _record(self, path, depth, started):
+        ended = time.perf_counter()
+        self.records.append((path, depth, (started - self._started) * 1000, (ended - started) * 1000))
+
+    def begin(self, name):
+        """מתחיל קטע ראשי חדש בעמוד ומסיים את הקטע הראשי הקודם."""
+        if not self.enabled:
+            return
+        self.end()
+        self._stack.append(name)
+        self._current = (name, time.perf_counter())
+
+    def end(self):
+        """מסיים את הקטע הראשי הפתוח (אם יש)."""
+        if self._current is None:
+            return
+        name, started = self._current
+        self._stack.remove(name)
+        self._current = None
+        self._record(name, 0, started)
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """מודד את גוף ה-with כקטע מקונן בתוך הקטע הפתוח."""
+        if not self.enabled:
+            yield
+            return
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self._record(path, len(self._stack), started)
+
+    def add_build_timings(self, name, timings):
+        """רושם זמני שלבים (מילון שם -> ms) של חישוב שבוצע פעם אחת ונשמר במטמון."""
+        if self.enabled and timings:
+            self.build_timings[name] = dict(timings)
+
+    def timings(self):
+        """טבלת הזמנים לפי סדר ההתחלה (עמודות Section, Depth, StartMs, DurationMs, Share)."""
+        timings = pd.DataFrame(self.records, columns=['Section', 'Depth', 'StartMs', 'DurationMs'])
+        timings = timings.sort_values('StartMs', kind='stable').reset_index(drop=True)
+        total = (time.perf_counter() - self._started) * 1000
+        timings['Share'] = timings['DurationMs'] / total if total else 0.0
+        return timings, total
+
+    def flame_figure(self, timings):
+        """תרשים להבה: פס לכל קטע, לפי זמן ההתחלה והמשך, שורה לכל רמת קינון."""
+        fig = go.Figure(go.Bar(
+            x=timings['DurationMs'],
+            base=timings['StartMs'],
+            y=timings['Depth'],
+            orientation='h',
+            text=timings['Section'].str.rsplit('/', n=1).str[-1],
+            hovertext=timings['Section'] + ": " + timings['DurationMs'].round(1).astype(str) + " ms",
+            hoverinfo='text',
+            textposition='inside',
+            marker_color=timings['Depth'],
+            marker_colorscale='OrRd',
+        ))
+        fig.update_layout(height=120 + 40 * (timings['Depth'].max() + 1), margin=dict(l=10, r=10, t=10, b=10),
+                          xaxis_title="ms", yaxis=dict(autorange='reversed', showticklabels=False), bargap=0.05)
+        return fig
+
+    def export(self, timings, total, extra):
+        """מוסיף שורת JSON עם זמני הריצה לקובץ הלוג (אם הוגדר)."""
+        if not self.log_path:
+            return
+        record = {
+            'timestamp': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'session_id': self.session_id,
+            'total_ms': round(total, 3),
+            'sections': {row.Section: round(row.DurationMs, 3) for row in timings.itertuples()},
+            'build': {name: {step: round(ms, 3) for step, ms in steps.items()} for name, steps in self.build_timings.items()},
+            **extra,
+        }
+        with _log_lock, open(self.log_path, 'a', encoding='utf-8') as log_file:
+            log_file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def finish(self, **extra):
+        """מציג את טבלת הזמנים ותרשים הלהבה בסרגל הצד ומייצא את הריצה. extra נוסף לשורת ה-JSON."""
+        if not self.enabled:
+            return
+        self.end()
+        if not self.records:
+            return
+        timings, total = self.timings()
+        self.export(timings, total, extra)
+        with st.sidebar.expander(f"⏱️ זמני רינדור ({total:.0f} ms)", expanded=False):
+            top_level = timings[timings['Depth'] == 0]
+            st.caption(f"זמן כולל: {total:.1f} ms, מתוכם {top_level['DurationMs'].sum():.1f} ms בקטעים מדודים")
+            st.dataframe(pd.DataFrame({
+                'קטע': timings['Section'],
+                'ms': timings['DurationMs'].round(2),
+                '% מהריצה': (timings['Share'] * 100).round(1),
+            }), hide_index=True, use_container_width=True)
+            st.plotly_chart(self.flame_figure(timings), use_container_width=True)
+            for name, steps in self.build_timings.items():
+                st.caption(f"{name} (פעם אחת לכל גרסת נתונים, נשמר במטמון):")
+                st.dataframe(pd.DataFrame({'שלב': list(steps), 'ms': [round(ms, 2) for ms in steps.values()]}),
+                             hide_index=True, use_container_width=True)
+
+
+def get_profiler():
+    """יוצר מודד לריצה הנוכחית - פעיל כאשר ?profile=1 בכתובת או DASHBOARD_PROFILE=1."""
+    enabled = settings.PROFILE or st.query_params.get("profile", "").lower() in ("1", "true", "yes")
+    if not enabled:
+        return RenderProfiler(False)
+    if 'profiler_session_id' not in st.session_state:
+        st.session_state.profiler_session_id = uuid.uuid4().hex  # מזהה לקיבוץ הריצות של סשן אחד בלוג
+    return RenderProfiler(True, settings.PROFILE_LOG, st.session_state.profiler_session_id)
@@ -0,0 +1,541 @@
+"""
+מנוע שאילתות חלופי (DuckDB) לחישובי הדשבורד, ובדיקת התאמה מול המימוש של pandas.
+
+המימוש הרגיל עונה על הפילטרים מתוך מבנים מחושבים מראש ב-pandas (SalesCube ו-BasketMatrix).
+DuckDBSales מפענח את קובץ ה-CSV פעם אחת לכל גרסת קובץ לטבלה עמודתית של DuckDB (Parquet עם עמודת
+זמן נשאל במקומו, view על read_parquet), ומריץ כל חישוב כשאילתת SQL על מנוע וקטורי שמנצל את כל
+הליבות: סינון התאריכים והמוצר, ספירת פריטים, קיבוץ לפי שעה, עסקאות ייחודיות לפי חודש, "נקנה יחד עם"
+כ-join של העסקאות של מוצר העוגן, וצמדי מוצרים וחוקי אסוציאציה כ-self-join של הסלים. למחלקה אותן
+שיטות כמו לקובייה, למטריצת הסלים ולספירות הצמדים, כך שהיא מועברת כפי שהיא ל-analytics.dashboard_view
+ולקטע חוקי האסוציאציה. במצב הזה הדשבורד לא בונה אף מבנה של pandas מהשורות (load_duckdb_dataset);
+התחזית מותאמת על קובייה של חלון האימון בלבד (history_cube).
+
+בדיקת התאמה (כל הטבלאות של dashboard_view בשני המנועים, על טווחים ומוצרים שונים):
+    python query_engine.py
+    python query_engine.py data.csv --items Coffee Bread Tea
+"""
+import argparse
+import datetime
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import settings
+from daypart import DAY_TYPE_ORDER, DAYPART_ORDER, DEFAULT_DAYPART_BOUNDS
+from data_loader import ALL_ITEMS_LABEL, DATE_FORMAT, REQUIRED_COLUMNS, file_signature
+from sales_cube import SalesCube, daypart_breakdown
+
+try:
+    import duckdb
+except ImportError:  # ללא duckdb זמין רק המנוע של pandas; השגיאה תוצג בבחירת DASHBOARD_ENGINE=duckdb
+    duckdb = None
+
+ENGINES = ('pandas', 'duckdb')
+_PERIOD_UNITS = {'D': 'day', 'W': 'week', 'M': 'month'}  # תדירות pandas -> date_trunc (שבוע ISO, מיום שני)
+
+
+def _sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _source_sql(path):
+    """פונקציית הטבלה של DuckDB שקוראת את הקובץ (התאריכים והמוצרים נקראים כטקסט, כמו ב-pandas)."""
+    if path.endswith('.parquet'):
+        return f"read_parquet({_sql_string(path)})"
+    return f"read_csv({_sql_string(path)}, types={{'date_time': 'VARCHAR', 'Item': 'VARCHAR'}})"
+
+
+def _daypart_sql(columns, bounds):
+    """עמודת Daypart באותם כללים כמו daypart.daypart_column: מ-period_day, או לפי השעה וגבולות."""
+    morning, afternoon, evening, night = bounds or DEFAULT_DAYPART_BOUNDS
+    by_hour = (f"CASE WHEN hour(ts) < {morning} THEN 'Night' WHEN hour(ts) < {afternoon} THEN 'Morning' "
+               f"WHEN hour(ts) < {evening} THEN 'Afternoon' WHEN hour(ts) < {night} THEN 'Evening' ELSE 'Night' END")
+    if bounds is not None or 'period_day' not in columns:
+        return by_hour
+    label = "upper(left(trim(period_day), 1)) || lower(substr(trim(period_day), 2))"
+    known = ", ".join(_sql_string(daypart) for daypart in DAYPART_ORDER)
+    return f"CASE WHEN {label} IN ({known}) THEN {label} ELSE {by_hour} END"
+
+
+def _day_type_sql(columns):
+    """עמודת weekday_weekend כמו daypart.day_type_column (שבת-ראשון = סוף שבוע)."""
+    if 'weekday_weekend' not in columns:
+        return "CASE WHEN isodow(ts) >= 6 THEN 'weekend' ELSE 'weekday' END"
+    value = "lower(trim(CAST(weekday_weekend AS VARCHAR)))"
+    return f"CASE WHEN {value} IN ('weekday', 'weekend') THEN {value} END"
+
+
+class DuckDBSales:
+    """
+    העסקאות כטבלה של DuckDB, עם השאילתות של SalesCube, BasketMatrix.co_purchased ו-PairCounts.
+
+    sales - לכל שורה היום והשעה שלה; טבלה בזיכרון כאשר יש לפענח את התאריכים מטקסט (CSV), כדי שהפענוח
+    ירוץ פעם אחת ולא בכל שאילתה. transaction_sales - גם txn_day, היום של תחילת העסקה, מטבלה קטנה
+    בזיכרון (שורה לכל עסקה). ספירות עסקאות, "נקנה יחד עם" וצמדים מסננים לפי txn_day וספירות פריטים
+    לפי יום השורה, בדיוק כמו במבנים המחושבים מראש.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._local = threading.local()
+
+    @classmethod
+    def from_path(cls, path, daypart_bounds=None, threads=None):
+        """
+        טוען את הקובץ (או מגדיר view על Parquet עם עמודת זמן) ומחשב את יום התחלה של כל עסקה.
+        threads - מספר ליבות, ברירת מחדל: כולן.
+        """
+        if duckdb is None:
+            raise ImportError("המנוע DuckDB אינו מותקן (pip install duckdb)")
+        connection = duckdb.connect()
+        if threads:
+            connection.execute(f"SET threads = {int(threads)}")
+        source = _source_sql(path)
+        column_types = dict(row[:2] for row in connection.execute(f"DESCRIBE SELECT * FROM {source}").fetchall())
+        columns = list(column_types)
+        missing = [col_name for col_name in REQUIRED_COLUMNS if col_name not in columns]
+        if missing:
+            raise KeyError(missing[0])
+
+        # מפרטי הפורמט של data_loader.DATE_FORMAT (strptime של פייתון) זהים ב-strptime של DuckDB
+        text = "CAST(date_time AS VARCHAR)"
+        timestamp = f"coalesce(try_strptime({text}, {_sql_string(DATE_FORMAT)}), TRY_CAST({text} AS TIMESTAMP))"
+        relation = 'TABLE'
+        if column_types['date_time'].startswith(('TIMESTAMP', 'DATE')):
+            timestamp = "CAST(date_time AS TIMESTAMP)"  # Parquet עם עמודת זמן - ללא פענוח, נשאל במקומו
+            relation = 'VIEW'
+        connection.execute(f"""
+            CREATE {relation} sales AS
+            WITH parsed AS (
+                SELECT *, {timestamp} AS ts
+                FROM {source}
+            )
+            SELECT
+                "Transaction" AS txn,
+                CAST(Item AS VARCHAR) AS Item,
+                CAST(ts AS DATE) AS day,
+                hour(ts) AS hour,
+                {_daypart_sql(columns, daypart_bounds)} AS Daypart,
+                {_day_type_sql(columns)} AS weekday_weekend
+            FROM parsed
+            WHERE ts IS NOT NULL
+        """)
+        connection.execute("CREATE TABLE transactions AS SELECT txn, min(day) AS txn_day FROM sales GROUP BY txn")
+        connection.execute("CREATE VIEW transaction_sales AS SELECT * FROM sales JOIN transactions USING (txn)")
+        return cls(connection)
+
+    def _query(self, sql, params=()):
+        """מריץ שאילתה ומחזיר DataFrame. לכל thread (סשן) cursor משלו על אותו מסד נתונים."""
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self._connection.cursor()
+        return cursor.execute(sql, list(params)).df()
+
+    @staticmethod
+    def _filter(day_column, start_date, end_date, item=None):
+        """תנאי WHERE והפרמטרים שלו: טווח ימים (כולל) ומוצר אופציונלי."""
+        where = f"{day_column} BETWEEN ? AND ?"
+        params = [start_date, end_date]
+        if item is not None:
+            where += " AND Item = ?"
+            params.append(item)
+        return where, params
+
+    def date_range(self):
+        """(התאריך הראשון, התאריך האחרון) בנתונים."""
+        bounds = self._query("SELECT min(day) AS first_day, max(day) AS last_day FROM sales")
+        return bounds['first_day'].iloc[0].date(), bounds['last_day'].iloc[0].date()
+
+    def items(self):
+        """רשימת המוצרים בנתונים, ממוינת."""
+        return self._query("SELECT DISTINCT Item FROM sales WHERE Item IS NOT NULL ORDER BY Item")['Item'].tolist()
+
+    def item_sales(self):
+        """סך המכירות לכל מוצר בכל הנתונים (עמודות Item, TotalSales), מהנמכר ביותר."""
+        return self._query("""
+            SELECT Item, count(*) AS TotalSales FROM sales WHERE Item IS NOT NULL
+            GROUP BY Item ORDER BY TotalSales DESC, Item
+        """)
+
+    def history_cube(self, days):
+        """
+        SalesCube של days הימים האחרונים בנתונים (לתחזית, ראו forecast.py) - מקיבוצי SQL, כך שהשורות
+        עצמן לא נטענות ל-pandas.
+        """
+        first_day = self.date_range()[1] - datetime.timedelta(days=days - 1)
+        cells = self._query("""
+            SELECT day, hour, Item, Daypart, weekday_weekend, count(*) AS Count FROM sales
+            WHERE day >= ? AND Item IS NOT NULL GROUP BY ALL ORDER BY day, hour, Item, Daypart, weekday_weekend
+        """, [first_day])
+        day_transactions = self._query("""
+            SELECT txn_day AS day, count(DISTINCT txn) AS Transactions FROM transaction_sales
+            WHERE txn_day >= ? GROUP BY txn_day ORDER BY day
+        """, [first_day])
+        day_item_transactions = self._query("""
+            SELECT txn_day AS day, Item, count(DISTINCT txn) AS Transactions FROM transaction_sales
+            WHERE txn_day >= ? AND Item IS NOT NULL GROUP BY ALL ORDER BY day, Item
+        """, [first_day])
+
+        # אותם טיפוסים כמו ב-SalesCube.from_frame: ימים כ-datetime וקטגוריות למוצרים, לחלקי היום ולסוג היום
+        items = pd.CategoricalDtype(sorted(cells['Item'].unique()))
+        for table in (cells, day_transactions, day_item_transactions):
+            table['day'] = pd.to_datetime(table['day'])
+        cells['Item'] = cells['Item'].astype(items)
+        day_item_transactions['Item'] = day_item_transactions['Item'].astype(items)
+        cells['hour'] = cells['hour'].astype(np.int32)
+        cells['Daypart'] = pd.Categorical(cells['Daypart'], categories=DAYPART_ORDER, ordered=True)
+        cells['weekday_weekend'] = pd.Categorical(cells['weekday_weekend'], categories=DAY_TYPE_ORDER)
+        return SalesCube(cells, day_transactions, day_item_transactions)
+
+    # --- שאילתות עבור המדדים והגרפים (אותן חתימות כמו ב-SalesCube) ---
+    # sketches מתקבל לצורך תאימות בלבד - ב-DuckDB הספירה תמיד מדויקת
+    def kpis(self, start_date, end_date, item=None, sketches=None):
+        row_where, row_params = self._filter('day', start_date, end_date, item)
+        txn_where, txn_params = self._filter('txn_day', start_date, end_date, item)
+        kpis = self._query(f"""
+            SELECT
+                (SELECT count(*) FROM sales WHERE {row_where}) AS total_items_sold,
+                (SELECT count(DISTINCT Item) FROM sales WHERE {row_where}) AS unique_items,
+                (SELECT count(DISTINCT txn) FROM transaction_sales WHERE {txn_where}) AS unique_transactions
+        """, row_params + row_params + txn_params).iloc[0]
+        total_items_sold = int(kpis['total_items_sold'])
+        unique_transactions = int(kpis['unique_transactions'])
+        return {
+            'total_items_sold': total_items_sold,
+            'unique_transactions': unique_transactions,
+            'unique_items': int(kpis['unique_items']),
+            'avg_items_per_transaction': total_items_sold / unique_transactions if unique_transactions > 0 else 0,
+        }
+
+    def top_items(self, start_date, end_date, item=None, n=10):
+        where, params = self._filter('day', start_date, end_date, item)
+        return self._query(f"""
+            SELECT Item, count(*) AS Count FROM sales WHERE {where}
+            GROUP BY Item ORDER BY Count DESC, Item LIMIT {int(n)}
+        """, params)
+
+    def hourly(self, start_date, end_date, item=None):
+        where, params = self._filter('day', start_date, end_date, item)
+        hourly = self._query(f"SELECT hour AS Hour, count(*) AS Count FROM sales WHERE {where} GROUP BY hour", params)
+        hourly = hourly.set_index('Hour')['Count'].reindex(range(24), fill_value=0)
+        return hourly.rename_axis('Hour').reset_index()
+
+    def monthly_transactions(self, start_date, end_date, item=None, sketches=None):
+        where, params = self._filter('txn_day', start_date, end_date, item)
+        return self._query(f"""
+            SELECT strftime(txn_day, '%Y-%m') AS YearMonth, count(DISTINCT txn) AS UniqueTransactions
+            FROM transaction_sales WHERE {where} GROUP BY YearMonth ORDER BY YearMonth
+        """, params)
+
+    def transactions_by_period(self, start_date, end_date, item=None, freq='M', sketches=None):
+        where, params = self._filter('txn_day', start_date, end_date, item)
+        unit = _PERIOD_UNITS[freq]
+        counts = self._query(f"""
+            SELECT date_trunc('{unit}', txn_day) AS period, count(DISTINCT txn) AS UniqueTransactions
+            FROM transaction_sales WHERE {where} GROUP BY period ORDER BY period
+        """, params)
+        if counts.empty:  # אינדקס Period גם כשאין נתונים, כמו בקובייה
+            return pd.Series(dtype=np.int64, index=pd.PeriodIndex([], freq=freq))
+        return pd.Series(counts['UniqueTransactions'].to_numpy(),
+                         index=pd.DatetimeIndex(counts['period']).to_period(freq))
+
+    def daypart_counts(self, start_date, end_date, item=None, by_day_type=False):
+        where, params = self._filter('day', start_date, end_date, item)
+        if by_day_type:
+            counts = self._query(f"""
+                SELECT Daypart, weekday_weekend, count(*) AS Count FROM sales
+                WHERE {where} AND weekday_weekend IS NOT NULL GROUP BY Daypart, weekday_weekend
+            """, params)
+            return daypart_breakdown(counts.set_index(['Daypart', 'weekday_weekend'])['Count'])
+        counts = self._query(f"SELECT Daypart, count(*) AS Count FROM sales WHERE {where} GROUP BY Daypart", params)
+        order = {daypart: position for position, daypart in enumerate(DAYPART_ORDER)}
+        counts = counts.assign(order=counts['Daypart'].map(order)).sort_values('order', kind='stable')
+        return (counts.sort_values('Count', ascending=False, kind='stable')
+                .drop(columns='order').reset_index(drop=True))
+
+    # --- "נקנה יחד עם" (אותה חתימה ואותן עמודות כמו BasketMatrix.co_purchased) ---
+    def co_purchased(self, anchor_item, start_date, end_date, n=10):
+        columns = ['Item', 'QuantityWithAnchor', 'TotalSales', 'Support', 'Confidence', 'Lift']
+        result = self._query(f"""
+            WITH ranged AS (
+                SELECT txn, Item FROM transaction_sales WHERE txn_day BETWEEN ? AND ?
+            ),
+            anchor AS (
+                SELECT DISTINCT txn FROM ranged WHERE Item = ?
+            ),
+            per_item AS (
+                SELECT
+                    ranged.Item,
+                    count(anchor.txn) AS QuantityWithAnchor,
+                    count(*) AS TotalSales,
+                    count(DISTINCT anchor.txn) AS TransactionsWithAnchor,
+                    count(DISTINCT ranged.txn) AS ItemTransactions
+                FROM ranged LEFT JOIN anchor ON ranged.txn = anchor.txn
+                GROUP BY ranged.Item
+            ),
+            totals AS (
+                SELECT (SELECT count(DISTINCT txn) FROM ranged) AS n_transactions,
+                       (SELECT count(*) FROM anchor) AS anchor_transactions
+            )
+            SELECT
+                Item, QuantityWithAnchor, TotalSales,
+                TransactionsWithAnchor / n_transactions AS Support,
+                TransactionsWithAnchor / anchor_transactions AS Confidence,
+                (TransactionsWithAnchor * n_transactions) / (anchor_transactions * ItemTransactions) AS Lift
+            FROM per_item, totals
+            WHERE QuantityWithAnchor > 0 AND Item <> ?
+            ORDER BY QuantityWithAnchor DESC, Item
+            LIMIT {int(n)}
+        """, [start_date, end_date, anchor_item, anchor_item])
+        if result.empty:
+            return pd.DataFrame(columns=columns)
+        return result[columns]
+
+    # --- צמדי מוצרים וחוקי אסוציאציה (אותן חתימות ואותן עמודות כמו ב-PairCounts) ---
+    # הסלים הם המוצרים השונים של כל עסקה שהתחילה בטווח; צמד נספר פעם אחת בכל עסקה שכללה את שני המוצרים
+    _PAIRS_SQL = """
+        WITH baskets AS (
+            SELECT DISTINCT txn, Item FROM transaction_sales WHERE txn_day BETWEEN ? AND ? AND Item IS NOT NULL
+        ),
+        pairs AS (
+            SELECT first.Item AS ItemA, second.Item AS ItemB, count(*) AS Transactions
+            FROM baskets AS first JOIN baskets AS second ON first.txn = second.txn AND first.Item < second.Item
+            GROUP BY ALL
+        ),
+        item_transactions AS (
+            SELECT Item, count(*) AS ItemTransactions FROM baskets GROUP BY Item
+        ),
+        totals AS (
+            SELECT count(DISTINCT txn) AS n_transactions FROM baskets
+        )
+    """
+
+    def top_pairs(self, start_date, end_date, k=10, min_support=0.0, item=None):
+        item_filter, params = "", [start_date, end_date, min_support]
+        if item is not None:
+            item_filter = "AND (ItemA = ? OR ItemB = ?)"
+            params += [item, item]
+        return self._query(f"""{self._PAIRS_SQL}
+            SELECT ItemA, ItemB, Transactions, Transactions / n_transactions AS Support
+            FROM pairs, totals
+            WHERE Transactions / n_transactions >= ? {item_filter}
+            ORDER BY Transactions DESC, ItemA, ItemB
+            LIMIT {int(k)}
+        """, params)
+
+    def rules(self, start_date, end_date, k=10, min_support=0.01, min_confidence=0.0, item=None):
+        item_filter, params = "", [start_date, end_date, min_support, min_confidence]
+        if item is not None:
+            item_filter = "AND (Antecedent = ? OR Consequent = ?)"
+            params += [item, item]
+        return self._query(f"""{self._PAIRS_SQL},
+        frequent AS (
+            SELECT ItemA, ItemB, Transactions, n_transactions FROM pairs, totals
+            WHERE Transactions >= ? * n_transactions
+        ),
+        directed AS (
+            SELECT ItemA AS Antecedent, ItemB AS Consequent, Transactions, n_transactions FROM frequent
+            UNION ALL
+            SELECT ItemB, ItemA, Transactions, n_transactions FROM frequent
+        ),
+        scored AS (
+            SELECT
+                Antecedent, Consequent,
+                Transactions / n_transactions AS Support,
+                Transactions / antecedent.ItemTransactions AS Confidence,
+                Transactions / antecedent.ItemTransactions * n_transactions / consequent.ItemTransactions AS Lift
+            FROM directed
+            JOIN item_transactions AS antecedent ON antecedent.Item = Antecedent
+            JOIN item_transactions AS consequent ON consequent.Item = Consequent
+        )
+        SELECT * FROM scored
+        WHERE Confidence >= ? {item_filter}
+        ORDER BY Lift DESC, Support DESC, Antecedent, Consequent
+        LIMIT {int(k)}
+        """, params)
+
+
+@st.cache_resource(show_spinner="טוען נתונים ל-DuckDB...", max_entries=2)
+def _load_duckdb_sales(path, signature, daypart_bounds):
+    return DuckDBSales.from_path(path, daypart_bounds)
+
+
+def get_duckdb_sales(path):
+    """מחזיר את מנוע DuckDB של הקובץ, משותף לכל הסשנים (מוגדר מחדש כאשר הקובץ משתנה)."""
+    return _load_duckdb_sales(path, file_signature(path), settings.DAYPART_BOUNDS)
+
+
+@st.cache_resource(show_spinner="טוען נתונים ל-DuckDB...", max_entries=2)
+def _load_duckdb_dataset(path, signature, daypart_bounds):
+    load_timings = {}
+    started = time.perf_counter()
+    engine = _load_duckdb_sales(path, signature, daypart_bounds)
+    load_timings['duckdb'] = (time.perf_counter() - started) * 1000
+    min_date, max_date = engine.date_range()
+    total_item_sales = engine.item_sales()
+    return {
+        'df': None,
+        'engine': engine,
+        'version': (path, 'duckdb') + signature,
+        'min_date': min_date,
+        'max_date': max_date,
+        'total_item_sales': total_item_sales,
+        'all_items_options': [ALL_ITEMS_LABEL] + sorted(total_item_sales['Item'].tolist()),
+        'load_timings': load_timings,
+    }
+
+
+def load_duckdb_dataset(path):
+    """
+    המקבילה של data_loader.load_sales_data למנוע DuckDB: טווח התאריכים ורשימת המוצרים משאילתות,
+    והמנוע עצמו ב-'engine' - ללא טבלת pandas ('df' הוא None).
+    """
+    return _load_duckdb_dataset(path, file_signature(path), settings.DAYPART_BOUNDS)
+
+
+@st.cache_resource(show_spinner="מסכם את חלון התחזית...", max_entries=2)
+def _build_history_cube(version, days, _engine):
+    return _engine.history_cube(days)
+
+
+def get_history_cube(dataset, days):
+    """הקובייה של חלון האימון של התחזית עבור dataset של DuckDB (נבנית פעם אחת לכל גרסת נתונים)."""
+    return _build_history_cube(dataset['version'], days, dataset['engine'])
+
+
+# --- בדיקת התאמה בין המנועים ---
+def compare_engines(path, ranges=None, items=None, top_n=10):
+    """
+    מריץ את dashboard_view בשני המנועים (ללא Streamlit) ומשווה כל טבלה, גם במגמה יומית ושבועית,
+    ואת הצמדים, חוקי האסוציאציה והתחזית (מהקובייה המלאה מול history_cube).
+    ranges - רשימת (מתאריך, עד תאריך); ברירת המחדל: כל הנתונים וכל חודש בנפרד.
+    items - מוצרים לסינון (בנוסף ל"כל המוצרים"); ברירת המחדל: חמשת הנמכרים ביותר.
+    בנוסף נבדקות בחירות ריקות (מוצר בטווח שבו לא נמכר - empty_selections) גם מול המצב המקורב (HyperLogLog).
+    מחזיר רשימת אי-התאמות (פילטר, מפתח, תיאור) - ריקה כאשר המנועים תואמים.
+    """
+    from analytics import dashboard_view
+    from association_rules import PairCounts
+    from basket import BasketMatrix
+    from data_loader import read_sales_data
+    from forecast import HISTORY_DAYS, fit_forecast_models
+    from hll import DistinctSketches
+
+    df = read_sales_data(path)
+    cube, basket = SalesCube.from_frame(df), BasketMatrix.from_frame(df)
+    pair_counts = PairCounts.from_basket(basket)
+    engine = DuckDBSales.from_path(path, settings.DAYPART_BOUNDS)
+
+    if ranges is None:
+        first_day, last_day = engine.date_range()
+        months = pd.period_range(first_day, last_day, freq='M')
+        ranges = [(first_day, last_day)] + [(max(month.start_time.date(), first_day), min(month.end_time.date(), last_day))
+                                            for month in months]
+    if items is None:
+        items = df['Item'].value_counts().index[:5].astype(str).tolist()
+
+    mismatches = []
+    for start_date, end_date in ranges:
+        for item in [None] + list(items):
+            for trend_granularity in (None, 'day', 'week'):
+                expected = dashboard_view(cube, basket, start_date, end_date, item, top_n=top_n,
+                                          trend_granularity=trend_granularity)
+                actual = dashboard_view(engine, engine, start_date, end_date, item, top_n=top_n,
+                                        trend_granularity=trend_granularity)
+                mismatches.extend(((start_date, end_date, item), key, problem)
+                                  for key, problem in _compare_views(expected, actual))
+            for min_support in (0.0, 0.01):
+                for key in ('top_pairs', 'rules'):
+                    problem = _compare_values(
+                        getattr(pair_counts, key)(start_date, end_date, k=top_n, min_support=min_support, item=item),
+                        getattr(engine, key)(start_date, end_date, k=top_n, min_support=min_support, item=item))
+                    if problem:
+                        mismatches.append(((start_date, end_date, item), f"{key} (min_support={min_support})", problem))
+
+    # התחזית ללא תקציב זמן (כל המוצרים ברגרסיה או בנאיבי לפי הבדיקה) - זהה בשתי הקוביות
+    expected_forecasts = fit_forecast_models(cube, budget_seconds=float('inf'), workers=1)
+    actual_forecasts = fit_forecast_models(engine.history_cube(HISTORY_DAYS), budget_seconds=float('inf'), workers=1)
+    for item in [None] + list(items):
+        problem = _compare_values(expected_forecasts.chart_frame(item), actual_forecasts.chart_frame(item))
+        if problem:
+            mismatches.append(((None, None, item), 'forecast', problem))
+
+    # בבחירה ריקה כל המצבים מחזירים טבלאות ריקות (והעמוד מציג "אין נתונים") - ללא חריגה
+    sketches = DistinctSketches.from_frame(df)
+    for start_date, end_date, item in empty_selections(df):
+        for trend_granularity in (None, 'day', 'week'):
+            expected = dashboard_view(cube, basket, start_date, end_date, item, top_n=top_n,
+                                      trend_granularity=trend_granularity)
+            for actual in (
+                dashboard_view(engine, engine, start_date, end_date, item, top_n=top_n,
+                               trend_granularity=trend_granularity),
+                dashboard_view(cube, basket, start_date, end_date, item, sketches=sketches, top_n=top_n,
+                               trend_granularity=trend_granularity),
+            ):
+                mismatches.extend(((start_date, end_date, item), key, problem)
+                                  for key, problem in _compare_views(expected, actual))
+    return mismatches
+
+
+def empty_selections(df):
+    """(מתאריך, עד תאריך, מוצר) שבהם המוצר הנמכר הכי מעט לא נמכר כלל - לפני המכירה הראשונה שלו ואחרי האחרונה."""
+    first_day, last_day = df['date_time'].iloc[0].date(), df['date_time'].iloc[-1].date()
+    item = str(df['Item'].value_counts(ascending=True).index[0])
+    item_days = df.loc[df['Item'] == item, 'date_time']
+    selections = []
+    if item_days.min().date() > first_day:
+        selections.append((first_day, item_days.min().date() - datetime.timedelta(days=1), item))
+    if item_days.max().date() < last_day:
+        selections.append((item_days.max().date() + datetime.timedelta(days=1), last_day, item))
+    return selections
+
+
+def _compare_views(expected, actual):
+    """(מפתח, תיאור ההבדל) לכל ערך ששונה בין שתי תוצאות של dashboard_view."""
+    for key, value in expected.items():
+        problem = _compare_values(value, actual[key])
+        if problem:
+            yield key, problem
+
+
+def _compare_values(expected, actual):
+    """תיאור ההבדל בין שתי תוצאות (טבלה, מילון או ערך), או None כאשר הן זהות."""
+    if isinstance(expected, pd.DataFrame):
+        if expected.empty and actual.empty:
+            return None
+        try:
+            pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                          check_dtype=False, check_column_type=False, rtol=1e-12)
+        except AssertionError as error:
+            return str(error)
+        return None
+    if expected != actual:
+        return f"{expected!r} != {actual!r}"
+    return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="בדיקת התאמה בין מנוע pandas למנוע DuckDB.")
+    parser.add_argument('path', nargs='?', default="bakery_sales_revised.csv", help="קובץ CSV או Parquet")
+    parser.add_argument('--items', nargs='+', help="מוצרים לבדיקה (ברירת מחדל: חמשת הנמכרים ביותר)")
+    parser.add_argument('--ranges', nargs='+', help="טווחים בפורמט YYYY-MM-DD:YYYY-MM-DD")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ranges = None
+    if args.ranges:
+        ranges = [tuple(datetime.date.fromisoformat(part) for part in value.split(':')) for value in args.ranges]
+    mismatches = compare_engines(args.path, ranges, args.items)
+    for (start_date, end_date, item), key, problem in mismatches:
+        print(f"{start_date}..{end_date} {item or 'כל המוצרים'} - {key}:\n{problem}\n")
+    print("המנועים תואמים" if not mismatches else f"{len(mismatches)} אי-התאמות")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
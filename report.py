@@ -0,0 +1,202 @@
+import asyncio
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.io as pio
+
+# --- ייבוא ספריות לייצוא PDF ---
+# ודא שהתקנת אותן: pip install reportlab kaleido
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+
+try:
+    import kaleido
+except ImportError:  # ללא kaleido אין ייצוא תמונות; השגיאה תוצג בעת יצירת הדוח
+    kaleido = None
+
+# --- יצירת דוח PDF ברקע ---
+# הגרפים מומרים לתמונות במקביל בעזרת מופע Kaleido "חם" אחד לכל התהליך (דפדפן שנפתח פעם אחת),
+# והדוחות נבנים ב-thread pool כך שהסשן של המשתמש לא נחסם.
+# דוח שהושלם נשמר בזיכרון לפי מפתח (גרסת נתונים, מתאריך, עד תאריך, מוצר) - הורדה חוזרת מיידית.
+
+IMAGE_OPTIONS = {'format': 'png', 'width': 800, 'height': 500, 'scale': 2}  # scale=2 להגדלת הרזולוציה
+RENDER_TABS = 4  # מספר הגרפים שמומרים במקביל
+RENDER_TIMEOUT_SECONDS = 120
+MAX_CACHED_REPORTS = 32
+
+
+class _KaleidoRenderer:
+    """מופע Kaleido פתוח שרץ בלולאת asyncio ייעודית; מספר גרפים מומרים במקביל בלשוניות נפרדות."""
+
+    def __init__(self, n_tabs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="kaleido-renderer", daemon=True)
+        self._thread.start()
+        try:
+            self._kaleido = self._run(self._open(n_tabs))
+        except BaseException:
+            # הפתיחה נכשלה (למשל Chrome לא נמצא) - הלולאה וה-thread שלה נעצרים, כך שניסיון חוזר לא משאיר thread
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            raise
+
+    def _run(self, coroutine):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(RENDER_TIMEOUT_SECONDS)
+        except TimeoutError:
+            future.cancel()  # ההמרה לא ממשיכה לרוץ בלולאה אחרי שוויתרנו עליה
+            raise
+
+    @staticmethod
+    async def _open(n_tabs):
+        renderer = kaleido.Kaleido(n=n_tabs)
+        await renderer.open()
+        return renderer
+
+    def render(self, fig_dicts):
+        async def render_all():
+            return await asyncio.gather(*(self._kaleido.calc_fig(fig, opts=IMAGE_OPTIONS) for fig in fig_dicts))
+        return self._run(render_all())
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def _get_renderer():
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = _KaleidoRenderer(RENDER_TABS)
+        return _renderer
+
+
+def render_figures(figs):
+    """ממיר רשימת גרפים (Figure או dict) לתמונות PNG במקביל. ערך None נשמר כ-None."""
+    fig_dicts = [fig if fig is None or isinstance(fig, dict) else fig.to_dict() for fig in figs]
+    present = [fig for fig in fig_dicts if fig is not None]
+    if not present:
+        return [None] * len(figs)
+    if kaleido is not None and hasattr(kaleido, 'Kaleido'):
+        images = iter(_get_renderer().render(present))
+    else:
+        # Kaleido ישן (0.x) - ללא מופע חם; ההמרה עדיין רצה במקביל
+        with ThreadPoolExecutor(max_workers=RENDER_TABS) as pool:
+            images = iter(list(pool.map(lambda fig: pio.to_image(fig, **IMAGE_OPTIONS), present)))
+    return [None if fig is None else next(images) for fig in fig_dicts]
+
+
+# --- פונקציה ליצירת דוח PDF ---
+def generate_pdf_report(
+    unique_transactions_val,
+    total_items_sold_val,
+    unique_items_val,
+    avg_items_per_transaction_val,
+    fig1_obj, fig2_obj, fig3_obj, fig4_obj,
+    coffee_table_df,
+    anchor_item_val="Coffee"
+):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    Story = []
+
+    # כותרת הדוח
+    Story.append(Paragraph("דוח מכירות מאפייה - סיכום", styles['h1']))
+    Story.append(Spacer(1, 0.2 * inch))
+
+    # מדדי מפתח (KPIs)
+    Story.append(Paragraph("<b>מדדי מפתח:</b>", styles['h2']))
+    Story.append(Paragraph(f"<b>סה\"כ עסקאות:</b> {unique_transactions_val}", styles['Normal']))
+    Story.append(Paragraph(f"<b>סה\"כ פריטים שנמכרו:</b> {total_items_sold_val}", styles['Normal']))
+    Story.append(Paragraph(f"<b>מספר פריטים ייחודיים:</b> {unique_items_val}", styles['Normal']))
+    Story.append(Paragraph(f"<b>ממוצע פריטים לעסקה:</b> {avg_items_per_transaction_val:.2f}", styles['Normal']))
+    Story.append(Spacer(1, 0.2 * inch))
+
+    # טבלת מוצרים הנקנים עם מוצר העוגן (קפה כברירת מחדל)
+    if not coffee_table_df.empty:
+        Story.append(Paragraph(f"<b>מוצרים הנקנים לרוב עם {anchor_item_val}:</b>", styles['h2']))
+        # עמודות האחוזים כבר מכילות את ה-% מהלוגיקה של ה-DataFrame בדשבורד.
+        # כאן רק ממירים את כל הערכים לסטרינג, כדי לוודא תאימות לטבלה של reportlab.
+        coffee_table_df_for_pdf = coffee_table_df.astype(str)
+
+        data = [coffee_table_df_for_pdf.columns.tolist()] + coffee_table_df_for_pdf.values.tolist()
+        table = Table(data)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        Story.append(table)
+        Story.append(Spacer(1, 0.2 * inch))
+
+    # הוספת גרפים כתמונות
+    chart_objects = [
+        ("10 הפריטים הנמכרים ביותר", fig1_obj),
+        ("התפלגות מכירות לפי שעה ביום", fig2_obj),
+        ("מגמת עסקאות חודשית", fig4_obj), # fig4 הוא גרף מגמת העסקאות
+        ("התפלגות מכירות לפי חלק ביום", fig3_obj) # fig3 הוא גרף ה-Daypart
+    ]
+
+    # כל הגרפים מומרים לתמונות במקביל, לפני בניית הדוח
+    images = render_figures([fig_obj for _, fig_obj in chart_objects])
+
+    for (title, _), image_bytes in zip(chart_objects, images):
+        if image_bytes: # ודא שהגרף קיים (במקרה של Daypart שלא תמיד מוצג)
+            img = Image(io.BytesIO(image_bytes))
+            img.drawHeight = 4 * inch # התאמת גובה התמונה ב-PDF
+            img.drawWidth = 6 * inch  # התאמת רוחב התמונה ב-PDF
+            
+            Story.append(Paragraph(f"<b>{title}:</b>", styles['h2']))
+            Story.append(img)
+            Story.append(Spacer(1, 0.2 * inch))
+
+    doc.build(Story)
+    buffer.seek(0)
+    return buffer
+
+
+# --- יצירת דוחות ברקע עם מטמון לפי מפתח ---
+_report_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-report")
+_reports = OrderedDict()  # מפתח דוח -> Future של ה-PDF (bytes)
+_reports_lock = threading.Lock()
+
+
+def _build_report_bytes(*args):
+    return generate_pdf_report(*args).getvalue()
+
+
+def submit_pdf_report(report_key, *args):
+    """
+    מתחיל ליצור דוח ברקע (או מחזיר את הדוח הקיים עבור אותו מפתח) ומחזיר Future של תוכן ה-PDF.
+    הארגומנטים זהים לאלו של generate_pdf_report; הגרפים מומרים ל-dict כדי שהעבודה ברקע תהיה על עותק.
+    """
+    args = [arg.to_dict() if hasattr(arg, 'to_plotly_json') else arg for arg in args]
+    with _reports_lock:
+        future = _reports.get(report_key)
+        if future is not None and not (future.done() and future.exception() is not None):
+            _reports.move_to_end(report_key)
+            return future
+        future = _report_executor.submit(_build_report_bytes, *args)
+        _reports[report_key] = future
+        while len(_reports) > MAX_CACHED_REPORTS:
+            _reports.popitem(last=False)
+        return future
+
+
+def get_pdf_report(report_key):
+    """מחזיר את ה-Future של דוח שכבר התבקש עבור המפתח, או None."""
+    with _reports_lock:
+        return _reports.get(report_key)
+
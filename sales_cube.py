@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from daypart import DAY_TYPE_ORDER, DAYPART_ORDER, day_type_column, daypart_column
+
+# --- קוביית נתונים מצטברת (יום x שעה x מוצר, כולל חלק היום וסוג היום) ---
+# הקובייה נבנית פעם אחת לכל גרסה של הנתונים, וכל המדדים והגרפים נענים ממנה.
+# שינוי טווח תאריכים הופך לחיתוך זול של לכל היותר ~365x24xN תאים, במקום סריקה של כל העסקאות.
+
+
+class SalesCube:
+    """
+    אגרגציה של העסקאות לפי (יום, שעה, מוצר).
+
+    cells - כמות הפריטים שנמכרו בכל תא, ממוין לפי יום. חלק היום וסוג היום נקבעים כמעט לגמרי
+            לפי השעה והיום, ולכן שמירתם כעמודות בתאים כמעט לא מגדילה את הקובייה.
+    day_transactions - מספר העסקאות הייחודיות בכל יום.
+    day_item_transactions - מספר העסקאות הייחודיות שכללו כל מוצר בכל יום.
+
+    עסקה משויכת ליום שבו היא התחילה, כך שסכום של ספירות יומיות שווה בדיוק
+    למספר העסקאות הייחודיות בטווח (nunique) - בלי לשמור את מזהי העסקאות עצמם.
+    """
+
+    def __init__(self, cells, day_transactions, day_item_transactions):
+        self.cells = cells
+        self.day_transactions = day_transactions
+        self.day_item_transactions = day_item_transactions
+
+    @classmethod
+    def from_frame(cls, df):
+        """בונה קובייה מטבלת העסקאות הגולמית (date_time, Transaction, Item, ואופציונלית Daypart)."""
+        day = df['date_time'].dt.normalize().rename('day')
+        hour = df['date_time'].dt.hour.rename('hour')
+        daypart = df['Daypart'] if 'Daypart' in df.columns else daypart_column(df)
+        day_type = day_type_column(df)  # כבר קטגוריאלית בטבלה שנטענה - ללא עלות משמעותית
+        cells = (df.groupby([day, hour, df['Item'], daypart, day_type], observed=True, sort=True)
+                 .size().rename('Count').reset_index())
+
+        # היום של כל עסקה = היום של השורה הראשונה שלה (לפי זמן)
+        txn_day = day.groupby(df['Transaction']).transform('min')
+        first_rows = ~df['Transaction'].duplicated()
+        day_transactions = (txn_day[first_rows].value_counts().sort_index()
+                            .rename('Transactions').rename_axis('day').reset_index())
+
+        first_item_rows = ~df.duplicated(subset=['Transaction', 'Item'])
+        day_item_transactions = (
+            pd.DataFrame({'day': txn_day[first_item_rows], 'Item': df['Item'][first_item_rows]})
+            .groupby(['day', 'Item'], observed=True, sort=True).size()
+            .rename('Transactions').reset_index()
+        )
+        return cls(cells, day_transactions, day_item_transactions)
+
+    @classmethod
+    def concat(cls, cubes, items=None):
+        """
+        מאחד קוביות של חלקים נפרדים מהנתונים (למשל מקטעי קובץ, ראו chunked_loader.py) בסכימת הספירות.
+        כל עסקה צריכה להופיע בקובייה אחת בלבד. items - קטגוריות המוצרים של התוצאה, שמכילות את אלו של כל
+        הקוביות (ברירת מחדל: של האחרונה - כאשר הקטגוריות של כל קובייה הן תחילית שלה).
+        """
+        if items is None:
+            items = cubes[-1].cells['Item'].cat.categories
+
+        def combine(tables, keys, value):
+            tables = [table.assign(Item=table['Item'].cat.set_categories(items)) for table in tables]
+            return (pd.concat(tables, ignore_index=True)
+                    .groupby(keys, observed=True, sort=True)[value].sum().reset_index())
+
+        return cls(
+            combine([cube.cells for cube in cubes], ['day', 'hour', 'Item', 'Daypart', 'weekday_weekend'], 'Count'),
+            pd.concat([cube.day_transactions for cube in cubes], ignore_index=True)
+            .groupby('day', sort=True)['Transactions'].sum().reset_index(),
+            combine([cube.day_item_transactions for cube in cubes], ['day', 'Item'], 'Transactions'),
+        )
+
+    # --- חיתוך לפי טווח תאריכים ---
+    @staticmethod
+    def _slice(table, start_date, end_date, item=None):
+        """מחזיר את השורות בטווח [start_date, end_date] בעזרת חיפוש בינארי על עמודת היום הממוינת."""
+        days = table['day'].to_numpy()
+        # הגבולות ביחידה של העמודה - אחרת numpy ממיר את כל המערך בכל חיפוש
+        lo = np.searchsorted(days, np.datetime64(start_date, 'D').astype(days.dtype), side='left')
+        hi = np.searchsorted(days, np.datetime64(end_date, 'D').astype(days.dtype), side='right')
+        sliced = table.iloc[lo:hi]
+        if item is not None:
+            sliced = sliced[sliced['Item'] == item]
+        return sliced
+
+    def cells_in_range(self, start_date, end_date, item=None):
+        return self._slice(self.cells, start_date, end_date, item)
+
+    def transactions_in_range(self, start_date, end_date, item=None):
+        """ספירות העסקאות היומיות בטווח (לכלל העסקאות או רק לעסקאות שכללו את המוצר)."""
+        if item is None:
+            return self._slice(self.day_transactions, start_date, end_date)
+        return self._slice(self.day_item_transactions, start_date, end_date, item)
+
+    # --- שאילתות עבור המדדים והגרפים ---
+    # sketches (אופציונלי) - סקיצות HyperLogLog; כאשר מועברות, ספירת העסקאות הייחודיות מקורבת
+    def kpis(self, start_date, end_date, item=None, sketches=None):
+        cells = self.cells_in_range(start_date, end_date, item)
+        total_items_sold = int(cells['Count'].sum())
+        if sketches is not None:
+            unique_transactions = sketches.count(start_date, end_date, item)
+        else:
+            unique_transactions = int(self.transactions_in_range(start_date, end_date, item)['Transactions'].sum())
+        unique_items = int(cells.loc[cells['Count'] > 0, 'Item'].nunique())
+        avg_items_per_transaction = total_items_sold / unique_transactions if unique_transactions > 0 else 0
+        return {
+            'total_items_sold': total_items_sold,
+            'unique_transactions': unique_transactions,
+            'unique_items': unique_items,
+            'avg_items_per_transaction': avg_items_per_transaction,
+        }
+
+    def top_items(self, start_date, end_date, item=None, n=10):
+        cells = self.cells_in_range(start_date, end_date, item)
+        top = cells.groupby('Item', observed=True)['Count'].sum()
+        top = top[top > 0].reset_index()
+        top['Item'] = top['Item'].astype(str)
+        # שוויון בכמות מוכרע לפי שם המוצר, כך שהתוצאה אינה תלויה בסדר הקטגוריות
+        return top.sort_values(['Count', 'Item'], ascending=[False, True], kind='stable').head(n).reset_index(drop=True)
+
+    def hourly(self, start_date, end_date, item=None):
+        cells = self.cells_in_range(start_date, end_date, item)
+        hourly = cells.groupby('hour')['Count'].sum().reindex(range(24), fill_value=0)
+        return hourly.rename_axis('Hour').reset_index()
+
+    def transactions_by_period(self, start_date, end_date, item=None, freq='M', sketches=None):
+        """
+        עסקאות ייחודיות לכל תקופה בטווח - סדרה עם אינדקס Period, ללא תקופות ריקות.
+        freq - 'D' (יום), 'W' (שבוע שמתחיל ביום שני) או 'M' (חודש). סכום הספירות היומיות מדויק
+        לכל תקופה, כי כל עסקה משויכת ליום אחד.
+        """
+        if sketches is not None:
+            counts = sketches.count_by_period(start_date, end_date, item, freq)
+        else:
+            daily = self.transactions_in_range(start_date, end_date, item)
+            counts = daily.groupby(daily['day'].dt.to_period(freq))['Transactions'].sum()
+        return counts[counts > 0]
+
+    def monthly_transactions(self, start_date, end_date, item=None, sketches=None):
+        monthly = self.transactions_by_period(start_date, end_date, item, 'M', sketches)
+        return pd.DataFrame({
+            'YearMonth': monthly.index.strftime('%Y-%m'),
+            'UniqueTransactions': monthly.to_numpy(),
+        })
+
+    def daypart_counts(self, start_date, end_date, item=None, by_day_type=False):
+        """
+        פריטים שנמכרו בכל חלק של היום (Daypart, Count), מהגדול לקטן.
+        by_day_type=True - פירוק נוסף לאמצע שבוע / סוף שבוע (Daypart, weekday_weekend, Count).
+        """
+        cells = self.cells_in_range(start_date, end_date, item)
+        if by_day_type:
+            return daypart_breakdown(cells.groupby(['Daypart', 'weekday_weekend'], observed=True)['Count'].sum())
+        daypart = cells.groupby('Daypart', observed=True)['Count'].sum()
+        daypart = daypart[daypart > 0].sort_values(ascending=False, kind='stable')
+        daypart = daypart.reset_index()
+        daypart['Daypart'] = daypart['Daypart'].astype(str)
+        return daypart
+
+
+def daypart_breakdown(counts):
+    """
+    ממיר ספירות לפי (Daypart, weekday_weekend) לטבלה שטוחה: כל הצירופים בסדר קבוע
+    (חלקי היום לפי DAYPART_ORDER, אמצע שבוע לפני סוף שבוע), ללא צירופים ריקים.
+    """
+    index = pd.MultiIndex.from_product([DAYPART_ORDER, DAY_TYPE_ORDER], names=['Daypart', 'weekday_weekend'])
+    counts = counts.rename('Count')
+    counts.index = counts.index.set_levels([level.astype(str) for level in counts.index.levels])
+    counts = counts.reindex(index, fill_value=0)
+    return counts[counts > 0].reset_index()
+
+
+@st.cache_resource(show_spinner="מכין אגרגציות...", max_entries=4)
+def _build_sales_cube(version, _df):
+    return SalesCube.from_frame(_df)
+
+
+def get_sales_cube(dataset):
+    """מחזיר את הקובייה של גרסת הנתונים הנוכחית (נבנית פעם אחת ומשותפת לכל הסשנים)."""
+    if dataset.get('cube') is not None:  # נבנתה כבר בזמן טעינה במקטעים
+        return dataset['cube']
+    return _build_sales_cube(dataset['version'], dataset['df'])
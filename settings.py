@@ -0,0 +1,61 @@
+import os
+
+from daypart import parse_daypart_bounds
+
+# --- הגדרות הדשבורד (ממשתני סביבה) ---
+# כל ההגדרות אופציונליות; ערכי ברירת המחדל שומרים על התנהגות הדשבורד המקורית.
+
+# ספירת עסקאות ייחודיות: 'exact' (מדויק, ברירת מחדל) או 'approx' (סקיצות HyperLogLog)
+DISTINCT_MODE = os.environ.get("DASHBOARD_DISTINCT_MODE", "exact").lower()
+
+# השגיאה היחסית המקסימלית הרצויה במצב המקורב (0.02 = 2%)
+HLL_RELATIVE_ERROR = float(os.environ.get("DASHBOARD_HLL_ERROR", "0.02"))
+
+# מצב מדידת זמני רינדור לכל קטע בעמוד (ניתן להפעיל גם עם ?profile=1 בכתובת)
+PROFILE = os.environ.get("DASHBOARD_PROFILE", "").lower() in ("1", "true", "yes")
+
+# קובץ JSON lines שאליו נכתבים זמני כל ריצה במצב מדידה (ריק = ללא ייצוא)
+PROFILE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG", "dashboard_timings.jsonl")
+
+# גבולות חלקי היום בשעות "בוקר,צהריים,ערב,לילה" (למשל 5,12,17,21). כאשר לא מוגדר, חלק היום נלקח
+# מעמודת period_day שבקובץ (ואם אינה קיימת - לפי גבולות ברירת המחדל)
+_daypart_bounds = os.environ.get("DASHBOARD_DAYPART_BOUNDS", "")
+DAYPART_BOUNDS = parse_daypart_bounds(_daypart_bounds) if _daypart_bounds else None
+
+# מקור הנתונים: קובץ CSV יחיד, או תיקייה / תבנית glob של קבצים לפי סניף ותאריך (ראו partitions.py)
+DATA_SOURCE = os.environ.get("DASHBOARD_DATA_SOURCE", "bakery_sales_revised.csv")
+
+# מספר הקבצים שנקראים במקביל במקור מחולק (0 = מספר הליבות)
+LOAD_WORKERS = int(os.environ.get("DASHBOARD_LOAD_WORKERS", "0"))
+
+# כל כמה שניות לסרוק מחדש את הקבצים של מקור מחולק (קבצים חדשים או שהשתנו מתגלים אחרי זמן זה)
+CATALOG_SECONDS = float(os.environ.get("DASHBOARD_CATALOG_SECONDS", "10"))
+
+# אופן טעינת הנתונים: 'memory' (כל הטבלה בזיכרון, ברירת מחדל) או 'chunked' (במקטעים, לקבצים גדולים מהזיכרון)
+INGEST_MODE = os.environ.get("DASHBOARD_INGEST_MODE", "memory").lower()
+
+# מספר השורות בכל מקטע במצב chunked - קובע את הזיכרון בשיא בזמן הטעינה
+CHUNK_ROWS = int(os.environ.get("DASHBOARD_CHUNK_ROWS", "200000"))
+
+# מעקב אחר שורות שנוספות לסוף הקובץ: כל כמה שניות לבדוק אם נוספו שורות (0 = כבוי).
+# במצב מעקב נשמרות רק האגרגציות, כמו במצב chunked
+FOLLOW_SECONDS = float(os.environ.get("DASHBOARD_FOLLOW_SECONDS", "0"))
+
+# מנוע החישובים של מדדי העמוד: 'pandas' (מבנים מחושבים מראש, ברירת מחדל) או 'duckdb' (שאילתות SQL
+# על הקובץ בכל הליבות, דורש את החבילה duckdb - ראו query_engine.py)
+QUERY_ENGINE = os.environ.get("DASHBOARD_ENGINE", "pandas").lower()
+
+# אופן החלת הפילטרים: 'live' (כל שינוי בווידג'ט מריץ את העמוד מחדש, ברירת מחדל) או 'form' (התאריכים,
+# המוצר והסניפים נאספים בטופס ומוחלים יחד בלחיצה על "החל פילטרים" - ריצה אחת לכל סט פילטרים)
+FILTER_MODE = os.environ.get("DASHBOARD_FILTER_MODE", "live").lower()
+
+# רזולוציית גרף המגמה: 'month' (חודשי, ברירת מחדל), 'day', 'week' או 'auto' (לפי אורך הטווח).
+# בכל מצב שאינו month, סדרה ארוכה מדוללת ב-LTTB למספר נקודות מרבי
+TREND_GRANULARITY = os.environ.get("DASHBOARD_TREND_GRANULARITY", "month").lower()
+TREND_MAX_POINTS = int(os.environ.get("DASHBOARD_TREND_MAX_POINTS", "400"))
+
+# תחזית הביקוש (ראו forecast.py): אופק התחזית בימים, תקציב הזמן בשניות להתאמת המודלים לכל המוצרים,
+# ומספר ה-threads להתאמה (0 = מספר הליבות, 1 = ב-thread של הריצה)
+FORECAST_HORIZON_DAYS = int(os.environ.get("DASHBOARD_FORECAST_HORIZON_DAYS", "7"))
+FORECAST_BUDGET_SECONDS = float(os.environ.get("DASHBOARD_FORECAST_BUDGET_SECONDS", "2.0"))
+FORECAST_WORKERS = int(os.environ.get("DASHBOARD_FORECAST_WORKERS", "0"))
@@ -0,0 +1,138 @@
+import io
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from chunked_loader import DEFAULT_CHUNK_ROWS, AggregateBuilder, split_last_transaction
+from data_loader import prepare_sales_frame
+
+# --- מעקב אחרי קובץ שמתווספות אליו שורות (tail-follow) ---
+# מערכת הקופה מוסיפה עסקאות לסוף קובץ ה-CSV במהלך היום. במקום לטעון את כל הקובץ מחדש, נשמרים
+# ההיסט (בבייטים) ומספר השורות שכבר עובדו; כל רענון קורא רק את הבייטים החדשים, מעבד אותם
+# ומקפל אותם לאגרגציות הקיימות (ראו chunked_loader.AggregateBuilder) - עלות ביחס לשורות החדשות.
+#
+# שורה שנכתבה רק חלקית (ללא ירידת שורה) נשארת לרענון הבא. השורות של העסקה האחרונה בקובץ לא
+# מקופלות עד שמגיעה שורה של עסקה אחרת (העסקה עוד עשויה להימשך בהוספה הבאה) - הן נכללות רק ב-snapshot
+# שמתפרסם, כך שעסקה שנחצתה בין שני רענונים נספרת פעם אחת.
+# כל רענון מפרסם dataset חדש (snapshot); סשנים שכבר קראו את הקודם לא מושפעים מהמיזוג.
+# קובץ שהתקצר או הוחלף (inode אחר) נטען מחדש מההתחלה.
+
+_BYTES_PER_ROW_HINT = 64  # להערכת גודל קריאה של chunk_rows שורות
+
+
+class FollowedSales:
+    """האגרגציות של קובץ CSV שגדל, עם רענון מצטבר מההיסט האחרון שעובד."""
+
+    def __init__(self, path, chunk_rows=DEFAULT_CHUNK_ROWS, relative_error=None):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.relative_error = relative_error
+        self.last_refresh = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.builder = AggregateBuilder(self.relative_error)
+        self.columns = None
+        self.offset = 0  # סוף השורה השלמה האחרונה שעובדה (בבייטים)
+        self.rows_read = 0  # שורות הנתונים שנקראו מהקובץ
+        self.carry = None  # השורות הגולמיות של העסקה האחרונה - מקופלות כשמגיעה עסקה אחרת
+        self.inode = None
+        self.dataset = None  # None כל עוד אין בקובץ שורות נתונים
+        self._shares_pair_counts = False  # ספירות הצמדים של המצב הן אלו של ה-dataset שפורסם
+
+    def _read_header(self, source):
+        """קורא את שורת הכותרת; False כשהיא עוד לא נכתבה במלואה (קובץ ריק או חדש)."""
+        header = source.readline()
+        if not header.endswith(b'\n'):
+            return False
+        self.columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+        self.offset = len(header)
+        return True
+
+    def _new_blocks(self):
+        """
+        קורא מההיסט האחרון בבלוקים של שורות שלמות ומחזיר כל בלוק כ-DataFrame גולמי.
+        הקריאה נעצרת בשורה החלקית הראשונה - בייטים אחריה לא נקראים גם אם הקובץ גדל בינתיים.
+        """
+        with open(self.path, 'rb') as source:
+            if self.columns is None and not self._read_header(source):
+                return
+            source.seek(self.offset)
+            while True:
+                lines = source.readlines(self.chunk_rows * _BYTES_PER_ROW_HINT)
+                partial = bool(lines) and not lines[-1].endswith(b'\n')
+                if partial:
+                    lines.pop()  # שורה שעדיין נכתבת - תיקרא ברענון הבא
+                if lines:
+                    block = b''.join(lines)
+                    self.offset += len(block)
+                    self.rows_read += len(lines)
+                    yield pd.read_csv(io.BytesIO(block), header=None, names=self.columns)
+                if partial or not lines:
+                    return
+
+    def _fold(self, raw, builder=None):
+        if builder is None:
+            builder = self.builder
+        if len(raw):
+            df = prepare_sales_frame(raw)
+            if len(df):
+                if builder is self.builder and self._shares_pair_counts:
+                    # הקיפול ממזג לתוך ספירות הצמדים - עותק רק כשיש מה לקפל (copy-on-write), כדי לא לשנות
+                    # dataset שכבר פורסם; רענון ללא שורות חדשות לא מעתיק דבר
+                    builder.pair_counts = builder.pair_counts.copy()
+                    self._shares_pair_counts = False
+                builder.add(df)
+
+    def refresh(self):
+        """
+        מעבד את השורות שנוספו מאז הרענון הקודם ומפרסם dataset חדש אם היו כאלה.
+        מחזיר את מספר השורות החדשות שנקראו. קובץ שהתקצר (הוחלף) נטען מחדש מההתחלה.
+        """
+        with self._lock:
+            stat = os.stat(self.path)
+            if stat.st_size < self.offset or (self.inode is not None and stat.st_ino != self.inode):
+                self._reset()
+            self.inode = stat.st_ino
+
+            rows_before = self.rows_read
+            for raw in self._new_blocks():
+                complete, self.carry = split_last_transaction(raw, self.carry)
+                self._fold(complete)
+            new_rows = self.rows_read - rows_before
+
+            self.last_refresh = time.time()
+            if new_rows:
+                # העסקה האחרונה נכללת ב-snapshot דרך עותק של המצב, ונשארת ב-carry עד שתושלם
+                builder = self.builder
+                if self.carry is not None and len(self.carry):
+                    builder = self.builder.copy()
+                    self._fold(self.carry, builder)
+                if builder.rows:
+                    self._shares_pair_counts = builder is self.builder and builder.pair_counts is not None
+                    self.dataset = dict(
+                        builder.snapshot(),
+                        df=None,
+                        # ההיסט לבדו עלול לחזור אחרי החלפת הקובץ - גם ה-inode וזמן השינוי
+                        version=(self.path, 'follow', stat.st_ino, stat.st_mtime_ns, self.offset),
+                        load_timings={},
+                    )
+            elif self.rows_read == 0:
+                self.dataset = None  # הקובץ הוחלף בקובץ ריק
+            return new_rows
+
+
+@st.cache_resource(show_spinner="טוען נתונים...", max_entries=2)
+def _get_followed_sales(path, chunk_rows, relative_error):
+    followed = FollowedSales(path, chunk_rows, relative_error)
+    followed.refresh()
+    return followed
+
+
+def get_followed_sales(path, chunk_rows=DEFAULT_CHUNK_ROWS, relative_error=None):
+    """מחזיר את מצב המעקב המשותף לכל הסשנים עבור הקובץ (נטען במלואו בפעם הראשונה)."""
+    return _get_followed_sales(path, chunk_rows, relative_error)
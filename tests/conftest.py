@@ -0,0 +1,54 @@
+"""נתונים משותפים לבדיקות: טבלה קטנה שהתוצאות שלה ידועות, והקובץ המצורף."""
+import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from data_loader import prepare_sales_frame
+
+SAMPLE_CSV = Path(__file__).resolve().parent.parent / "bakery_sales_revised.csv"
+
+MONDAY = datetime.date(2017, 1, 2)
+SATURDAY = datetime.date(2017, 1, 7)
+
+
+@pytest.fixture
+def tiny_sales():
+    """
+    ארבע עסקאות בשני ימים (שני - אמצע שבוע, שבת - סוף שבוע), בכל אחד מחלקי היום:
+        1  ב-09:00 ביום שני: Coffee, Bread, Bread
+        2  ב-13:00 ביום שני: Coffee, Tea
+        3  ב-18:00 בשבת:    Bread
+        4  ב-22:30 בשבת:    Tea, Cake
+    """
+    raw = pd.DataFrame({
+        'Transaction': [1, 1, 1, 2, 2, 3, 4, 4],
+        'Item': ['Coffee', 'Bread', 'Bread', 'Coffee', 'Tea', 'Bread', 'Tea', 'Cake'],
+        'date_time': ['01/02/2017 9:00'] * 3 + ['01/02/2017 13:00'] * 2 + ['01/07/2017 18:00']
+                     + ['01/07/2017 22:30'] * 2,
+    })
+    return prepare_sales_frame(raw)
+
+
+@pytest.fixture(scope='session')
+def bundled_raw():
+    return pd.read_csv(SAMPLE_CSV)
+
+
+@pytest.fixture(scope='session')
+def bundled_sales(bundled_raw):
+    """הקובץ המצורף אחרי העיבוד של הטוען (ללא sidecar - הבדיקות לא כותבות ליד הקובץ)."""
+    return prepare_sales_frame(bundled_raw.copy())
+
+
+@pytest.fixture(scope='session')
+def bundled_ranges(bundled_sales):
+    """כל הנתונים, חודש אחד, יום אחד וטווח שמתחיל לפני הנתונים."""
+    first_day, last_day = bundled_sales['date_time'].iloc[0].date(), bundled_sales['date_time'].iloc[-1].date()
+    return [
+        (first_day, last_day),
+        (datetime.date(2017, 1, 1), datetime.date(2017, 1, 31)),
+        (datetime.date(2016, 12, 24), datetime.date(2016, 12, 24)),
+        (first_day - datetime.timedelta(days=30), first_day + datetime.timedelta(days=6)),
+    ]
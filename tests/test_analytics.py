@@ -0,0 +1,132 @@
+"""החישובים הישירים על הטבלה (analytics.py), על טבלה קטנה שהתוצאות שלה ידועות."""
+import contextlib
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from basket import BasketMatrix
+from conftest import MONDAY, SATURDAY
+from sales_cube import SalesCube
+
+
+def test_compute_kpis(tiny_sales):
+    assert analytics.compute_kpis(tiny_sales) == {
+        'total_items_sold': 8,
+        'unique_transactions': 4,
+        'unique_items': 4,
+        'avg_items_per_transaction': 2.0,
+    }
+
+
+def test_compute_kpis_empty(tiny_sales):
+    kpis = analytics.compute_kpis(tiny_sales.iloc[:0])
+    assert kpis['unique_transactions'] == 0 and kpis['avg_items_per_transaction'] == 0
+
+
+def test_filter_sales_frame(tiny_sales):
+    monday = analytics.filter_sales_frame(tiny_sales, datetime.date(2017, 1, 2), datetime.date(2017, 1, 2))
+    assert monday['Transaction'].tolist() == [1, 1, 1, 2, 2]
+    tea = analytics.filter_sales_frame(tiny_sales, datetime.date(2017, 1, 1), datetime.date(2017, 1, 31), 'Tea')
+    assert tea['Transaction'].tolist() == [2, 4]
+
+
+def test_top_items_ties_by_name(tiny_sales):
+    top = analytics.top_items(tiny_sales)
+    assert top['Item'].tolist() == ['Bread', 'Coffee', 'Tea', 'Cake']
+    assert top['Count'].tolist() == [3, 2, 2, 1]
+    assert analytics.top_items(tiny_sales, n=2)['Item'].tolist() == ['Bread', 'Coffee']
+
+
+def test_hourly_counts(tiny_sales):
+    hourly = analytics.hourly_counts(tiny_sales)
+    assert hourly['Hour'].tolist() == list(range(24))
+    expected = np.zeros(24, dtype=np.int64)
+    expected[[9, 13, 18, 22]] = [3, 2, 1, 2]
+    assert hourly['Count'].tolist() == expected.tolist()
+
+
+def test_monthly_transactions(tiny_sales):
+    monthly = analytics.monthly_transactions(tiny_sales)
+    assert monthly.to_dict('list') == {'YearMonth': ['2017-01'], 'UniqueTransactions': [4]}
+
+
+def test_daypart_counts(tiny_sales):
+    # שוויון בספירה נשמר בסדר של חלקי היום (צהריים לפני לילה)
+    daypart = analytics.daypart_counts(tiny_sales)
+    assert daypart.to_dict('list') == {'Daypart': ['Morning', 'Afternoon', 'Night', 'Evening'], 'Count': [3, 2, 2, 1]}
+
+
+def test_daypart_counts_by_day_type(tiny_sales):
+    daypart = analytics.daypart_counts(tiny_sales, by_day_type=True)
+    counts = {(row.Daypart, row.weekday_weekend): row.Count for row in daypart.itertuples() if row.Count}
+    assert counts == {('Morning', 'weekday'): 3, ('Afternoon', 'weekday'): 2,
+                      ('Evening', 'weekend'): 1, ('Night', 'weekend'): 2}
+
+
+def test_co_purchase(tiny_sales):
+    result = analytics.co_purchase(tiny_sales, 'Coffee')
+    assert result['Item'].tolist() == ['Bread', 'Tea']
+    assert result['QuantityWithAnchor'].tolist() == [2, 1]
+    assert result['TotalSales'].tolist() == [3, 2]  # כל המכירות של המוצר בטווח, לא רק עם העוגן
+    np.testing.assert_allclose(result['Support'], [0.25, 0.25])
+    np.testing.assert_allclose(result['Confidence'], [0.5, 0.5])
+    np.testing.assert_allclose(result['Lift'], [1.0, 1.0])
+
+
+def test_co_purchase_missing_anchor(tiny_sales):
+    assert analytics.co_purchase(tiny_sales, 'Croissant').empty
+
+
+def test_trend_frequency():
+    start = datetime.date(2017, 1, 1)
+    assert analytics.trend_frequency(start, start + datetime.timedelta(days=91)) == 'D'
+    assert analytics.trend_frequency(start, start + datetime.timedelta(days=92)) == 'W'
+    assert analytics.trend_frequency(start, start + datetime.timedelta(days=800)) == 'M'
+    assert analytics.trend_frequency(start, start, 'week') == 'W'
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[437] = 50.0
+    keep = analytics.lttb_indices(x, y, 20)
+    assert len(keep) == 20 and keep[0] == 0 and keep[-1] == 999 and 437 in keep
+    assert np.all(np.diff(keep) > 0)
+    assert analytics.lttb_indices(x[:10], y[:10], 20).tolist() == list(range(10))
+
+
+def test_transactions_trend_downsampled():
+    counts = pd.Series(np.arange(500), index=pd.period_range('2016-01-01', periods=500, freq='D'))
+    trend = analytics.transactions_trend(counts, max_points=50)
+    assert len(trend) == 50
+    assert trend['Period'].iloc[0] == pd.Timestamp('2016-01-01')
+    assert trend['UniqueTransactions'].iloc[-1] == 499
+
+
+def test_dashboard_view_cache(tiny_sales):
+    cube, basket = SalesCube.from_frame(tiny_sales), BasketMatrix.from_frame(tiny_sales)
+    cache = analytics.ResultCache()
+    computed = []
+    timer = lambda name: computed.append(name) or contextlib.nullcontext()
+    expected = analytics.dashboard_view(cube, basket, MONDAY, SATURDAY)
+    first = analytics.dashboard_view(cube, basket, MONDAY, SATURDAY, cache=cache, timer=timer)
+    coffee = analytics.dashboard_view(cube, basket, MONDAY, SATURDAY, 'Coffee', cache=cache, timer=timer)
+    again = analytics.dashboard_view(cube, basket, MONDAY, SATURDAY, cache=cache, timer=timer)
+    # מעבר ל-Coffee מחשב הכול חוץ מ"נקנה יחד עם" (העוגן כבר Coffee), והחזרה לא מחשבת דבר
+    assert computed.count('co_purchased') == 1 and computed.count('kpis') == 2
+    assert coffee['kpis'] == analytics.dashboard_view(cube, basket, MONDAY, SATURDAY, 'Coffee')['kpis']
+    for view in (first, again):
+        assert view.keys() == expected.keys() and view['kpis'] == expected['kpis']
+        pd.testing.assert_frame_equal(view['co_purchased'], expected['co_purchased'])
+
+
+def test_result_cache_evicts_least_recent():
+    cache = analytics.ResultCache(max_entries=2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: None)  # 'a' נקרא לאחרונה - 'b' יוצא כשנוסף 'c'
+    cache.get_or_compute('c', lambda: 3)
+    assert cache.get_or_compute('a', lambda: None) == 1
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
@@ -0,0 +1,86 @@
+"""מטריצת הסלים (basket.py), טבלת התצוגה שלה וספירות הצמדים (association_rules.py)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from association_rules import PairCounts
+from basket import BasketMatrix, co_purchase_display_table
+from conftest import MONDAY, SATURDAY
+
+
+def sorted_result(result):
+    return result.sort_values(['QuantityWithAnchor', 'Item'], ascending=[False, True]).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def bundled_basket(bundled_sales):
+    return BasketMatrix.from_frame(bundled_sales)
+
+
+@pytest.mark.parametrize('anchor_item', ['Coffee', 'Bread', 'Tea'])
+def test_matrix_matches_frame(bundled_sales, bundled_basket, bundled_ranges, anchor_item):
+    for start_date, end_date in bundled_ranges:
+        filtered = analytics.filter_sales_frame(bundled_sales, start_date, end_date)
+        expected = analytics.co_purchase(filtered, anchor_item, n=1000)
+        actual = bundled_basket.co_purchased(anchor_item, start_date, end_date, n=1000)
+        pd.testing.assert_frame_equal(sorted_result(expected), sorted_result(actual), check_dtype=False)
+
+
+def test_co_purchased_values(tiny_sales):
+    result = BasketMatrix.from_frame(tiny_sales).co_purchased('Coffee', MONDAY, SATURDAY)
+    assert sorted_result(result)['Item'].tolist() == ['Bread', 'Tea']
+    assert sorted_result(result)['TotalSales'].tolist() == [3, 2]
+    # רק העסקאות של יום שני: 2 עסקאות, ובשתיהן Coffee
+    monday = sorted_result(BasketMatrix.from_frame(tiny_sales).co_purchased('Coffee', MONDAY, MONDAY))
+    assert monday['TotalSales'].tolist() == [2, 1]
+    np.testing.assert_allclose(monday['Confidence'], [0.5, 0.5])
+    np.testing.assert_allclose(monday['Lift'], [1.0, 1.0])
+
+
+def test_co_purchased_missing_anchor_or_range(tiny_sales):
+    basket = BasketMatrix.from_frame(tiny_sales)
+    assert basket.co_purchased('Croissant', MONDAY, SATURDAY).empty
+    assert basket.co_purchased('Coffee', SATURDAY, SATURDAY).empty
+
+
+def test_display_table(tiny_sales):
+    table = co_purchase_display_table(analytics.co_purchase(tiny_sales, 'Coffee'), 'Coffee')
+    assert table['סה"כ מכירות מוצר'].tolist() == [3, 2]
+    # שיעור היחידות של המוצר שנמכרו עם העוגן מתוך כל היחידות שלו
+    assert table['שיעור מכירות עם Coffee (%)'].tolist() == ['67%', '50%']
+    assert table['תמיכה (%)'].tolist() == ['25.0%', '25.0%']
+    assert table['Lift'].tolist() == [1.0, 1.0]
+
+
+def test_display_table_empty(tiny_sales):
+    empty = BasketMatrix.from_frame(tiny_sales).co_purchased('Croissant', MONDAY, SATURDAY)
+    assert co_purchase_display_table(empty, 'Croissant').empty
+
+
+def test_top_pairs(tiny_sales):
+    pairs = PairCounts.from_basket(BasketMatrix.from_frame(tiny_sales)).top_pairs(MONDAY, SATURDAY)
+    assert list(zip(pairs['ItemA'], pairs['ItemB'])) == [('Bread', 'Coffee'), ('Cake', 'Tea'), ('Coffee', 'Tea')]
+    assert pairs['Transactions'].tolist() == [1, 1, 1]
+    np.testing.assert_allclose(pairs['Support'], [0.25, 0.25, 0.25])
+
+
+def test_pair_counts_match_co_purchased(bundled_sales, bundled_basket, bundled_ranges):
+    pair_counts = PairCounts.from_basket(bundled_basket, with_quantities=True)
+    for start_date, end_date in bundled_ranges:
+        expected = bundled_basket.co_purchased('Coffee', start_date, end_date, n=1000)
+        actual = pair_counts.co_purchased('Coffee', start_date, end_date, n=1000)
+        pd.testing.assert_frame_equal(sorted_result(expected), sorted_result(actual), check_dtype=False)
+
+
+def test_pair_counts_concat(bundled_sales, bundled_basket, bundled_ranges):
+    whole = PairCounts.from_basket(bundled_basket)
+    parts = [bundled_sales[bundled_sales['Transaction'] % 2 == remainder] for remainder in range(2)]
+    # לכל חלק רשימת מוצרים משלו (כמו קבצי סניפים שונים), והאיחוד ממופה חזרה לרשימה המלאה
+    combined = PairCounts.concat(
+        [PairCounts.from_basket(BasketMatrix.from_frame(
+            part.assign(Item=part['Item'].cat.remove_unused_categories()))) for part in parts],
+        bundled_basket.items)
+    for start_date, end_date in bundled_ranges:
+        pd.testing.assert_frame_equal(whole.top_pairs(start_date, end_date, k=50),
+                                      combined.top_pairs(start_date, end_date, k=50))
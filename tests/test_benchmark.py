@@ -0,0 +1,31 @@
+"""
+מדידות הביצועים של benchmark.py כבדיקות pytest-benchmark, על טבלה סינתטית קטנה.
+
+    python -m pytest tests/test_benchmark.py --benchmark-autosave            # שמירת בסיס להשוואה
+    python -m pytest tests/test_benchmark.py --benchmark-compare --benchmark-compare-fail=min:20%
+
+BENCHMARK_ROWS קובע את גודל הטבלה (ברירת מחדל: 20,000 שורות).
+"""
+import os
+
+import pytest
+
+from benchmark import benchmark_cases, synthetic_sales
+
+pytest.importorskip('pytest_benchmark')
+
+BENCHMARK_ROWS = int(os.environ.get('BENCHMARK_ROWS', 20_000))
+
+# שמות המדידות נלקחים מטבלה זעירה בזמן האיסוף; הטבלה בגודל המלא נבנית פעם אחת למודול
+CASE_NAMES = [name for name, _ in benchmark_cases(synthetic_sales(200))]
+
+
+@pytest.fixture(scope='module')
+def cases():
+    return dict(benchmark_cases(synthetic_sales(BENCHMARK_ROWS)))
+
+
+@pytest.mark.parametrize('name', CASE_NAMES)
+def test_benchmark(benchmark, cases, name):
+    benchmark.group = f'{BENCHMARK_ROWS:,} rows'
+    assert benchmark(cases[name]) is not None
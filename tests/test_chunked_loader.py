@@ -0,0 +1,81 @@
+"""טעינה במקטעים (chunked_loader.py): האגרגציות זהות לאלו שנבנות מהטבלה המלאה, בכל גודל מקטע."""
+import pandas as pd
+import pytest
+
+from association_rules import PairCounts
+from basket import BasketMatrix
+from chunked_loader import AggregateBuilder, read_sales_aggregates, split_last_transaction
+from data_loader import prepare_sales_frame
+from hll import DistinctSketches
+from sales_cube import SalesCube
+
+
+@pytest.fixture(scope='module')
+def sample(bundled_raw, tmp_path_factory):
+    """3000 השורות הראשונות של הקובץ המצורף, כקובץ CSV זמני וכטבלה מעובדת."""
+    raw = bundled_raw.iloc[:3000]
+    path = tmp_path_factory.mktemp('chunked') / 'sales.csv'
+    raw.to_csv(path, index=False)
+    return str(path), prepare_sales_frame(raw.copy())
+
+
+def assert_same_aggregates(dataset, df, relative_error=None):
+    start_date, end_date = dataset['min_date'], dataset['max_date']
+    cube = SalesCube.from_frame(df)
+    pairs = PairCounts.from_basket(BasketMatrix.from_frame(df))
+    assert dataset['rows'] == len(df)
+    assert (start_date, end_date) == (df['date_time'].min().date(), df['date_time'].max().date())
+    for item in (None, 'Coffee', 'Bread'):
+        assert dataset['cube'].kpis(start_date, end_date, item) == cube.kpis(start_date, end_date, item)
+        pd.testing.assert_frame_equal(dataset['cube'].hourly(start_date, end_date, item),
+                                      cube.hourly(start_date, end_date, item))
+    pd.testing.assert_frame_equal(dataset['pair_counts'].top_pairs(start_date, end_date, k=50),
+                                  pairs.top_pairs(start_date, end_date, k=50))
+    expected_sales = df['Item'].astype(str).value_counts()
+    assert dataset['total_item_sales'].set_index('Item')['TotalSales'].to_dict() == expected_sales.to_dict()
+    if relative_error is not None:
+        sketches = DistinctSketches.from_frame(df, relative_error)
+        for item in (None, 'Coffee'):
+            assert dataset['sketches'].count(start_date, end_date, item) == sketches.count(start_date, end_date, item)
+
+
+@pytest.mark.parametrize('chunk_rows', [97, 1000, 10_000])
+def test_read_sales_aggregates(sample, chunk_rows):
+    path, df = sample
+    timings = {}
+    assert_same_aggregates(read_sales_aggregates(path, chunk_rows, timings=timings), df)
+    assert {'read_chunks', 'fold_aggregates', 'finalize'} <= set(timings)
+
+
+def test_read_sales_aggregates_with_sketches(sample):
+    path, df = sample
+    assert_same_aggregates(read_sales_aggregates(path, 400, relative_error=0.05), df, relative_error=0.05)
+
+
+def test_split_last_transaction():
+    raw = pd.DataFrame({'Transaction': [1, 1, 2, 3, 3], 'Item': list('abcde'), 'date_time': [''] * 5})
+    complete, carry = split_last_transaction(raw)
+    assert complete['Transaction'].tolist() == [1, 1, 2]
+    assert carry['Transaction'].tolist() == [3, 3]
+
+    # השורות שהועברו מצורפות לתחילת המקטע הבא
+    following = pd.DataFrame({'Transaction': [3, 4], 'Item': list('fg'), 'date_time': [''] * 2})
+    complete, carry = split_last_transaction(following, carry)
+    assert complete['Item'].tolist() == ['d', 'e', 'f']
+    assert carry['Item'].tolist() == ['g']
+
+
+def test_split_last_transaction_missing_column():
+    with pytest.raises(KeyError):
+        split_last_transaction(pd.DataFrame({'Transaction': [1], 'Item': ['a']}))
+
+
+def test_combine(sample):
+    _, df = sample
+    parts = [df[df['Transaction'] % 2 == remainder] for remainder in range(2)]
+    builders = []
+    for part in parts:
+        builder = AggregateBuilder(relative_error=0.05)
+        builder.add(part.assign(Item=part['Item'].cat.remove_unused_categories()))
+        builders.append(builder)
+    assert_same_aggregates(AggregateBuilder.combine(builders).snapshot(), df, relative_error=0.05)
@@ -0,0 +1,46 @@
+"""חלקי היום וסוג היום (daypart.py)."""
+import pandas as pd
+import pytest
+
+from daypart import day_type_column, daypart_column, hour_to_daypart, parse_daypart_bounds
+
+
+def test_hour_to_daypart_bounds():
+    hours = [0, 4, 5, 11, 12, 16, 17, 20, 21, 23]
+    assert list(hour_to_daypart(hours)) == ['Night', 'Night', 'Morning', 'Morning', 'Afternoon', 'Afternoon',
+                                            'Evening', 'Evening', 'Night', 'Night']
+
+
+def test_hour_to_daypart_custom_bounds():
+    assert list(hour_to_daypart([5, 6, 11, 19, 22], (6, 11, 19, 22))) == [
+        'Night', 'Morning', 'Afternoon', 'Evening', 'Night']
+
+
+def test_parse_daypart_bounds():
+    assert parse_daypart_bounds('6, 11, 19, 22') == (6, 11, 19, 22)
+    for value in ('5,12,17', '12,5,17,21', '5,12,17,25', '-1,5,12,17'):
+        with pytest.raises(ValueError):
+            parse_daypart_bounds(value)
+
+
+def test_daypart_column_prefers_period_day():
+    df = pd.DataFrame({
+        'date_time': pd.to_datetime(['2017-01-02 09:00', '2017-01-02 13:00', '2017-01-02 22:00']),
+        'period_day': [' afternoon', 'MORNING', 'brunch'],
+    })
+    # ערך לא מוכר (brunch) מחושב מהשעה
+    assert list(daypart_column(df)) == ['Afternoon', 'Morning', 'Night']
+    # גבולות מפורשים גוברים על period_day
+    assert list(daypart_column(df, (5, 12, 17, 21))) == ['Morning', 'Afternoon', 'Night']
+
+
+def test_daypart_column_without_period_day():
+    df = pd.DataFrame({'date_time': pd.to_datetime(['2017-01-02 04:59', '2017-01-02 17:00'])})
+    assert list(daypart_column(df)) == ['Night', 'Evening']
+
+
+def test_day_type_column():
+    df = pd.DataFrame({'date_time': pd.to_datetime(['2017-01-06', '2017-01-07', '2017-01-08', '2017-01-09'])})
+    assert list(day_type_column(df)) == ['weekday', 'weekend', 'weekend', 'weekday']
+    df['weekday_weekend'] = [' Weekend', 'weekday', 'WEEKDAY', 'weekend']
+    assert list(day_type_column(df)) == ['weekend', 'weekday', 'weekday', 'weekend']
@@ -0,0 +1,59 @@
+"""ספירה מקורבת של עסקאות ייחודיות (hll.py): אומדן בתוך השגיאה הצפויה, ומיזוג ללא תלות בחלוקה."""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+from hll import DistinctSketches, precision_for_error, standard_error
+
+
+@pytest.fixture(scope='module')
+def bundled_sketches(bundled_sales):
+    return DistinctSketches.from_frame(bundled_sales, relative_error=0.02)
+
+
+def test_precision_for_error():
+    assert standard_error(precision_for_error(0.02)) <= 0.02
+    assert precision_for_error(1.0) == 4
+    assert precision_for_error(1e-6) == 16
+
+
+@pytest.mark.parametrize('item', [None, 'Coffee', 'Bread'])
+def test_count_within_error(bundled_sales, bundled_sketches, bundled_ranges, item):
+    for start_date, end_date in bundled_ranges:
+        exact = analytics.filter_sales_frame(bundled_sales, start_date, end_date, item)['Transaction'].nunique()
+        # שלוש סטיות תקן, ולפחות 2 עסקאות בספירות קטנות
+        tolerance = max(3 * bundled_sketches.relative_error * exact, 2)
+        assert abs(bundled_sketches.count(start_date, end_date, item) - exact) <= tolerance
+
+
+def test_count_by_month_within_error(bundled_sales, bundled_sketches, bundled_ranges):
+    start_date, end_date = bundled_ranges[0]
+    estimates = bundled_sketches.count_by_month(start_date, end_date)
+    exact = bundled_sales.groupby(bundled_sales['date_time'].dt.to_period('M'))['Transaction'].nunique()
+    assert list(estimates.index) == list(exact.index)
+    assert np.all(np.abs(estimates - exact) <= 3 * bundled_sketches.relative_error * exact)
+
+
+def test_empty_range(bundled_sketches):
+    day = datetime.date(2015, 1, 1)
+    assert bundled_sketches.count(day, day) == 0
+    assert bundled_sketches.count(day, day, 'Coffee') == 0
+    assert bundled_sketches.count_by_month(day, day).empty
+
+
+def test_concat_matches_whole(bundled_sales, bundled_sketches, bundled_ranges):
+    # מיזוג רגיסטרים (max) אינו תלוי בחלוקה - גם כשעסקה מפוצלת בין החלקים והמוצרים שונים בכל חלק
+    middle = len(bundled_sales) // 2
+    parts = [bundled_sales.iloc[:middle], bundled_sales.iloc[middle:]]
+    combined = DistinctSketches.concat(
+        [DistinctSketches.from_frame(part.assign(Item=part['Item'].cat.remove_unused_categories()))
+         for part in reversed(parts)],
+        bundled_sketches.items)
+    for start_date, end_date in bundled_ranges:
+        for item in (None, 'Coffee', 'Tea'):
+            assert combined.count(start_date, end_date, item) == bundled_sketches.count(start_date, end_date, item)
+        pd.testing.assert_series_equal(combined.count_by_month(start_date, end_date),
+                                       bundled_sketches.count_by_month(start_date, end_date))
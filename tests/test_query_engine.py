@@ -0,0 +1,23 @@
+"""התאמה בין מנוע DuckDB למנוע pandas (ראו query_engine.compare_engines) על פרוסה קטנה מהקובץ המצורף."""
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+from query_engine import compare_engines  # noqa: E402
+
+SAMPLE_CSV = Path(__file__).resolve().parent.parent / "bakery_sales_revised.csv"
+
+
+@pytest.fixture(scope='module')
+def sales_slice(tmp_path_factory):
+    """3000 השורות הראשונות (כחודש של נתונים), כטקסט - כפי שהן בקובץ."""
+    path = tmp_path_factory.mktemp('sales') / 'slice.csv'
+    pd.read_csv(SAMPLE_CSV, dtype=str, nrows=3000).to_csv(path, index=False)
+    return str(path)
+
+
+def test_engines_match_on_slice(sales_slice):
+    assert compare_engines(sales_slice, items=['Coffee', 'Bread', 'Tea']) == []
@@ -0,0 +1,63 @@
+"""הקובייה (sales_cube.py) מחזירה את אותן תוצאות כמו החישובים הישירים על הטבלה."""
+import datetime
+
+import pandas as pd
+import pytest
+
+import analytics
+from sales_cube import SalesCube
+
+
+def assert_same(expected, actual):
+    pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+@pytest.fixture(scope='module')
+def bundled_cube(bundled_sales):
+    return SalesCube.from_frame(bundled_sales)
+
+
+@pytest.mark.parametrize('item', [None, 'Coffee', 'Tea', 'Hearty & Seasonal'])
+def test_cube_matches_frame(bundled_sales, bundled_cube, bundled_ranges, item):
+    for start_date, end_date in bundled_ranges:
+        filtered = analytics.filter_sales_frame(bundled_sales, start_date, end_date, item)
+        assert bundled_cube.kpis(start_date, end_date, item) == analytics.compute_kpis(filtered)
+        assert_same(analytics.top_items(filtered), bundled_cube.top_items(start_date, end_date, item))
+        assert_same(analytics.hourly_counts(filtered), bundled_cube.hourly(start_date, end_date, item))
+        assert_same(analytics.daypart_counts(filtered), bundled_cube.daypart_counts(start_date, end_date, item))
+        assert_same(analytics.daypart_counts(filtered, by_day_type=True),
+                    bundled_cube.daypart_counts(start_date, end_date, item, by_day_type=True))
+        # עסקה נספרת ביום שבו התחילה - בקובץ המצורף אין עסקאות שחוצות חצות
+        assert_same(analytics.monthly_transactions(filtered),
+                    bundled_cube.monthly_transactions(start_date, end_date, item))
+
+
+def test_transactions_counted_on_start_day(tiny_sales):
+    # עסקה 4 מתחילה בשבת ונמשכת אחרי חצות - נספרת רק בשבת
+    tiny_sales = tiny_sales.copy()
+    tiny_sales.loc[7, 'date_time'] = pd.Timestamp('2017-01-08 00:10')
+    cube = SalesCube.from_frame(tiny_sales)
+    sunday = datetime.date(2017, 1, 8)
+    assert cube.kpis(sunday, sunday)['unique_transactions'] == 0
+    assert cube.kpis(sunday, sunday)['total_items_sold'] == 1
+    assert cube.kpis(datetime.date(2017, 1, 7), datetime.date(2017, 1, 7))['unique_transactions'] == 2
+
+
+def test_empty_range(bundled_cube):
+    day = datetime.date(2015, 1, 1)
+    assert bundled_cube.kpis(day, day)['total_items_sold'] == 0
+    assert bundled_cube.top_items(day, day).empty
+    assert bundled_cube.hourly(day, day)['Count'].sum() == 0
+
+
+def test_concat_matches_whole(bundled_sales, bundled_cube, bundled_ranges):
+    # חלוקה לפי עסקאות (כל עסקה בחלק אחד), כמו מקטעי קובץ או קבצי סניפים
+    parts = [bundled_sales[bundled_sales['Transaction'] % 3 == remainder] for remainder in range(3)]
+    cubes = [SalesCube.from_frame(part.assign(Item=part['Item'].cat.remove_unused_categories())) for part in parts]
+    combined = SalesCube.concat(cubes, bundled_sales['Item'].cat.categories)
+    for start_date, end_date in bundled_ranges:
+        for item in (None, 'Coffee'):
+            assert combined.kpis(start_date, end_date, item) == bundled_cube.kpis(start_date, end_date, item)
+            assert_same(bundled_cube.top_items(start_date, end_date, item),
+                        combined.top_items(start_date, end_date, item))